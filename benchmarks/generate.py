@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+'''
+Generators of synthetic, but format-faithful, VASP output files for benchmarking vaspirin.
+
+All files are written block by block (one k-point or one atom at a time), so that
+multi-GB files can be generated without holding them in memory. The values are random,
+but the layout is the one read by the vaspirin parsers: OUTCAR (band structure),
+PROCAR (lm decomposed), DOSCAR (LORBIT = 11, no spin), POSCAR, KPOINTS and PROJECTION.
+'''
+
+import os
+import argparse
+import numpy as np
+
+orbitalsHeader = "ion      s     py     pz     px    dxy    dyz    dz2    dxz    dx2    tot"
+
+def bandEnergies (nKpoints, nBands, seed=0):
+	"""
+	Returns smooth, sorted eigenvalues E[k-point][band] around the gap at 0 eV
+	"""
+
+	rng = np.random.default_rng (seed)
+	centers = np.linspace (-20, 10, nBands)
+	phase = rng.uniform (0, 2*np.pi, nBands)
+	k = np.linspace (0, 1, nKpoints)[:,None]
+
+	return np.sort (centers + 0.8*np.sin (2*np.pi*k + phase), axis=1)
+
+def kpointPath (nKpoints):
+	"""
+	Returns a straight path of nKpoints from G to M in reciprocal coordinates
+	"""
+
+	path = np.zeros ((nKpoints, 3))
+	path[:,0] = np.linspace (0, 0.5, nKpoints)
+
+	return path
+
+def writeKPOINTS (fName, nKpoints):
+	"""
+	Writes a KPOINTS file with the high-symmetry points in the header, as read by graceIO.Grace.readXticks
+	"""
+
+	with open (fName, 'w') as f:
+		f.write ("G 0, M %d\n%d\nReciprocal lattice\n" % (nKpoints-1, nKpoints))
+		for kpt in kpointPath (nKpoints):
+			f.write ("%.15f    %.15f    %.15f    1.0000\n" % tuple(kpt))
+
+def writePOSCAR (fName, nIons, seed=0):
+	"""
+	Writes a POSCAR file with two chemical species and nIons atoms
+	"""
+
+	rng = np.random.default_rng (seed)
+	nA = max (nIons//3, 1)
+
+	with open (fName, 'w') as f:
+		f.write ("synthetic cell generated by vaspirin benchmarks\n3.1546\n")
+		f.write ("0.86602540 -0.50000000 0.00000000\n0.86602540 0.50000000 0.00000000\n0.00000000 0.00000000 10.0000000\n")
+		f.write ("Mo S\n%d %d\nDirect\n" % (nA, nIons - nA))
+		for position in rng.uniform (0, 1, (nIons, 3)):
+			f.write ("%.16f %.16f %.16f\n" % tuple(position))
+
+def writePROJECTION (fName, nIons):
+	"""
+	Writes a PROJECTION file splitting the ions into two materials
+	"""
+
+	nA = max (nIons//3, 1)
+
+	with open (fName, 'w') as f:
+		f.write ("Mo 1..%d red\n" % nA)
+		f.write ("S %d..%d blue\n" % (nA+1, nIons))
+
+def writeOUTCAR (fName, nKpoints, nBands, nIons, seed=0):
+	"""
+	Writes the parts of an OUTCAR file read by vaspirin: number of bands and electrons,
+	reciprocal lattice, k-points, Fermi level and the eigenvalues of each k-point.
+	Half of the bands are occupied.
+	"""
+
+	E = bandEnergies (nKpoints, nBands, seed)
+	nElec = 2*(nBands//2)
+	occupations = np.where (np.arange(nBands) < nBands//2, 2.0, 0.0)
+
+	with open (fName, 'w') as f:
+		f.write (" vasp.5.4.4 (synthetic OUTCAR generated by vaspirin benchmarks)\n \n")
+		f.write ("   k-points           NKPTS = %6d   k-points in BZ     NKDIM = %6d   number of bands    NBANDS= %6d\n" % (nKpoints, nKpoints, nBands))
+		f.write ("   number of dos      NEDOS =    301   number of ions     NIONS = %6d\n \n" % nIons)
+		f.write ("   NELECT = %12.4f    total number of electrons\n \n" % nElec)
+		f.write ("  energy-cutoff  :      500.00\n  volume of cell :      271.87\n")
+		f.write ("      direct lattice vectors                 reciprocal lattice vectors\n")
+		f.write ("     2.731963727 -1.577300000  0.000000000     0.183018535 -0.316997401  0.000000000\n")
+		f.write ("     2.731963727  1.577300000  0.000000000     0.183018535  0.316997401  0.000000000\n")
+		f.write ("     0.000000000  0.000000000 31.546000000     0.000000000  0.000000000  0.031699740\n \n")
+		f.write ("  length of vectors\n")
+		f.write ("     3.154599990  3.154599990 31.546000000     0.366037070  0.366037070  0.031699740\n \n \n")
+
+		f.write (" k-points in reciprocal lattice and weights: synthetic path\n")
+		for kpt in kpointPath (nKpoints):
+			f.write ("  %11.8f %11.8f %11.8f %12.3f\n" % (kpt[0], kpt[1], kpt[2], 1.0/nKpoints))
+		f.write (" \n position of ions in fractional coordinates (direct lattice) \n")
+		for position in np.random.default_rng (seed).uniform (0, 1, (nIons, 3)):
+			f.write ("  %11.8f %11.8f %11.8f\n" % tuple(position))
+		f.write (" \n")
+
+		f.write ("\n E-fermi : %8.4f     XC(G=0):  -2.4611     alpha+bet : -2.3244\n\n\n" % (E[:,nBands//2-1].max() + 0.1))
+
+		bandFormat = "%7d   %10.4f   %10.5f\n"*nBands
+		bandIndex = np.arange (1, nBands+1)
+		for k, kpt in enumerate (kpointPath (nKpoints)):
+			f.write (" k-point %5d :   %10.4f%10.4f%10.4f\n" % (k+1, kpt[0], kpt[1], kpt[2]))
+			f.write ("  band No.  band energies     occupation \n")
+			f.write (bandFormat % tuple (np.column_stack ((bandIndex, E[k], occupations)).ravel()))
+			f.write ("\n")
+
+		f.write (" " + "-"*104 + "\n")
+
+def writePROCAR (fName, nKpoints, nBands, nIons, seed=0):
+	"""
+	Writes a PROCAR file (lm decomposed, no phase factors) with random contributions
+	"""
+
+	rng = np.random.default_rng (seed)
+	E = bandEnergies (nKpoints, nBands, seed)
+	ionFormat = "%3d" + "%7.3f"*10 + "\n"
+	ionIndex = np.arange (1, nIons+1)
+
+	with open (fName, 'w') as f:
+		f.write ("PROCAR lm decomposed\n")
+		f.write ("# of k-points:  %d         # of bands:  %d         # of ions:   %d\n\n" % (nKpoints, nBands, nIons))
+
+		for k, kpt in enumerate (kpointPath (nKpoints)):
+			f.write (" k-point %4d :    %.8f %.8f %.8f     weight = %.8f\n\n" % (k+1, kpt[0], kpt[1], kpt[2], 1.0/nKpoints))
+
+			## Orbital contributions of all bands of this k-point at once
+			orbitals = rng.uniform (0, 0.1, (nBands, nIons, 9))
+			ions = np.concatenate ((orbitals, orbitals.sum(axis=2, keepdims=True)), axis=2)
+			totals = ions.sum (axis=1)
+
+			block = []
+			for band in range (nBands):
+				block.append ("band %3d # energy %13.8f # occ.  %.8f\n \n" % (band+1, E[k,band], 2.0 if band < nBands//2 else 0.0))
+				block.append (orbitalsHeader + "\n")
+				block.append ((ionFormat*nIons) % tuple (np.column_stack ((ionIndex, ions[band])).ravel()))
+				block.append (("tot" + "%7.3f"*10 + "\n \n") % tuple(totals[band]))
+
+			f.write ("".join (block))
+			f.write ("\n")
+
+def writeDOSCAR (fName, nIons, nEDOS, seed=0):
+	"""
+	Writes a DOSCAR file (LORBIT = 11, no spin) with the total DOS and the DOS projected onto each atom
+	"""
+
+	rng = np.random.default_rng (seed)
+	energies = np.linspace (-10, 10, nEDOS)
+	header = "%15.8f %15.8f %6d %15.8f %15.8f\n" % (10, -10, nEDOS, -1.0, 1.0)
+	atomFormat = ("%10.3f" + " %11.4E"*9 + "\n")*nEDOS
+
+	with open (fName, 'w') as f:
+		f.write ("%4d%4d%4d%4d\n" % (nIons, nIons, 1, 0))
+		f.write ("  0.1E+02  0.3E-09  0.3E-09  0.2E-08  0.5E-15\n  1.0E-04\n  CAR\n synthetic system\n")
+
+		states = rng.uniform (0, 5, nEDOS)
+		f.write (header)
+		f.write ((("%10.3f %11.4E %11.4E\n")*nEDOS) % tuple (np.column_stack ((energies, states, np.cumsum(states)*(20/nEDOS))).ravel()))
+
+		for atom in range (nIons):
+			f.write (header)
+			f.write (atomFormat % tuple (np.column_stack ((energies, rng.uniform (0, 1, (nEDOS, 9)))).ravel()))
+
+def generate (folder, nKpoints, nBands, nIons, nEDOS, seed=0):
+	"""
+	Writes all synthetic files into folder, creating it if needed
+	"""
+
+	os.makedirs (folder, exist_ok=True)
+
+	writeKPOINTS (os.path.join (folder, 'KPOINTS'), nKpoints)
+	writePOSCAR (os.path.join (folder, 'POSCAR'), nIons, seed)
+	writePROJECTION (os.path.join (folder, 'PROJECTION'), nIons)
+	writeOUTCAR (os.path.join (folder, 'OUTCAR'), nKpoints, nBands, nIons, seed)
+	writePROCAR (os.path.join (folder, 'PROCAR'), nKpoints, nBands, nIons, seed)
+	writeDOSCAR (os.path.join (folder, 'DOSCAR'), nIons, nEDOS, seed)
+
+def parseArgs():
+	"""
+	Parse arguments from the command line. Uses the `argparse` package to
+	establish all positional and optional arguments.
+	"""
+
+	parser = argparse.ArgumentParser(description="Generates synthetic OUTCAR, PROCAR, DOSCAR, POSCAR, KPOINTS and PROJECTION files",
+									prog="generate.py")
+
+	parser.add_argument('folder', help="folder receiving the files")
+
+	parser.add_argument('-k', '--kpoints', type=int, default=100, help="number of k-points (default: 100)")
+
+	parser.add_argument('-b', '--bands', type=int, default=40, help="number of bands (default: 40)")
+
+	parser.add_argument('-n', '--ions', type=int, default=6, help="number of ions (default: 6)")
+
+	parser.add_argument('-e', '--nedos', type=int, default=301, help="number of energy points in the DOSCAR (default: 301)")
+
+	parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the random values (default: 0)")
+
+	return parser.parse_args()
+
+def main():
+	'''
+	Generates a set of synthetic files from the command line
+	'''
+
+	args = parseArgs()
+	generate (args.folder, args.kpoints, args.bands, args.ions, args.nedos, args.seed)
+
+if __name__ == "__main__":
+	main ()
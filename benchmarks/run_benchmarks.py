@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+'''
+Benchmarks of the vaspirin parsers and writers on synthetic VASP files.
+
+For each size, the files are generated once (see generate.py) and each case runs
+in a fresh process, so that its peak memory is not hidden by the previous cases.
+Only the call being benchmarked is timed; reading the files it depends on is not.
+For each case the wall time, the throughput on the input file and the peak resident
+memory (total and above the memory used before the timed call) are reported.
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+import generate
+from vaspirin import outcar, procar, splitter, doscar, datIO, graceIO, poscar, projection
+
+## Number of k-points, bands, ions and DOSCAR energy points
+## large produces a ~1.2 GB PROCAR and huge a ~4.7 GB PROCAR
+sizes = {
+	'small':  (50, 20, 3, 301),
+	'medium': (200, 100, 20, 3001),
+	'large':  (400, 400, 100, 5001),
+	'huge':   (800, 800, 100, 10001),
+}
+
+def currentRSS ():
+	"""
+	Returns the resident memory of this process, in MB
+	"""
+
+	try:
+		with open ('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf ('SC_PAGE_SIZE') / 2**20
+	except (FileNotFoundError, ValueError):
+		return peakRSS ()
+
+def peakRSS ():
+	"""
+	Returns the peak resident memory of this process, in MB.
+	On Linux, the peak since the last call to resetPeakRSS() is returned.
+	"""
+
+	try:
+		with open ('/proc/self/status') as f:
+			for line in f:
+				if line.startswith ('VmHWM:'):
+					return int(line.split()[1]) / 2**10
+	except FileNotFoundError:
+		pass
+
+	peak = resource.getrusage (resource.RUSAGE_SELF).ru_maxrss
+
+	## ru_maxrss is given in bytes on macOS and in kB elsewhere
+	return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def resetPeakRSS ():
+	"""
+	Resets the peak resident memory to the current one, so that the memory used
+	by the setup of a case is not reported. Only available on Linux.
+	"""
+
+	try:
+		with open ('/proc/self/clear_refs', 'w') as f:
+			f.write ('5')
+	except OSError:
+		pass
+
+## Each case is a setup, untimed, returning the arguments of the timed call
+## and the name of the file whose size gives the throughput
+
+def setupBandStructure (folder):
+	return (os.path.join (folder, 'OUTCAR'),), 'OUTCAR'
+
+def runBandStructure (fOutcar):
+	outcar.BandStructure (fOutcar)
+
+def setupPROCAR (folder):
+	return (os.path.join (folder, 'PROCAR'), projection.PROJECTION (os.path.join (folder, 'PROJECTION'))), 'PROCAR'
+
+def runPROCAR (fProcar, prj):
+	procar.PROCAR (fProcar, prj)
+
+def setupSplitter (folder):
+	prj = projection.PROJECTION (os.path.join (folder, 'PROJECTION'))
+	bs = outcar.BandStructure (os.path.join (folder, 'OUTCAR'))
+	return (splitter.PROCAR_splitter (os.path.join (folder, 'PROCAR'), prj, bs),), 'PROCAR'
+
+def runSplitter (p):
+	p.splitPROCAR ()
+
+def setupDOS (folder):
+	return (os.path.join (folder, 'DOSCAR'),), 'DOSCAR'
+
+def runDOS (fDoscar):
+	doscar.DOS (fDoscar)
+
+def setupPOSCAR (folder):
+	return (os.path.join (folder, 'POSCAR'),), 'POSCAR'
+
+def runPOSCAR (fPoscar):
+	poscar.POSCAR (fPoscar)
+
+def setupDatEigenvals (folder):
+	return (outcar.BandStructure (os.path.join (folder, 'OUTCAR')),), 'OUTCAR'
+
+def runDatEigenvals (bs):
+	datIO.DatFiles ().datEigenvals (bs)
+
+def setupDatProjected (folder):
+	prj = projection.PROJECTION (os.path.join (folder, 'PROJECTION'))
+	bs = outcar.BandStructure (os.path.join (folder, 'OUTCAR'))
+	return (bs, procar.PROCAR (os.path.join (folder, 'PROCAR'), prj)), 'PROCAR'
+
+def runDatProjected (bs, pr):
+	datIO.DatFiles ().datProjected (bs, pr)
+
+def setupGrace (folder):
+	prj = projection.PROJECTION (os.path.join (folder, 'PROJECTION'))
+	bs = outcar.BandStructure (os.path.join (folder, 'OUTCAR'))
+	xmgrace = graceIO.Grace ()
+	xmgrace.readXticks (os.path.join (folder, 'KPOINTS'))
+	return (xmgrace, bs, procar.PROCAR (os.path.join (folder, 'PROCAR'), prj)), 'OUTCAR'
+
+def runGrace (xmgrace, bs, pr):
+	with open ('bandsProjected.bfile', 'w') as outputFile:
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printTracesProjected (outputFile, bs, pr)
+		xmgrace.printAxis (outputFile, bs)
+		xmgrace.printLabel (outputFile)
+
+cases = {
+	'outcar.BandStructure': (setupBandStructure, runBandStructure),
+	'procar.PROCAR': (setupPROCAR, runPROCAR),
+	'splitter.splitPROCAR': (setupSplitter, runSplitter),
+	'doscar.DOS': (setupDOS, runDOS),
+	'poscar.POSCAR': (setupPOSCAR, runPOSCAR),
+	'datIO.datEigenvals': (setupDatEigenvals, runDatEigenvals),
+	'datIO.datProjected': (setupDatProjected, runDatProjected),
+	'graceIO.printTracesProjected': (setupGrace, runGrace),
+}
+
+def runCase (name, folder, workDir, queue):
+	"""
+	Runs a single case in the current process and puts its results in queue
+	"""
+
+	## The .dat and .bfile files are written into a scratch folder
+	os.chdir (workDir)
+
+	setup, run = cases[name]
+	args, fInput = setup (folder)
+
+	resetPeakRSS ()
+	rssBefore = currentRSS ()
+	start = time.perf_counter ()
+	run (*args)
+	elapsed = time.perf_counter () - start
+
+	peak = peakRSS ()
+	sizeMB = os.path.getsize (os.path.join (folder, fInput)) / 2**20
+
+	queue.put ({
+		'case': name,
+		'input': fInput,
+		'input MB': sizeMB,
+		'time s': elapsed,
+		'MB/s': sizeMB / elapsed if elapsed > 0 else float('inf'),
+		'peak RSS MB': peak,
+		'RSS increase MB': max (peak - rssBefore, 0.0),
+	})
+
+def benchmark (name, folder):
+	"""
+	Runs a case in a fresh process and returns its results
+	"""
+
+	context = multiprocessing.get_context ('spawn')
+	queue = context.Queue ()
+	workDir = tempfile.mkdtemp (prefix='vaspirin-bench-')
+
+	try:
+		process = context.Process (target=runCase, args=(name, os.path.abspath (folder), workDir, queue))
+		process.start ()
+		result = queue.get ()
+		process.join ()
+	finally:
+		shutil.rmtree (workDir, ignore_errors=True)
+
+	return result
+
+def printTable (size, results):
+	"""
+	Prints the results of a size as a table
+	"""
+
+	print ("\n%s" % size)
+	print ("%-30s %8s %10s %10s %10s %12s %12s" % ('case', 'input', 'size (MB)', 'time (s)', 'MB/s', 'peak RSS (MB)', 'increase (MB)'))
+	for r in results:
+		print ("%-30s %8s %10.1f %10.3f %10.1f %12.1f %12.1f" % (r['case'], r['input'], r['input MB'], r['time s'], r['MB/s'], r['peak RSS MB'], r['RSS increase MB']))
+
+def parseArgs():
+	"""
+	Parse arguments from the command line. Uses the `argparse` package to
+	establish all positional and optional arguments.
+	"""
+
+	parser = argparse.ArgumentParser(description="Benchmarks the vaspirin parsers and writers on synthetic VASP files",
+									prog="run_benchmarks.py")
+
+	parser.add_argument('-s', '--sizes', nargs='+', choices=sizes.keys(), default=['small', 'medium'],
+						help="sizes of the synthetic files (default: small medium)")
+
+	parser.add_argument('-c', '--cases', nargs='+', choices=cases.keys(), default=list(cases.keys()),
+						help="cases to be run (default: all)")
+
+	parser.add_argument('-d', '--data', default=None,
+						help="folder keeping the generated files, so that they are reused in the next runs (default: temporary folder)")
+
+	parser.add_argument('-j', '--json', default=None,
+						help="also writes the results to this JSON file")
+
+	return parser.parse_args()
+
+def main():
+	'''
+	Generates the synthetic files and runs the benchmarks for each size
+	'''
+
+	args = parseArgs()
+
+	dataDir = args.data if args.data else tempfile.mkdtemp (prefix='vaspirin-data-')
+	allResults = {}
+
+	try:
+		for size in args.sizes:
+			folder = os.path.join (dataDir, size)
+			nKpoints, nBands, nIons, nEDOS = sizes[size]
+
+			if not os.path.isfile (os.path.join (folder, 'DOSCAR')):
+				print ("Generating %s files (%d k-points, %d bands, %d ions, NEDOS = %d)..." % (size, nKpoints, nBands, nIons, nEDOS))
+				generate.generate (folder, nKpoints, nBands, nIons, nEDOS)
+
+			allResults[size] = [benchmark (name, folder) for name in args.cases]
+			printTable (size, allResults[size])
+	finally:
+		if not args.data:
+			shutil.rmtree (dataDir, ignore_errors=True)
+
+	if args.json:
+		with open (args.json, 'w') as f:
+			json.dump (allResults, f, indent=2)
+
+if __name__ == "__main__":
+	main ()
@@ -7,6 +7,8 @@ import numpy as np
 import argparse
 import sys
 import re
+import os
+import csv
 
 class PyplotConst (object):
 	"""
@@ -82,8 +84,13 @@ def importAlignmentsList (fAlignments):
 		SnS$_2$ -6.662 -5.120 black
 		--- blue
 		SnS$_2$ -6.586 -5.063 blue
-		''' 
-		
+
+		A .csv summary table written by batch.py may be given instead of the ALIGNMENTS file.
+		'''
+
+		if fAlignments.endswith ('.csv'):
+			return importSummaryTable (fAlignments)
+
 		## Opens the ALIGNMENTS file
 		try:
 			with open(fAlignments,'r') as f:
@@ -129,6 +136,31 @@ def importAlignmentsList (fAlignments):
 				
 		return offsetsList
 
+def importSummaryTable (fSummary):
+		'''
+		Creates the offsets list from the .csv summary table written by batch.py (see vaspirin.batch).
+		Each successful calculation becomes a band offset labeled by its folder name.
+		'''
+
+		try:
+			with open(fSummary,'r', newline='') as f:
+				rows = list(csv.DictReader (f))
+
+		except FileNotFoundError:
+			print ('Summary table not found. Please specify a valid filename.')
+			sys.exit()
+
+		offsetsList = []
+
+		for eachRow in rows:
+			if eachRow['status'] != 'ok' or not eachRow['vbm']:
+				continue
+
+			newOffset = Offsets (os.path.basename (os.path.normpath (eachRow['folder'])), eachRow['vbm'], eachRow['cbm'])
+			offsetsList.append(newOffset)
+
+		return offsetsList
+
 def printOffsetsList (offsetsList, args):
 		'''
 		A list of band offsets is received and printed using matplotlib.pyplot.
@@ -245,7 +277,7 @@ def parseArgs():
 									epilog= "Written by Daniel S. Koda (feb. 2017).",
 									prog="band_offsets.py")
 
-	parser.add_argument('input_file', default='ALIGNMENTS', help="ALIGNMENTS input file")
+	parser.add_argument('input_file', default='ALIGNMENTS', help="ALIGNMENTS input file, or a .csv summary table written by batch.py")
 	
 	parser.add_argument('-o', '--output', default='offsets.png', help="output name for the generated files with its format. Default: offsets.png")
 	
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import os
+from vaspirin import batch, cli, profiling
+import argparse
+
+################################
+## PARSING AND HELLO MESSAGES ##
+################################
+
+def parseArgs():
+	"""
+	Parse arguments from the command line. Uses the `argparse` package to
+	establish all positional and optional arguments.
+	"""
+
+	helloDescription = ("Painless VASP postprocessing tool\n" +
+						"Runs vaspirin analyses over many calculation folders in parallel\n" +
+						"Written by Daniel S. Koda and Ivan Guilhon\n" +
+						"Group of Semiconductor Materials and Nanotechnology\n" +
+						"Instituto Tecnologico de Aeronautica, Brazil\n" +
+						"http://www.gmsn.ita.br/?q=en")
+
+	parser = argparse.ArgumentParser(description=helloDescription,
+									epilog= "Last revision: Oct. 2026.",
+									prog="batch.py")
+
+	parser.add_argument('-q', '--quiet', action='store_true',
+						help="do not display text on the output window (default: False)")
+
+	parser.add_argument('-v', '--version', action='version', version='%(prog)s 2.0')
+
+	parser.add_argument('input_folders', nargs='+',
+						help="folders (or glob patterns, e.g. 'runs/*') in which the calculations can be found")
+
+	parser.add_argument('-a', '--analysis', nargs='+', default=['gap'],
+						choices=['bands', 'projected', 'orbital', 'dos', 'moments', 'gap'],
+						help="analyses to run in each folder (default: gap)")
+
+	parser.add_argument('-n', '--nprocs', type=cli.positive_int, default=None,
+						help="number of processes (default: number of CPUs)")
+
+	parser.add_argument('-o', '--output', default='batch_summary.dat',
+						help="name of the summary table. Use the extension .csv or .npz to choose" +
+						" these formats (default: batch_summary.dat)")
+
+	parser.add_argument('-m', '--moments_output', default='batch_moments.dat',
+						help="name of the table of integrated states and moments of the DOS, written with the moments analysis." +
+						" Use the extension .csv or .npz to choose these formats (default: batch_moments.dat)")
+
+	parser.add_argument('--moments_window', type=float, nargs=2, default=[None, None],
+						help="energy window (relative to the reference) of the integrals of the moments" +
+						" (default: the whole range of the DOS)",
+						metavar=('E_MIN', 'E_MAX'))
+
+	parser.add_argument('-l', '--alignments', default=None,
+						help="also write the band edges as an ALIGNMENTS file for band_offsets.py (default: None)")
+
+	# Band structure tweaking
+	parser.add_argument('-i', '--ignore', type=cli.positive_int, default=None,
+						help="ignore the first N k-points when plotting bands" +
+						" (default: the number of weighted k-points recorded in the KPOINTS header by gen_kpoints.py, or 0)")
+
+	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
+						help="set the y-axis range for the plots" +
+						" (default: -3 to 3).",
+						metavar=('Y_MIN', 'Y_MAX'))
+
+	parser.add_argument('-r', '--ref', default=None,
+						help="reference for the 0 eV (default: vbm for bands, e-fermi for dos)")
+
+	parser.add_argument('-w', '--window', action='store_true',
+						help="process only the bands crossing the y-axis range (default: False)")
+
+	parser.add_argument('-s', '--soc', action='store_true',
+						help="plot bands from non-collinear calculations (default: False)")
+
+	parser.add_argument('--groups', default=None, metavar='GROUPS',
+						help="groups of orbitals for the orbital analysis, separated by commas;" +
+						" orbitals in a group are joined by +, e.g. s,p,dz2,dxz+dyz (default: s,px+py,pz,d, plus f when present)")
+
+	parser.add_argument('-g', '--render', choices=['png', 'pdf', 'eps', 'svg'], default=None,
+						help="render the plots directly to images of this format with matplotlib," +
+						" instead of writing .dat and .bfile files for XMGrace (default: None)")
+
+	profiling.addProfileArguments (parser)
+
+	return parser.parse_args()
+
+def printHello ():
+	'''
+	Print hello message.
+	'''
+
+	print ("**********************")
+	print (" vaspirin v2.0: batch ")
+	print ("**********************")
+
+def printRunDescription (args, folders):
+	'''
+	Print description of the options chosen.
+	'''
+
+	leftJustSpace = 20
+	print ("folders:".ljust(leftJustSpace) + "%d" % len(folders))
+	print ("analyses:".ljust(leftJustSpace) + ' '.join(args.analysis))
+	print ("processes:".ljust(leftJustSpace) + "%d" % (args.nprocs or os.cpu_count()))
+	print ("summary table:".ljust(leftJustSpace) + "%s" % args.output)
+	if 'moments' in args.analysis:
+		print ("moments table:".ljust(leftJustSpace) + "%s" % args.moments_output)
+	print ("alignments file:".ljust(leftJustSpace) + "%s" % (args.alignments if args.alignments else "no"))
+	print ("")
+
+def buildSteps (args):
+	"""
+	Translates the chosen analyses into vaspirin steps (see vaspirin.cli)
+	"""
+
+	common = ['-y', str(args.yaxis[0]), str(args.yaxis[1])] + (['-g', args.render] if args.render else [])
+
+	bandsArgs = common + (['-i', str(args.ignore)] if args.ignore is not None else []) + (['-s'] if args.soc else []) + (['-w'] if args.window else []) + (['-r', args.ref] if args.ref else [])
+	dosArgs = common + (['-r', args.ref] if args.ref else [])
+
+	stepsDict = {
+		'bands' : ['bands'] + bandsArgs,
+		'projected' : ['bands', '--projected'] + bandsArgs,
+		'orbital' : ['bands', '--orbital'] + bandsArgs + (['--groups', args.groups] if args.groups else []),
+		'dos' : ['dos'] + dosArgs,
+	}
+
+	argv = []
+	for eachAnalysis in args.analysis:
+		argv += stepsDict.get (eachAnalysis, [])
+
+	return cli.parseSteps (['-q'] + argv)[1] if argv else []
+
+###################
+## MAIN FUNCTION ##
+###################
+
+def main():
+	'''
+	Runs the chosen analyses in all folders and writes a consolidated summary table
+	'''
+
+	args = parseArgs()
+	profiling.setup (args)
+	folders = batch.expandFolders (args.input_folders)
+
+	if not args.quiet:
+		printHello ()
+		printRunDescription (args, folders)
+
+	## The band structure summary is included whenever bands are analysed
+	summary = any (x in args.analysis for x in ['bands', 'projected', 'orbital', 'gap'])
+
+	results = batch.runBatch (folders, buildSteps (args), nProcs = args.nprocs, summary = summary,
+							  soc = args.soc, nKPTignore = args.ignore, quiet = args.quiet,
+							  moments = args.moments_window if 'moments' in args.analysis else None, ref = args.ref)
+
+	batch.writeSummary (results, args.output)
+
+	if 'moments' in args.analysis:
+		batch.writeMoments (results, args.moments_output)
+
+	if args.alignments:
+		batch.writeAlignments (results, args.alignments)
+
+	if not args.quiet:
+		nFailed = len([x for x in results if x.status != 'ok'])
+		print ("\n%d folder(s) analysed, %d failed. Summary written to %s" % (len(results), nFailed, args.output))
+
+if __name__ == "__main__":
+	main ()
@@ -5,6 +5,8 @@ import matplotlib
 import matplotlib.pyplot as plt
 import argparse
 import sys
+import os
+from vaspirin import outcar,procar,projection,datIO,binIO,profiling
 
 def make_cmap(colors, position=None, bit=False):
     '''
@@ -51,11 +53,15 @@ def parseArgs():
 									epilog= "Written by Daniel S. Koda (jan. 2017).",
 									prog="colored_bands.py")
 
-	parser.add_argument('-i', '--input_folder', default='bands_projected', help="projection data folder with .dat files. Default: bands_projected/")
+	parser.add_argument('-i', '--input_folder', default='bands_projected', help="projection data folder with .dat files, or binary bands file (.bin). Default: bands_projected/")
 	
 	parser.add_argument('-o', '--output', default='colorBands.eps', help="output name for the generated bands, including the figure type. Default: colorBands.eps")
 	
-	parser.add_argument('-b', '--bands', type=int, nargs=2, default=[1, 1], help="range of bands to be plotted (default: 1 to 1)", metavar=('BAND_MIN', 'BAND_MAX'))
+	parser.add_argument('-p', '--procar', action='store_true',
+						help="read the projections directly from the OUTCAR, PROCAR and PROJECTION files in the current folder," +
+						" instead of the .dat files in the input folder (default: False).")
+	
+	parser.add_argument('-b', '--bands', type=int, nargs=2, default=[1, 1], help="range of bands to be plotted, inclusive (default: 1 to 1)", metavar=('BAND_MIN', 'BAND_MAX'))
 	
 	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
 					help="set the y-axis range for the band structure" +
@@ -72,6 +78,10 @@ def parseArgs():
 					" (default: 4 inches by 3 inches).",
 					metavar=('WIDTH', 'HEIGHT'))	
 	
+	parser.add_argument('-c', '--cull', action='store_true',
+						help="draw only the bands crossing the y-axis window" +
+						" (default: False).")
+	
 	parser.add_argument('-l', '--legend', action='store_true',
 						help="display the color bar (legend) in the plot" +
 						" (default: False).")
@@ -82,6 +92,8 @@ def parseArgs():
 
 	parser.add_argument('-q', '--quiet', action='store_true', help="do not display text on the output window (default: False)")
 	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 
@@ -91,11 +103,12 @@ def printRunDescription (args):
 	'''
 	
 	leftJustSpace = 20
-	print ("input folder:".ljust(leftJustSpace) + "%s" % args.input_folder)
+	print ("input folder:".ljust(leftJustSpace) + ("OUTCAR, PROCAR and PROJECTION" if args.procar else "%s" % args.input_folder))
 	print ("output file:".ljust(leftJustSpace) + "%s" % args.output)
 	print ("bands to plot:".ljust(leftJustSpace) + "from band %d to %d" % (args.bands[0], args.bands[1]))
 	print ("xaxis limits:".ljust(leftJustSpace) + "from % 2.1f to % 2.1f" % (args.xaxis[0], args.xaxis[1]))
 	print ("yaxis limits:".ljust(leftJustSpace) + "from % 2.1f to % 2.1f" % (args.yaxis[0], args.yaxis[1]))
+	print ("cull bands?".ljust(leftJustSpace) + ("yes" if args.cull else "no"))
 	print ("include legend?".ljust(leftJustSpace) + ("yes" if args.legend else "no"))
 	print ("show plot?".ljust(leftJustSpace) + ("yes" if args.show else "no"))
 
@@ -106,6 +119,7 @@ def main():
 	'''
 	
 	args = parseArgs()
+	profiling.setup (args)
 	
 	if not args.quiet:
 		print ("****************************")
@@ -148,17 +162,37 @@ def main():
 	## Call the function make_cmap which returns your colormap
 	my_cmap = make_cmap(colors, bit=True)
 	
-	## Check what size is the marker
-	with open (args.input_folder + "/band01.dat", 'r') as f:
-		## Read the first line
-		l = f.readline().split()
+	## All bands are kept in a single array indexed as [band][k-point][column]
+	dat = datIO.DatFiles ()
+	
+	if args.procar:
+		bs = outcar.BandStructure (fOutcar = 'OUTCAR')
+		bandCharacter = procar.PROCAR ('PROCAR', projection.PROJECTION (fProjection = 'PROJECTION'))
+		
+		if args.bands[0] < 1 or args.bands[1] > bs.nBands:
+			print ("Band out of range! Check if you have correctly inserted the bands you want to draw.")
+			sys.exit(1)
 		
-		## Convert the first line to float numbers
-		l = [float(i) for i in l if i]
+		data = dat.arrayProjected (bs, bandCharacter)[args.bands[0]-1:args.bands[1]]
+	elif os.path.isfile (args.input_folder):
+		bandsFile = binIO.BandsFile (args.input_folder)
+		bands = np.arange (args.bands[0]-1, args.bands[1])
 		
-		## We find the marker size simply by summing the two contributions
-		markerSize = l[2] + l[3]
+		if not np.isin (bands, bandsFile.bands).all():
+			print ("Band out of range! Check if you have correctly inserted the bands you want to draw.")
+			sys.exit(1)
+		
+		data = bandsFile.array (bands = bands)
+	else:
+		data = dat.readBandFiles (args.input_folder, args.bands[0], args.bands[1])
+	
+	## We find the marker size simply by summing the contributions of the first point
+	markerSize = data[0,0,2:].sum()
 	
+	## Only bands with some point inside the window are drawn
+	if args.cull:
+		E = data[:,:,1]
+		data = data[np.any((E >= args.yaxis[0]) & (E <= args.yaxis[1]), axis=1)]
 	
 	## Norm for colors based on projected data
 	norm = matplotlib.colors.Normalize(vmin = 0, vmax = markerSize)
@@ -166,15 +200,8 @@ def main():
 	## Creates a figure for the 
 	fig = plt.figure (figsize=(args.size[0],args.size[1]))
 	
-	## Plot the specified bands
-	for i in range (args.bands[0], args.bands[1]):	
-		try:
-			k,E,p1,p2 = np.loadtxt (args.input_folder + ("/band%02d.dat" % i), unpack = True)
-		except FileNotFoundError:
-			print ("Band out of range! Check if you have correctly inserted the bands you want to draw.")
-			sys.exit(1)
-		
-		plt.scatter(k,E, c=p2, norm=norm, cmap=my_cmap, linewidth=0)
+	## Plot all the specified bands as a single collection
+	plt.scatter(data[:,:,0].ravel(), data[:,:,1].ravel(), c=data[:,:,3].ravel(), norm=norm, cmap=my_cmap, linewidth=0, rasterized=True)
 
 	
 	## Set the axis limits
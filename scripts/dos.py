@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 
 import sys
-from vaspirin import doscar,projection
-from vaspirin import graceIO,datIO
+from vaspirin import doscar,outcar,procar,projection,profiling
+from vaspirin import graceIO,datIO,pyplotIO
 import argparse
 
 ################################
@@ -67,6 +67,48 @@ def parseArgs():
 	parser.add_argument('-r', '--ref', default='e-fermi',
 						help="reference for the 0 eV in density of states (default: e-fermi)")
 	
+	parser.add_argument('-g', '--render', choices=['png', 'pdf', 'eps', 'svg'], default=None,
+						help="render the plot directly to an image of this format with matplotlib," +
+						" instead of writing .dat and .bfile files for XMGrace (default: None)")
+	
+	parser.add_argument('-e', '--eigenvalues', action='store_true',
+						help="build the density of states from the eigenvalues of the OUTCAR file (and the composition" +
+						" of the bands in the PROCAR file, if projected) instead of reading the DOSCAR file (default: False)")
+	
+	parser.add_argument('-i', '--ignore', type=positive_int, default=0,
+						help="ignore the first N k-points when building the DOS from eigenvalues (default: 0)")
+	
+	parser.add_argument('-s', '--soc', action='store_true',
+						help="build the DOS from the eigenvalues of non-collinear calculations (default: False)")
+	
+	parser.add_argument('--nedos', type=positive_int, default=doscar.BroadeningConstants.defaultNEDOS,
+						help="number of energies of the DOS built from eigenvalues (default: %d)" % doscar.BroadeningConstants.defaultNEDOS)
+	
+	parser.add_argument('--broaden', type=float, default=0.0, metavar='WIDTH',
+						help="broaden the density of states by convolution with a function of this width (in eV)," +
+						" on top of the smearing used by VASP. With -e, the width of the smearing of the eigenvalues" +
+						" (default: 0.0, no broadening, or %.2f eV with -e)" % doscar.BroadeningConstants.defaultWidth)
+	
+	parser.add_argument('--shape', choices=doscar.BroadeningConstants.shapes, default='gaussian',
+						help="shape of the broadening function. The width is the standard deviation of the gaussian" +
+						" or the half width at half maximum of the lorentzian (default: gaussian)")
+	
+	parser.add_argument('-m', '--moments', action='store_true',
+						help="also write the integrated states, center, width and skewness of the DOS of the system," +
+						" of each atom and, if projected, of each material, for each group of orbitals, to dosMoments.dat," +
+						" and the number of states below each energy to dosIntegrated.dat (default: False)")
+	
+	parser.add_argument('--moments_window', type=float, nargs=2, default=[None, None],
+						help="energy window (relative to the reference) of the integrals of the moments" +
+						" (default: the whole range of the DOS)",
+						metavar=('E_MIN', 'E_MAX'))
+	
+	parser.add_argument('--atoms', default=None,
+						help="atoms whose moments are written with -m, e.g. 1..3,7 (as in the PROJECTION file)." +
+						" Only these atoms are parsed from the DOSCAR file (default: all atoms)")
+	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printHello ():
@@ -84,19 +126,29 @@ def printRunDescription (args):
 	'''
 	
 	leftJustSpace = 20
-	print ("required files:".ljust(leftJustSpace) + "DOSCAR" + (", PROJECTION" if args.projected else ""))
+	if args.eigenvalues:
+		print ("required files:".ljust(leftJustSpace) + "OUTCAR" + (", PROCAR, PROJECTION" if args.projected or args.orbital else ""))
+	else:
+		print ("required files:".ljust(leftJustSpace) + "DOSCAR" + (", PROJECTION" if args.projected else ""))
 
 	print ("fill lines?".ljust(leftJustSpace) + ("yes" if args.fill else "no"))
 	print ("reference:".ljust(leftJustSpace) + "%s" % args.ref)
+	if args.eigenvalues:
+		print ("smearing:".ljust(leftJustSpace) + "%s, %.3f eV" % (args.shape, args.broaden if args.broaden > 0 else doscar.BroadeningConstants.defaultWidth))
+	else:
+		print ("broadening:".ljust(leftJustSpace) + ("%s, %.3f eV" % (args.shape, args.broaden) if args.broaden > 0 else "no"))
 	print ("energy axis:".ljust(leftJustSpace) + "from %.1f to %.1f" % (args.yaxis[0],args.yaxis[1]))
 	print ("DOS axis:".ljust(leftJustSpace) + "from 0.0 to %.1f" % (args.dos_axis))
 	print ("projected onto:".ljust(leftJustSpace) + ("orbitals" if args.orbital else "sites" if args.projected else "not projected"))
+	print ("moments:".ljust(leftJustSpace) + (("from %.1f to %.1f" % tuple(args.moments_window) if None not in args.moments_window else "whole range") if args.moments else "no"))
+	print ("output:".ljust(leftJustSpace) + ("%s image" % args.render if args.render else "XMGrace"))
 	print ("")
 
 ########################
 ## PLOTTING FUNCTIONS ##
 ########################
 
+@profiling.timed ('bfile')
 def printDOS (xmgrace, dos):
 	"""
 	Prints a .bfile for a common DOS
@@ -115,6 +167,7 @@ def printDOS (xmgrace, dos):
 		xmgrace.printDOSLabel (outputFile)
 		
 
+@profiling.timed ('bfile')
 def printDOSorbital (xmgrace, dos):
 	"""
 	Prints a .bfile for a band structure projected onto orbitals
@@ -131,6 +184,7 @@ def printDOSorbital (xmgrace, dos):
 		xmgrace.printDOSCharacter (outputFile, dos)
 		xmgrace.printDOSLabel (outputFile)
 
+@profiling.timed ('bfile')
 def printDOSprojected (xmgrace, dos):
 	"""
 	Prints a .bfile for a band structure projected onto the specified materials (file PROJECTION)
@@ -164,6 +218,7 @@ def main():
 	
 	## Parse arguments from the command line
 	args = parseArgs()
+	profiling.setup (args)
 	
 	## Print information on the screen only if the user wants to receive it
 	if not args.quiet:
@@ -174,6 +229,10 @@ def main():
 	dat = datIO.DatFiles ()
 	xmgrace = graceIO.Grace ()
 	
+	## Rendering directly to images uses the same settings as XMGrace
+	if args.render:
+		xmgrace = pyplotIO.Pyplot ()
+	
 	## Set whether the symbols are filled within xmgrace
 	xmgrace.setSymbolFill (args.fill)
 	
@@ -181,12 +240,64 @@ def main():
 	xmgrace.setXaxis (args.yaxis[0], args.yaxis[1])		
 	xmgrace.setYaxis (0, args.dos_axis)		
 	
-	## Set the DOS view for the plot
-	xmgrace.setView (graceIO.GraceConstants.dosView)
+	## Materials onto which the DOS is projected
+	prj = projection.PROJECTION (fProjection = 'PROJECTION') if args.projected else None
+	
+	## Builds the DOS from the eigenvalues, smeared with the chosen width
+	if args.eigenvalues:
+		bsData = outcar.BandStructure (fOutcar = 'OUTCAR', nKPTignore = args.ignore)
+		bsData.setSOC (args.soc)
+		
+		procarData = None
+		if args.orbital or args.projected:
+			procarData = procar.PROCAR ('PROCAR', prj or projection.PROJECTION (fProjection = 'PROJECTION'), nKPTignore = args.ignore)
+		
+		dos = doscar.BandsDOS (bsData, procarData, outcar.readWeights ('OUTCAR', args.ignore), nEDOS = args.nedos,
+							   width = args.broaden if args.broaden > 0 else doscar.BroadeningConstants.defaultWidth, shape = args.shape)
+		
+		if prj:
+			dos.setProjection (prj)
+			dos.sumContributions ()
+	else:
+		## The atoms are only parsed when needed, and the atomic blocks are summed onto orbitals
+		## and materials in a single pass over the DOSCAR file, one block at a time
+		dos = doscar.DOS(fDoscar = "DOSCAR", lazy = True, projection = prj)
+		
+		## Broadens the DOS on top of the smearing used by VASP
+		if args.broaden > 0:
+			dos.broaden (args.broaden, args.shape)
 	
-	dos = doscar.DOS(fDoscar = "DOSCAR")
 	dos.setReferenceString (args.ref)
 	
+	## Integrated states and moments of the DOS, also per material if projected
+	if args.moments:
+		dat.datMoments (*dos.momentsTable (args.moments_window, atoms = doscar.parseAtoms (args.atoms) if args.atoms else None))
+		dat.datIntegrated (dos)
+		
+		if not args.quiet:
+			print ("Integrated states and moments of the DOS written to dosMoments.dat and dosIntegrated.dat")
+	
+	## Images are rendered directly from the DOS in memory
+	if args.render:
+		if args.orbital:
+			fName = 'dosOrbital.' + args.render
+			xmgrace.plotDOSCharacter (dos, fName = fName)
+		elif args.projected:
+			xmgrace.setProjectedColors (prj.projectedColors)
+			fName = 'dosProjected.' + args.render
+			xmgrace.plotDOSProjected (dos, fName = fName)
+		else:
+			fName = 'dos.' + args.render
+			xmgrace.plotDOS (dos, fName = fName)
+		
+		if not args.quiet:
+			print ("Density of states rendered to " + fName)
+		
+		return
+	
+	## Set the DOS view for the plot
+	xmgrace.setView (graceIO.GraceConstants.dosView)
+	
 	## Atomic orbital-projected DOS
 	if args.orbital:
 		
@@ -198,10 +309,6 @@ def main():
 	
 	## Atomic site-projected DOS
 	elif args.projected:
-		prj = projection.PROJECTION (fProjection = 'PROJECTION')
-		dos.setProjection (prj)
-		dos.sumContributions ()
-		
 		dat.datDOSproj (dos)
 		
 		xmgrace.setProjectedColors (prj.projectedColors)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+from vaspirin import binIO, profiling
+import argparse
+
+def parseArgs():
+	"""
+	Parse arguments from the command line. Uses the `argparse` package to
+	establish all positional and optional arguments.
+	"""
+	
+	helloDescription = ("Exports binary bands files (bandsProjected.bin, bandsCharacter.bin)\n" +
+						"to the bandNN.dat files read by XMGrace\n" +
+						"Group of Semiconductor Materials and Nanotechnology\n" +
+						"Instituto Tecnologico de Aeronautica, Brazil\n" +
+						"http://www.gmsn.ita.br/?q=en"
+						)
+	
+	parser = argparse.ArgumentParser(description=helloDescription,
+									epilog= "Last revision: Oct. 2026.",
+									prog="export_bands.py")
+	
+	parser.add_argument('input_file', nargs='?', default='bandsProjected.bin',
+						help="binary bands file to be exported (default: bandsProjected.bin)")
+	
+	parser.add_argument('-q', '--quiet', action='store_true',
+						help="do not display text on the output window (default: False)")
+	
+	parser.add_argument('-m', '--marker', type=float, default=0.5,
+						help="size of the marker for projected bands (default: 0.5)")
+	
+	parser.add_argument('-o', '--output', default=None,
+						help="folder receiving the .dat files (default: bands_projected or bands_character)")
+	
+	profiling.addProfileArguments (parser)
+
+	return parser.parse_args()
+
+def main():
+	'''
+	Writes the legacy .dat files from a binary bands file
+	'''
+	
+	args = parseArgs()
+	profiling.setup (args)
+	
+	if not args.quiet:
+		print ("*****************************")
+		print (" vaspirin v2.0: export_bands ")
+		print ("*****************************")
+	
+	bandsFile = binIO.BandsFile (args.input_file)
+	folder = bandsFile.exportDat (args.output, markerSize = args.marker)
+	
+	if not args.quiet:
+		print ("%d bands exported to %s" % (bandsFile.nBands, folder))
+
+if __name__ == "__main__":
+	main ()
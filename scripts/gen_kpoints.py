@@ -1,115 +1,9 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
-import re
-import numpy as np
-import sys
-import math
+from vaspirin import kpath, kgrid, poscar, profiling
 import argparse
 
-class SymmetryDatabase (object):
-	"""
-	Class with specifications of symmetry points from various lattices.
-	Information taken from: W. Setyawan, S. Curtarolo / Computational Materials Science 49 (2010) 299–312
-	The terminology is also taken from this article
-	"""
-	
-	cub = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'M' : np.array([1/2, 1/2, 0], dtype=np.float),
-		'R' : np.array([1/2, 1/2, 1/2], dtype=np.float),
-		'X' : np.array([0, 1/2, 0], dtype=np.float),
-		}
-	'''
-	Cubic lattice
-	'''
-	
-	fcc = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'K' : np.array([3/8, 3/8, 3/4], dtype=np.float),
-		'L' : np.array([1/2, 1/2, 1/2], dtype=np.float),
-		'U' : np.array([5/8, 1/4, 5/8], dtype=np.float),
-		'W' : np.array([1/2, 1/4, 3/4], dtype=np.float),
-		'X' : np.array([1/2, 0, 1/2], dtype=np.float),
-		}
-	'''
-	Face-centered lattice
-	'''
-
-	bcc = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'P' : np.array([1/4, 1/4, 1/4], dtype=np.float),
-		'H' : np.array([1/2, -1/2, 1/2], dtype=np.float),
-		'N' : np.array([0, 0, 1/2], dtype=np.float),
-		}
-	'''
-	Body-centered lattice
-	'''
-	
-	tet = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'M' : np.array([1/2, 1/2, 0], dtype=np.float),
-		'A' : np.array([1/2, 1/2, 1/2], dtype=np.float),
-		'Z' : np.array([0, 0, 1/2], dtype=np.float),
-		'X' : np.array([0, 1/2, 0], dtype=np.float),
-		'R' : np.array([0, 1/2, 1/2], dtype=np.float),
-		}
-	'''
-	Tetragonal lattice
-	'''
-	
-	ort = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'R' : np.array([1/2, 1/2, 1/2], dtype=np.float),
-		'S' : np.array([1/2, 1/2, 0], dtype=np.float),
-		'T' : np.array([0, 1/2, 1/2], dtype=np.float),
-		'U' : np.array([1/2, 0, 1/2], dtype=np.float),
-		'X' : np.array([1/2, 0, 0], dtype=np.float),
-		'Y' : np.array([0, 1/2, 0], dtype=np.float),
-		'Z' : np.array([0, 0, 1/2], dtype=np.float),
-		}
-	'''
-	Orthorhombic lattice
-	'''
-
-	hex120deg = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'A' : np.array([0, 0, 1/2], dtype=np.float),
-		'H' : np.array([1/3, 1/3, 1/2], dtype=np.float),
-		'K' : np.array([1/3, 1/3, 0], dtype=np.float),
-		'M' : np.array([1/2, 0, 0], dtype=np.float),
-		'L' : np.array([1/2, 0, 1/2], dtype=np.float),
-		}
-	'''
-	Hexagonal lattice (120 deg between direct lattice vectors)
-	'''
-	
-	hex60deg = {
-		'G' : np.array([0, 0, 0], dtype=np.float),
-		'A' : np.array([0, 0, 1/2], dtype=np.float),
-		'H' : np.array([2/3, 1/3, 1/2], dtype=np.float),
-		'K' : np.array([2/3, 1/3, 0], dtype=np.float),
-		'M' : np.array([1/2, 0, 0], dtype=np.float),
-		'L' : np.array([1/2, 0, 1/2], dtype=np.float),
-		}
-	'''
-	Hexagonal lattice (120 deg between direct lattice vectors)
-	'''
-	
-	lattices = {
-		'cub' : cub,
-		'fcc' : fcc,
-		'bcc': bcc,
-		'hex120deg' : hex120deg,
-		'hex60deg' : hex60deg,
-		'ort' : ort,
-		'tet' : tet,
-	}
-	'''
-	A dictionary of all lattices implemented
-	'''
-	
-	
 def parseArgs():
 	"""
 	Parse arguments from the command line. Uses the `argparse` package to
@@ -119,23 +13,40 @@ def parseArgs():
 									epilog= "Written by Daniel S. Koda (feb. 2017).",
 									prog="gen_kpoints.py")
 
-	parser.add_argument('kpt_path', nargs='+', help="Path of symmetry points")
+	parser.add_argument('kpt_path', nargs='*', help="Path of symmetry points, in which | marks a jump between two points (default: the path recommended for the lattice)")
 	
 	parser.add_argument('-o', '--output', default='KPOINTS_gen', help="output name for the generated files. Default: KPOINTS_gen")
 	
 	parser.add_argument('-n', '--number', type=int, default=10, help="number of k-points between symmetry points (default: 10)")
 	
-	parser.add_argument('-p', '--proportional', action='store_true', help="create a path with a number of k-points between symmetry points proportional to the path length (requires an OUTCAR file)")
+	parser.add_argument('-p', '--proportional', action='store_true', help="create a path with a number of k-points between symmetry points proportional to the path length (requires an OUTCAR file, or a POSCAR file with --poscar)")
 	
-	parser.add_argument('-i', '--ibzkpt', action='store_true',
+	parser.add_argument('--poscar', default=None, help="read the lattice from this POSCAR file instead of the OUTCAR file for a proportional path, or for the automatic lattice and the grid (default: None, or POSCAR for the automatic lattice and the grid)")
+	
+	weighted = parser.add_mutually_exclusive_group()
+	
+	weighted.add_argument('-i', '--ibzkpt', action='store_true',
 					help="import a IBZKPT file to put before the document. Useful for preparing HSE06 calculations")
 	
-	parser.add_argument('-l', '--lattice', choices=list(SymmetryDatabase.lattices.keys()), default='hex60deg', help="lattice type (default: hex60deg)")
+	weighted.add_argument('-g', '--grid', type=int, nargs=3, default=None, metavar=('N1', 'N2', 'N3'),
+					help="put a uniform grid of k-points, reduced by the point group of the lattice of the POSCAR file (or --poscar), before the path." +
+					" Without a path, only the grid is written, e.g. for DOS calculations (default: None)")
+	
+	parser.add_argument('--ibzkpt_file', default='IBZKPT', help="name of the IBZKPT file imported with -i (default: IBZKPT)")
+	
+	parser.add_argument('--gamma', action='store_true', help="use a Gamma-centred grid instead of a Monkhorst-Pack one (default: False)")
+	
+	parser.add_argument('--no_symmetry', action='store_true',
+					help="reduce the grid only by time reversal, e.g. when the atoms break the symmetry of the lattice (default: False)")
+	
+	parser.add_argument('-l', '--lattice', choices=kpath.latticeNames() + ['auto'], default='hex60deg', help="lattice type, or auto to classify the lattice of the POSCAR file (default: hex60deg)")
 	
 	parser.add_argument('-w', '--weight', type=float, default=1.0, help="weight of the k-points created (Default: 1)")
 	
 	parser.add_argument('-q', '--quiet', action='store_true', help="do not display text on the output window (default: False)")
 	
+	profiling.addProfileArguments (parser)
+	
 	return parser.parse_args()
 
 def printRunDescription (args):
@@ -146,113 +57,59 @@ def printRunDescription (args):
 	leftJustSpace = 20
 	print ("output file:".ljust(leftJustSpace) + "%s" % args.output)
 	print ("Bravais lattice:".ljust(leftJustSpace) + "%s" % args.lattice)
-	print ("path:".ljust(leftJustSpace) + ' '.join(args.kpt_path))	
+	print ("path:".ljust(leftJustSpace) + (' '.join(args.kpt_path) if args.kpt_path else "default"))
 	print ("number of k-points:".ljust(leftJustSpace) + "%d" % args.number)
 	print ("k-points weight:".ljust(leftJustSpace) + "%2.1f" % args.weight)
-	print ("proportional?".ljust(leftJustSpace) + ("yes (requires OUTCAR)" if args.proportional else "no"))
-	print ("include IBZKPT?".ljust(leftJustSpace) + ("yes" if args.ibzkpt else "no"))
+	print ("proportional?".ljust(leftJustSpace) + (("yes (lattice from %s)" % (args.poscar if args.poscar else "OUTCAR")) if args.proportional else "no"))
+	print ("include IBZKPT?".ljust(leftJustSpace) + (("yes (%s)" % args.ibzkpt_file) if args.ibzkpt else "no"))
+	print ("grid:".ljust(leftJustSpace) + (("%dx%dx%d (%s)" % (tuple(args.grid) + ("Gamma-centred" if args.gamma else "Monkhorst-Pack",))) if args.grid else "no"))
 
 def genKPT (args):
 	'''
 	Generates KPOINTS file based on the requested properties
 	'''
 	
-	## Importing properties
-	path = args.kpt_path
-	nKpt = args.number
-
-	## Creates the path
-	xPath = np.array([])
-	yPath = np.array([])
-	zPath = np.array([])
-	symIndex = [0]
-
-	pathDict = SymmetryDatabase.lattices.get(args.lattice)
-
-	## If the option to merge with a IBZKPT file is set, then import this file fist
-	if args.ibzkpt:
-		with open ("IBZKPT", 'r') as ibzkpt_file:
-			ibzkpt_file.readline() # Throws away the comment line
-			n_ibzkpt = int (ibzkpt_file.readline().strip())
-			ibzkpt_file.readline() # Throws away the "Reciprocal lattice" line
-			
-			## Read all k-points and throw away blank space
-			ibzkpt_kpoints = ""
-			for i in range (n_ibzkpt):
-				ibzkpt_kpoints += ibzkpt_file.readline()
-			
-			
-	## Read the reciprocal vectors from OUTCAR to create a proportional path
-	if args.proportional:
-		info = []
-		with open("OUTCAR", 'r') as input_file:
-			found_vectors = 0;
-			i=0;
-			for line in input_file:
-				if found_vectors:
-					info.append (re.split(' +', line.rstrip('\n')))
-					i += 1;
-				if "reciprocal lattice vectors" in line:
-					found_vectors = 1;
-				if i == 3:
-					break;
-		
-		## Reciprocal lattice vectors
-		vec = [[float(info[i][-3]), float(info[i][-2]), float(info[i][-1])] for i in range (3)]
-		## Reciprocal lattice vectors norm
-		recVec = np.array([np.linalg.norm(vec[i]) for i in range (3)])
-		
-		## Creates a step proportional to the minimum distance between two points
-		minDistance = min([np.linalg.norm(pathDict.get(path[i-1]) * recVec - pathDict.get(path[i]) * recVec) for i in range(1,len(path))])
-		kStep = minDistance/nKpt
-				
-				
-	for i in range (1,len(path)):
-		## Avoid calculations with two sequential points
-		if (len(xPath) > 0):
-			xPath = np.delete (xPath, -1)
-			yPath = np.delete (yPath, -1)
-			zPath = np.delete (zPath, -1)
+	## Uniform grid, reduced by the point group of the lattice
+	if args.grid:
+		operations = None if args.no_symmetry else kgrid.pointGroup (poscar.POSCAR (args.poscar or 'POSCAR').lattice)
+		kGrid, weights = kgrid.reduceGrid (kgrid.uniformGrid (args.grid, args.gamma), operations)
 		
-		## Decides how many points will be created between symmetry points
-		if args.proportional:
-			nPoints = math.ceil(np.linalg.norm(pathDict.get(path[i-1]) * recVec - pathDict.get(path[i]) * recVec)/kStep)
-		else:
-			nPoints = nKpt
+		if not args.quiet:
+			print ("reduced grid:".ljust(20) + "%d of %d" % (len(kGrid), weights.sum()))
 		
-		symIndex = symIndex + [symIndex[-1] + nPoints - 1]
+		## Without a path, the KPOINTS file holds only the grid
+		if not args.kpt_path:
+			kgrid.writeGrid (args.output, kGrid, weights, "%dx%dx%d %s grid" % (tuple(args.grid) + ("Gamma-centred" if args.gamma else "Monkhorst-Pack",)))
+			return
+	
+	## The Bravais lattice is found from the POSCAR file, if requested
+	if args.lattice == 'auto':
+		args.poscar = args.poscar or 'POSCAR'
+		lattice, parameters, transform = kpath.classifyLattice (poscar.POSCAR (args.poscar).lattice)
 		
-		## Appends the new path
-		xPath = np.concatenate([xPath, np.linspace (pathDict.get(path[i-1])[0], pathDict.get(path[i])[0], nPoints)])
-		yPath = np.concatenate([yPath, np.linspace (pathDict.get(path[i-1])[1], pathDict.get(path[i])[1], nPoints)])
-		zPath = np.concatenate([zPath, np.linspace (pathDict.get(path[i-1])[2], pathDict.get(path[i])[2], nPoints)])
-
+		if not args.quiet:
+			print ("detected lattice:".ljust(20) + "%s" % lattice)
+	else:
+		lattice, parameters, transform = args.lattice, None, None
+	
+	## Coordinates of the symmetry points of the path
+	path, breaks = kpath.parsePath (args.kpt_path or kpath.latticeEntry (lattice)['path'])
+	points = kpath.symmetryPoints (path, lattice, parameters, transform)
+	
+	## The number of points between symmetry points is proportional to the distance between them
+	## in the reciprocal lattice, if requested
+	recLattice = kpath.readRecLattice ('OUTCAR', args.poscar) if args.proportional else None
+	
+	kpoints, symIndex = kpath.buildPath (points, kpath.segmentPoints (points, args.number, recLattice, breaks))
+	
+	## If the option to merge with a IBZKPT file (or a grid) is set, then its k-points are streamed first
+	if args.grid:
+		ibzkpt = (len(kGrid), [kgrid.gridLines (kGrid, weights)])
+	else:
+		ibzkpt = kpath.readIBZKPT (args.ibzkpt_file) if args.ibzkpt else None
+	
 	## Write path to file
-	with open (args.output, 'w') as output_file:
-		
-		## Plot the comment, which is useful for plotting with XMGrace
-		for i in range(len(path)):
-			output_file.write ("%s %d" % (path[i],symIndex[i]))
-			
-			if i != len(path) - 1:
-				output_file.write (', ')
-				
-		output_file.write ('\n')
-		
-		## Plot the number of k-points in the file
-		if args.ibzkpt:
-			output_file.write ('%d\n' % (len(xPath) + n_ibzkpt))
-		else:
-			output_file.write ('%d\n' % len(xPath))
-			
-		output_file.write ('Reciprocal lattice\n')
-		
-		## Plot the k-points in the file
-		if args.ibzkpt:
-			output_file.write (ibzkpt_kpoints)
-			
-		for i in range (len(xPath)):
-			output_file.write ("%.15f    %.15f    %.15f    %.4f\n" % (xPath[i], yPath[i], zPath[i], args.weight))
+	kpath.writeKpoints (args.output, kpoints, path, symIndex, args.weight, ibzkpt, breaks)
 
 def main():
 	'''
@@ -260,6 +117,7 @@ def main():
 	'''
 	
 	args = parseArgs()
+	profiling.setup (args)
 	
 	if not args.quiet:
 		print ("****************************")
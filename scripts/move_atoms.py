@@ -1,7 +1,7 @@
 #/usr/bin/env python3
 # coding: utf-8
 
-from vaspirin import poscar
+from vaspirin import poscar, profiling
 import numpy as np
 import argparse
 import copy
@@ -29,6 +29,8 @@ def parseArgs():
 	
 	parser.add_argument('-q', '--quiet', action='store_true', help="do not display text on the output window (default: False)")
 	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printRunDescription (args):
@@ -77,6 +79,7 @@ def main():
 	'''
 	
 	args = parseArgs()
+	profiling.setup (args)
 	
 	## Setting the default output to the input filename
 	args.output = args.output if args.output else args.input_file	
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 
-import sys
-from vaspirin import outcar,procar,projection
-from vaspirin import graceIO,datIO
+import sys, time
+from vaspirin import outcar,procar,projection,watch,profiling
+from vaspirin import graceIO,datIO,pyplotIO
 import argparse
 
 ################################
@@ -51,10 +51,20 @@ def parseArgs():
 	parser.add_argument('-p', '--projected', action='store_true',
 						help="generate band structures projected onto atomic sites with XMGrace" +
 						" (default: False).")
+	
+	parser.add_argument('--groups', type=procar.parseOrbitalGroups, default=None, metavar='GROUPS',
+						help="groups of orbitals onto which the bands are projected with -o, separated by commas;" +
+						" orbitals in a group are joined by +, e.g. s,p,dz2,dxz+dyz (default: s,px+py,pz,d, plus f when present)")
+	
+	parser.add_argument('-j', '--joint', type=procar.parseJointSpecs, default=None, metavar='SPECS',
+						help="generate band structures projected onto orbitals of groups of ions, given as IONS:ORBITALS" +
+						" separated by commas, where IONS are materials of the PROJECTION file or ions joined by +," +
+						" e.g. Mo:dz2,S:pz,1..3:d (default: None)")
 						
 	# Band structure tweaking					
-	parser.add_argument('-i', '--ignore', type=positive_int, default=0,
-						help="ignore the first N k-points when plotting bands (default: 0)")
+	parser.add_argument('-i', '--ignore', type=positive_int, default=None,
+						help="ignore the first N k-points when plotting bands" +
+						" (default: the number of weighted k-points recorded in the KPOINTS header by gen_kpoints.py, or 0)")
 	
 	parser.add_argument('-t', '--interpolate', type=positive_int, default=0,
 						help="interpolate N k-points between each pair of k-points when plotting bands (default: 0)")
@@ -64,6 +74,10 @@ def parseArgs():
 	
 	parser.add_argument('-f', '--fill', action='store_true',
 						help="whether or not fill the symbols in the plot (default: False)")
+	
+	parser.add_argument('--compact', action='store_true',
+						help="write the settings shared by the sets of projected bands only once in the .bfile," +
+						" as XMGrace defaults, making it smaller and faster to load (default: False)")
 						
 	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
 						help="set the y-axis range for the band structure" +
@@ -73,9 +87,27 @@ def parseArgs():
 	parser.add_argument('-r', '--ref', default='vbm',
 						help="reference for the 0 eV in band structures (default: vbm)")
 
+	parser.add_argument('-b', '--binary', action='store_true',
+						help="write the projections to a single binary file instead of one .dat file per band;" +
+						" the .dat files can be exported later with export_bands.py (default: False)")
+
+	parser.add_argument('-w', '--window', action='store_true',
+						help="process only the bands crossing the y-axis range, skipping the other ones" +
+						" when reading the PROCAR file and writing .dat files (default: False)")
+
 	parser.add_argument('-s', '--soc', action='store_true',
 						help="plot bands from non-collinear calculations (default: False)")
 	
+	parser.add_argument('--watch', type=float, nargs='?', const=10.0, default=None, metavar='SECONDS',
+						help="keep watching OUTCAR (and PROCAR) while VASP writes them, updating the .dat files" +
+						" with the new k-points every SECONDS until all k-points are read (default: 10 s)")
+	
+	parser.add_argument('-g', '--render', choices=['png', 'pdf', 'eps', 'svg'], default=None,
+						help="render the plot directly to an image of this format with matplotlib," +
+						" instead of writing .dat and .bfile files for XMGrace (default: None)")
+	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printHello ():
@@ -93,23 +125,29 @@ def printRunDescription (args):
 	'''
 	
 	leftJustSpace = 20
-	print ("required files:".ljust(leftJustSpace) + "OUTCAR, KPOINTS" + (", PROCAR" if (args.projected or args.orbital) else "") + (", PROJECTION" if args.projected else ""))
+	print ("required files:".ljust(leftJustSpace) + "OUTCAR, KPOINTS" + (", PROCAR" if (args.projected or args.orbital or args.joint) else "") + (", PROJECTION" if (args.projected or args.joint) else ""))
 
-	if (args.projected or args.orbital):
+	if (args.projected or args.orbital or args.joint):
 		print ("marker size:".ljust(leftJustSpace) + "%.2f" % (args.marker))
 		print ("fill markers?".ljust(leftJustSpace) + ("yes" if args.fill else "no"))
 
 	print ("reference:".ljust(leftJustSpace) + "%s" % args.ref)
-	print ("ignoring:".ljust(leftJustSpace) + "%d k-point(s)" % args.ignore)
+	print ("ignoring:".ljust(leftJustSpace) + ("%d k-point(s)" % args.ignore if args.ignore is not None else "weighted k-points in KPOINTS"))
 	print ("interpolating:".ljust(leftJustSpace) + "%d k-point(s)" % args.interpolate)
 	print ("y axis:".ljust(leftJustSpace) + "from %.1f to %.1f" % (args.yaxis[0],args.yaxis[1]))
-	print ("projected onto:".ljust(leftJustSpace) + ("orbitals" if args.orbital else "sites" if args.projected else "not projected"))
+	print ("bands in window?".ljust(leftJustSpace) + ("yes" if args.window else "no"))
+	print ("projected onto:".ljust(leftJustSpace) + ("ions and orbitals (%s)" % ', '.join(args.joint) if args.joint else "orbitals (%s)" % ', '.join(args.groups or ['default groups']) if args.orbital else "sites" if args.projected else "not projected"))
+	print ("output:".ljust(leftJustSpace) + ("%s image" % args.render if args.render else "XMGrace"))
+	
+	if args.watch:
+		print ("watching every:".ljust(leftJustSpace) + "%.1f s" % args.watch)
 	print ("")
 
 ########################
 ## PLOTTING FUNCTIONS ##
 ########################
 
+@profiling.timed ('bfile')
 def printBandStructure (xmgrace, bands):
 	"""
 	Prints a .bfile for a common band structure
@@ -129,19 +167,35 @@ def printBandStructure (xmgrace, bands):
 		if xmgrace.exportPS:
 			xmgrace.printExportPS (outputFile, self.psFilename)
 
-def printBandCharacter (xmgrace, bands):
+@profiling.timed ('bfile')
+def printBandCharacter (xmgrace, bands, nOrbitals=4):
 	"""
-	Prints a .bfile for a band structure projected onto orbitals
+	Prints a .bfile for a band structure projected onto nOrbitals groups of orbitals
 	"""
 	
 	## Read the file
 	with open ('bandsCharacter.bfile', 'w') as outputFile:				
 		
 		xmgrace.printFontSection (outputFile)
-		xmgrace.printTracesCharacter (outputFile, bands)
+		xmgrace.printTracesCharacter (outputFile, bands, nOrbitals)
+		xmgrace.printAxis (outputFile, bands)
+		xmgrace.printLabel (outputFile)
+
+@profiling.timed ('bfile')
+def printBandJoint (xmgrace, bands, nSpecs):
+	"""
+	Prints a .bfile for a band structure projected onto nSpecs joint projections onto ions and orbitals
+	"""
+	
+	## Read the file
+	with open ('bandsJoint.bfile', 'w') as outputFile:
+		
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printTracesCharacter (outputFile, bands, nSpecs, folder='bands_joint')
 		xmgrace.printAxis (outputFile, bands)
 		xmgrace.printLabel (outputFile)
 
+@profiling.timed ('bfile')
 def printBandProjected (xmgrace, bands, projectedBands):
 	"""
 	Prints a .bfile for a band structure projected onto the specified materials (file PROJECTION)
@@ -158,6 +212,69 @@ def printBandProjected (xmgrace, bands, projectedBands):
 
 			
 
+def watchBands (args, xmgrace):
+	"""
+	Watches the OUTCAR (and PROCAR) files while VASP writes them. Only the k-points appended
+	since the last check are parsed, and the .dat files are updated every args.watch seconds
+	until all k-points have been read. Interpolation, energy windows, joint projections and
+	rendering are not available in this mode.
+	"""
+	
+	watch.waitFor ('OUTCAR', watch.outcarReady, args.watch)
+	
+	bsData = watch.WatchedBandStructure (nKPTignore = args.ignore)
+	bsData.setSOC (args.soc)
+	bsData.setReferenceString (args.ref)
+	
+	outcarState = watch.FileState ('OUTCAR')
+	procarState = watch.FileState ('PROCAR')
+	
+	if args.orbital or args.projected:
+		watch.waitFor ('PROCAR', watch.procarReady, args.watch)
+		
+		prj = projection.PROJECTION (fProjection = 'PROJECTION')
+		procarData = watch.WatchedPROCAR ('PROCAR', prj, nKPTignore = args.ignore, groups = args.groups)
+	
+	if args.orbital:
+		writer = watch.BandFilesWriter ('bands_character', markerSize = args.marker)
+		printBandCharacter (xmgrace, bsData, len(procarData.orbitalGroups))
+	elif args.projected:
+		writer = watch.BandFilesWriter ('bands_projected', markerSize = args.marker)
+		xmgrace.setProjectedColors (prj.projectedColors)
+		printBandProjected (xmgrace, bsData, procarData)
+	else:
+		printBandStructure (xmgrace, bsData)
+	
+	try:
+		while True:
+			nNew = bsData.update () if outcarState.changed () else 0
+			
+			if args.orbital or args.projected:
+				if procarState.changed ():
+					nNew += procarData.update ()
+				complete = bsData.complete () and procarData.complete ()
+			else:
+				complete = bsData.complete ()
+			
+			if nNew:
+				if args.orbital:
+					writer.write (bsData, procarData.orbitalContributions)
+				elif args.projected:
+					writer.write (bsData, procarData.materialContributions)
+				else:
+					watch.writeEigenvals (bsData)
+				
+				if not args.quiet:
+					print ("%d of %d k-points read" % (len(bsData.eigenvals), len(bsData.path)))
+			
+			if complete:
+				break
+			
+			time.sleep (args.watch)
+	
+	except KeyboardInterrupt:
+		print ("\nStopped watching with %d of %d k-points read" % (len(bsData.eigenvals), len(bsData.path)))
+
 ################################
 ## MAIN FUNCTION FOR VASPIRIN ##
 ################################
@@ -172,6 +289,7 @@ def main():
 	
 	## Parse arguments from the command line
 	args = parseArgs()
+	profiling.setup (args)
 	
 	## Print information on the screen only if the user wants to receive it
 	if not args.quiet:
@@ -182,6 +300,12 @@ def main():
 	dat = datIO.DatFiles ()
 	dat.setInterpolateOptions (args.interpolate)
 	xmgrace = graceIO.Grace ()
+	xmgrace.setCompact (args.compact)
+	
+	## Rendering directly to images uses the same settings as XMGrace
+	if args.render:
+		xmgrace = pyplotIO.Pyplot ()
+		xmgrace.setMarkerSize (args.marker)
 	
 	# Reading the KPOINTS file:
 	try:
@@ -195,35 +319,110 @@ def main():
 	## Set the range of the y axis
 	xmgrace.setYaxis (args.yaxis[0], args.yaxis[1])		
 		
+	## Keep the .dat files updated while VASP writes the files
+	if args.watch and args.joint:
+		print ("Joint projections are not available in watch mode! Exiting...\n")
+		sys.exit (1)
+	
+	if args.watch:
+		watchBands (args, xmgrace)
+		return
+	
 	bsData = outcar.BandStructure (nKPTignore = args.ignore)
 	bsData.setSOC (args.soc)
 	bsData.setReferenceString (args.ref)
 	
+	## Only the bands crossing the y axis are processed
+	if args.window:
+		bsData.setEnergyWindow (args.yaxis[0], args.yaxis[1])
+	
+	## Band structure projected onto orbitals of groups of ions
+	if args.joint and args.render:
+		prj = projection.PROJECTION (fProjection = 'PROJECTION')
+		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore, bands = bsData.selectedBands())
+		procarData.setJointSpecs (args.joint)
+		
+		xmgrace.plotBandsJoint (bsData, procarData, fName = 'bandsJoint.' + args.render)
+		
+		if not args.quiet:
+			print ("Band structure rendered to bandsJoint." + args.render)
+	
+	elif args.joint:
+		prj = projection.PROJECTION (fProjection = 'PROJECTION')
+		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore, bands = bsData.selectedBands())
+		procarData.setJointSpecs (args.joint)
+		
+		if args.binary:
+			dat.binJoint (bsData, procarData)
+		else:
+			dat.datJoint (bsData, procarData)
+		printBandJoint (xmgrace, bsData, len(args.joint))
+		
+		if not args.quiet:
+			if args.binary:
+				print ("Export the .dat files from the binary file:\n export_bands.py bandsJoint.bin -m %.2f" % args.marker)
+			print ("Print the results using XMgrace:\n xmgrace -batch bandsJoint.bfile")
+	
 	## Atomic orbital-projected band structure
-	if args.orbital:
+	elif args.orbital and args.render:
+		prj = projection.PROJECTION (fProjection = 'PROJECTION')
+		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore, bands = bsData.selectedBands(), groups = args.groups)
+		
+		xmgrace.plotBandsCharacter (bsData, procarData, fName = 'bandsCharacter.' + args.render)
+		
+		if not args.quiet:
+			print ("Band structure rendered to bandsCharacter." + args.render)
+	
+	elif args.orbital:
 		prj = projection.PROJECTION (fProjection = 'PROJECTION')
-		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore)
+		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore, bands = bsData.selectedBands(), groups = args.groups)
 		
-		dat.datCharacter (bsData, procarData)
-		printBandCharacter (xmgrace, bsData)
+		if args.binary:
+			dat.binCharacter (bsData, procarData)
+		else:
+			dat.datCharacter (bsData, procarData)
+		printBandCharacter (xmgrace, bsData, len(procarData.orbitalGroups))
 		
 		if not args.quiet:
+			if args.binary:
+				print ("Export the .dat files from the binary file:\n export_bands.py bandsCharacter.bin -m %.2f" % args.marker)
 			print ("Print the results using XMgrace:\n xmgrace -batch bandsCharacter.bfile")
 	
 	## Atomic site-projected band structure	
+	elif args.projected and args.render:
+		prj = projection.PROJECTION (fProjection = 'PROJECTION')
+		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore, bands = bsData.selectedBands(), groups = args.groups)
+		
+		xmgrace.setProjectedColors (prj.projectedColors)
+		xmgrace.plotBandsProjected (bsData, procarData, fName = 'bandsProjected.' + args.render)
+		
+		if not args.quiet:
+			print ("Band structure rendered to bandsProjected." + args.render)
+	
 	elif args.projected:
 		prj = projection.PROJECTION (fProjection = 'PROJECTION')
-		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore)
+		procarData = procar.PROCAR ('PROCAR', prj, nKPTignore = args.ignore, bands = bsData.selectedBands(), groups = args.groups)
 		
-		dat.datProjected (bsData, procarData)
+		if args.binary:
+			dat.binProjected (bsData, procarData)
+		else:
+			dat.datProjected (bsData, procarData)
 		
 		xmgrace.setProjectedColors (prj.projectedColors)
 		printBandProjected (xmgrace, bsData, procarData)
 		
 		if not args.quiet:
+			if args.binary:
+				print ("Export the .dat files from the binary file:\n export_bands.py bandsProjected.bin -m %.2f" % args.marker)
 			print ("Print the results using XMgrace:\n xmgrace -batch bandsProjected.bfile")
 	
 	## Standard band structure	
+	elif args.render:
+		xmgrace.plotBands (bsData, fName = 'bands.' + args.render)
+		
+		if not args.quiet:
+			print ("Band structure rendered to bands." + args.render)
+	
 	else:
 		dat.datEigenvals (bsData)
 		printBandStructure (xmgrace, bsData)
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
-import sys
-from vaspirin import outcar,graceIO,datIO
+import sys, os
+from vaspirin import outcar,graceIO,datIO,pyplotIO,profiling
 import argparse
 
+defaultColors = ['black', 'red', 'blue', 'green', 'orange', 'violet', 'cyan', 'magenta', 'brown', 'indigo', 'maroon', 'turquoise']
+'''
+Colors used, in sequence, when the user does not specify them
+'''
+
 ################################
 ## PARSING AND HELLO MESSAGES ##
 ################################
@@ -43,32 +48,43 @@ def parseArgs():
 	parser.add_argument('-v', '--version', action='version', version='%(prog)s 1.2')
 						
 	# Band structure options					
-	parser.add_argument('input_folders', nargs=2,
-						help="paths to the folders in which the calculations can be found")
+	parser.add_argument('input_folders', nargs='+',
+						help="paths to the folders in which the calculations can be found (two or more)")
 						
 	# Band structure tweaking					
-	parser.add_argument('-i', '--ignore', type=positive_int, default=0,
-						help="ignore the first N k-points when plotting bands (default: 0)")
+	parser.add_argument('-i', '--ignore', type=positive_int, default=None,
+						help="ignore the first N k-points when plotting bands" +
+						" (default: the number of weighted k-points recorded in the KPOINTS header by gen_kpoints.py, or 0)")
 	
 	parser.add_argument('-t', '--interpolate', type=positive_int, default=0,
 						help="interpolate N k-points between each pair of k-points when plotting bands (default: 0)")
 						
-	parser.add_argument('-c', '--colors', nargs = 2, default=['black','red'],
-						help="colors of the bands to be compared (default: black and red)",
-						metavar=('COLOR_1', 'COLOR_2'))
+	parser.add_argument('-c', '--colors', nargs = '+', default=defaultColors,
+						help="colors of the bands to be compared, one per folder (default: black, red, blue, ...)",
+						metavar='COLOR')
 						
 	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
 						help="set the y-axis range for the band structure" +
 						" (default: -3 to 3).",
 						metavar=('Y_MIN', 'Y_MAX'))					
 
-	parser.add_argument('-r', '--ref', nargs = 2, default=['e-fermi','e-fermi'],
-						help="reference for the 0 eV in band structures (default: e-fermi for both)",
-						metavar=('REF_1', 'REF_2'))
+	parser.add_argument('-r', '--ref', nargs = '+', default=['e-fermi'],
+						help="reference for the 0 eV in band structures, one per folder." +
+						" A single reference is used for all folders (default: e-fermi for all)",
+						metavar='REF')
+
+	parser.add_argument('-n', '--nprocs', type=positive_int, default=None,
+						help="number of processes used to read the OUTCAR files (default: number of CPUs)")
 
 	parser.add_argument('-s', '--soc', action='store_true',
 						help="plot bands from non-collinear calculations (default: False)")
 	
+	parser.add_argument('-g', '--render', choices=['png', 'pdf', 'eps', 'svg'], default=None,
+						help="render the plot directly to an image of this format with matplotlib," +
+						" instead of writing .dat and .bfile files for XMGrace (default: None)")
+	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printHello ():
@@ -87,9 +103,10 @@ def printRunDescription (args):
 	
 	leftJustSpace = 20
 	print ("required files:".ljust(leftJustSpace) + "OUTCAR, KPOINTS")
-	print ("colors:".ljust(leftJustSpace) + "%s and %s" % (args.colors[0],args.colors[1]))
-	print ("references:".ljust(leftJustSpace) + "%s and %s" % (args.ref[0],args.ref[1]))
-	print ("ignoring:".ljust(leftJustSpace) + "%d k-point(s)" % args.ignore)
+	print ("folders:".ljust(leftJustSpace) + ', '.join(args.input_folders))
+	print ("colors:".ljust(leftJustSpace) + ', '.join(args.colors[:len(args.input_folders)]))
+	print ("references:".ljust(leftJustSpace) + ', '.join(args.ref))
+	print ("ignoring:".ljust(leftJustSpace) + ("%d k-point(s)" % args.ignore if args.ignore is not None else "weighted k-points in KPOINTS"))
 	print ("interpolating:".ljust(leftJustSpace) + "%d k-point(s)" % args.interpolate)
 	print ("y axis:".ljust(leftJustSpace) + "from %.1f to %.1f" % (args.yaxis[0],args.yaxis[1]))
 	print ("")
@@ -98,23 +115,25 @@ def printRunDescription (args):
 ## PLOTTING FUNCTIONS ##
 ########################
 
-def printComparisonBands (xmgrace, colors, bands1, bands2):
+@profiling.timed ('bfile')
+def printComparisonBands (xmgrace, colors, bandStructures, datName='eigenvComparison.dat'):
 	"""
-	Prints a .bfile for a common band structure
+	Prints a .bfile for N band structures compared in the same plot
 	This method contains all needed settings
 	"""
 		
 	with open ('bandsComparison.bfile', 'w') as outputFile:				
-		outputFile.write ("READ NXY \"eigenv1.dat\" \n")
+		outputFile.write ("READ NXY \"%s\" \n" % datName)
 		
 		xmgrace.printFontSection (outputFile)
-		xmgrace.printTraces (outputFile, bands1, traceColor=colors[0], firstBand=0)
-		
-		outputFile.write ("READ NXY \"eigenv2.dat\" \n")
 		
-		xmgrace.printTraces (outputFile, bands2, traceColor=colors[1], firstBand=bands1.nBands)
+		## The sets of each band structure follow the sets of the previous ones
+		firstBand = 0
+		for bands, color in zip (bandStructures, colors):
+			xmgrace.printTraces (outputFile, bands, traceColor=color, firstBand=firstBand)
+			firstBand += bands.nBands
 
-		xmgrace.printAxis (outputFile, bands1)			
+		xmgrace.printAxis (outputFile, bandStructures[0])			
 		xmgrace.printLabel (outputFile)
 			
 
@@ -131,6 +150,7 @@ def main():
 	
 	## Parse arguments from the command line
 	args = parseArgs()
+	profiling.setup (args)
 	
 	## Print information on the screen only if the user wants to receive it
 	if not args.quiet:
@@ -138,44 +158,51 @@ def main():
 		printRunDescription (args)
 
 	## Read and configure the paths
-	try:
-		path_1 = args.input_folders[0]
-		path_2 = args.input_folders[1]
-	except IndexError:
-		print ("Two paths must be specified! Exiting...")
+	if len(args.input_folders) < 2:
+		print ("At least two paths must be specified! Exiting...")
 		sys.exit(1)
 	
-	if path_1[-1] != '/':
-		path_1 += '/'
-	if path_2[-1] != '/':
-		path_2 += '/'
+	paths = [os.path.join (x, '') for x in args.input_folders]
+	nPaths = len(paths)
+	
+	## Colors and references are repeated if fewer than the number of paths are given
+	colors = [args.colors[i % len(args.colors)] for i in range(nPaths)]
+	refs = [args.ref[i % len(args.ref)] for i in range(nPaths)]
 		
 	## Create classes responsible for processing files
 	dat = datIO.DatFiles ()
 	dat.setInterpolateOptions (args.interpolate)
 	xmgrace = graceIO.Grace ()
 	
+	## Rendering directly to images uses the same settings as XMGrace
+	if args.render:
+		xmgrace = pyplotIO.Pyplot ()
+	
 	# Reading the KPOINTS file from path 1
 	try:
-		xmgrace.readXticks (path_1 + 'KPOINTS')
+		xmgrace.readXticks (paths[0] + 'KPOINTS')
 	except:
 		print ("Wrong header formatting in KPOINTS file. Plotting without k-points on the x axis...")
 	
 	## Set the range of the y axis
 	xmgrace.setYaxis (args.yaxis[0], args.yaxis[1])		
 	
-	## Configuring the band structure data
-	bsData_1 = outcar.BandStructure (fOutcar = path_1 + 'OUTCAR', nKPTignore = args.ignore)
-	bsData_1.setReferenceString(args.ref[0])
-	bsData_1.setSOC(args.soc)
+	## Configuring the band structure data, reading all OUTCAR files in parallel
+	bsData = outcar.readBandStructures ([x + 'OUTCAR' for x in paths], nKPTignore = args.ignore, nProcs = args.nprocs)
 	
-	bsData_2 = outcar.BandStructure (fOutcar = path_2 + 'OUTCAR', nKPTignore = args.ignore)
-	bsData_2.setReferenceString(args.ref[1])
-	bsData_2.setSOC(args.soc)
+	for bs, ref in zip (bsData, refs):
+		bs.setReferenceString(ref)
+		bs.setSOC(args.soc)
+	
+	if args.render:
+		xmgrace.plotComparedBands (bsData, colors, fName = 'bandsComparison.' + args.render)
+		
+		print ("Band structures rendered to bandsComparison." + args.render)
+		return
 	
-	dat.datEigenvals (bsData_1, datName='eigenv1.dat')
-	dat.datEigenvals (bsData_2, datName='eigenv2.dat')
-	printComparisonBands (xmgrace, args.colors, bsData_1, bsData_2)
+	## All band structures are resampled onto the x axis of the first one
+	dat.datComparedEigenvals (bsData, datName='eigenvComparison.dat')
+	printComparisonBands (xmgrace, colors, bsData, datName='eigenvComparison.dat')
 	
 	print ("Print the results using XMgrace\n xmgrace -batch bandsComparison.bfile")
 	
@@ -1,7 +1,7 @@
 #/usr/bin/env python3
 # coding: utf-8
 
-from vaspirin import poscar
+from vaspirin import poscar, profiling
 import numpy as np
 import argparse
 import math
@@ -32,6 +32,8 @@ def parseArgs():
 	
 	parser.add_argument('-q', '--quiet', action='store_true', help="do not display text on the output window (default: False)")
 	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printRunDescription (args):
@@ -125,6 +127,7 @@ def main():
 	'''
 	
 	args = parseArgs()
+	profiling.setup (args)
 	
 	if not args.quiet:
 		print ("********************************")
@@ -1,4 +1,4 @@
-from vaspirin import outcar,splitter,graceIO,projection
+from vaspirin import outcar,procar,splitter,graceIO,projection,profiling
 import argparse
 
 def positive_int (value):
@@ -36,8 +36,9 @@ def parseArgs():
 	parser.add_argument('-v', '--version', action='version', version='%(prog)s 1.0')
 							
 	# Band structure tweaking					
-	parser.add_argument('-i', '--ignore', type=positive_int, default=0,
-						help="ignore the first N k-points when plotting bands (default: 0)")
+	parser.add_argument('-i', '--ignore', type=positive_int, default=None,
+						help="ignore the first N k-points when plotting bands" +
+						" (default: the number of weighted k-points recorded in the KPOINTS header by gen_kpoints.py, or 0)")
 						
 	parser.add_argument('-m', '--marker', type=float, default=0.5,
 						help="size of the marker for projected bands (default: 0.5)")
@@ -50,15 +51,33 @@ def parseArgs():
 	parser.add_argument('-r', '--ref', default='vbm',
 						help="reference for the 0 eV in band structures (default: vbm)")
 
+	parser.add_argument('-w', '--window', action='store_true',
+						help="process only the bands crossing the y-axis range, skipping the other ones" +
+						" when reading the PROCAR file and writing .dat files (default: False)")
+
 	parser.add_argument('-s', '--split', action='store_true',
 						help="whether or not split the big PROCAR file (default: False)")
 						
 	parser.add_argument('-o', '--orbitals', action='store_true',
 						help="whether or not split the big PROCAR file onto atomic orbitals (default: False)")
 	
+	parser.add_argument('--groups', type=procar.parseOrbitalGroups, default=None, metavar='GROUPS',
+						help="groups of orbitals onto which the bands are projected with -o, separated by commas;" +
+						" orbitals in a group are joined by +, e.g. s,p,dz2,dxz+dyz (default: s,px+py,pz,d, plus f when present)")
+	
 	parser.add_argument('-f', '--fill', action='store_true',
 						help="whether or not fill the symbols in the plot (default: False)")
+	
+	parser.add_argument('--compact', action='store_true',
+						help="write the settings shared by the sets of projected bands only once in the .bfile," +
+						" as XMGrace defaults, making it smaller and faster to load (default: False)")
+	
+	parser.add_argument('-b', '--binary', action='store_true',
+						help="write the projections to a single binary file instead of one .dat file per band;" +
+						" the .dat files can be exported later with export_bands.py (default: False)")
 						
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printHello ():
@@ -80,12 +99,14 @@ def printRunDescription (args):
 	print ("marker size:".ljust(leftJustSpace) + "%.2f" % (args.marker))
 	print ("fill markers?".ljust(leftJustSpace) + ("yes" if args.fill else "no"))
 	print ("reference:".ljust(leftJustSpace) + "%s" % args.ref)
-	print ("ignoring:".ljust(leftJustSpace) + "%d k-point(s)" % args.ignore)
+	print ("ignoring:".ljust(leftJustSpace) + ("%d k-point(s)" % args.ignore if args.ignore is not None else "weighted k-points in KPOINTS"))
 	print ("axis:".ljust(leftJustSpace) + "from %.1f to %.1f" % (args.yaxis[0],args.yaxis[1]))
+	print ("bands in window?".ljust(leftJustSpace) + ("yes" if args.window else "no"))
 	print ("split file?".ljust(leftJustSpace) + ("yes" if args.split else "no"))
 	print ("projected onto:".ljust(leftJustSpace) + ("orbitals" if args.orbitals else "sites"))
 
 
+@profiling.timed ('bfile')
 def printBandProjected (grace, bands, projectedBands):
 	"""
 	Prints a .bfile for a band structure projected onto the specified materials (as from file PROJECTION)
@@ -101,7 +122,8 @@ def printBandProjected (grace, bands, projectedBands):
 		grace.printLabel (outputFile)
 
 
-def printBandCharacter (self, bands):
+@profiling.timed ('bfile')
+def printBandCharacter (self, bands, nOrbitals=4):
 	"""
 	Prints a .bfile for a band structure projected onto orbitals
 	The variable markerSize specifies the size of the marker while printing the bands
@@ -111,7 +133,7 @@ def printBandCharacter (self, bands):
 	with open ('bandsCharacter.bfile', 'w') as outputFile:				
 		
 		self.printFontSection (outputFile)
-		self.printTracesCharacter (outputFile, bands)
+		self.printTracesCharacter (outputFile, bands, nOrbitals)
 		self.printAxis (outputFile, bands)
 		self.printLabel (outputFile)
 
@@ -123,6 +145,7 @@ def main():
 	
 	## Parse arguments from the command line
 	args = parseArgs()
+	profiling.setup (args)
 	
 	## Print information on the screen only if the user wants to receive it
 	if not args.quiet:
@@ -132,18 +155,22 @@ def main():
 	## Import band structures
 	bands = outcar.BandStructure (fOutcar = "OUTCAR", nKPTignore = args.ignore)
 	bands.setReferenceString(args.ref)
+	
+	## Only the bands crossing the y axis are split
+	if args.window:
+		bands.setEnergyWindow (args.yaxis[0], args.yaxis[1])
 
 	## Import PROJECTION customization file
 	prj = projection.PROJECTION (fProjection = 'PROJECTION')
 	
 	## Import and split PROCAR file
-	p = splitter.PROCAR_splitter('PROCAR', prj, bands, marker = args.marker, nKPTignore = args.ignore)
+	p = splitter.PROCAR_splitter('PROCAR', prj, bands, marker = args.marker, nKPTignore = args.ignore, groups = args.groups)
 	
 	if args.split:
 		if args.orbitals:
-			p.splitOrbitals ()
+			p.splitOrbitals (fBinary = 'bandsCharacter.bin' if args.binary else None)
 		else:
-			p.splitPROCAR ()
+			p.splitPROCAR (fBinary = 'bandsProjected.bin' if args.binary else None)
 
 	## Plotting the files just created
 	plt = graceIO.Grace ()
@@ -151,6 +178,9 @@ def main():
 	## Set whether the symbols are filled within xmgrace
 	plt.setSymbolFill (args.fill)
 	
+	## Set whether the settings shared by the sets are written only once
+	plt.setCompact (args.compact)
+	
 	# Reading the KPOINTS file:
 	try:
 		plt.readXticks ('KPOINTS')
@@ -161,7 +191,7 @@ def main():
 	plt.setYaxis (args.yaxis[0], args.yaxis[1])
 	
 	if args.orbitals:
-		printBandCharacter (plt,bands)
+		printBandCharacter (plt,bands,len(p.orbitalGroups))
 	else:
 		## Set the colors for the plots
 		plt.setProjectedColors (prj.projectedColors)
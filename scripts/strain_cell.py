@@ -1,6 +1,6 @@
 #/usr/bin/env python3
 
-from vaspirin import poscar
+from vaspirin import poscar, profiling
 import numpy as np
 import argparse
 import copy
@@ -28,6 +28,8 @@ def parseArgs():
 	
 	parser.add_argument('-q', '--quiet', action='store_true', help="do not display text on the output window (default: False)")
 	
+	profiling.addProfileArguments (parser)
+
 	return parser.parse_args()
 
 def printRunDescription (args):
@@ -82,6 +84,7 @@ def main():
 	'''
 	
 	args = parseArgs()
+	profiling.setup (args)
 	
 	if not args.quiet:
 		print ("******************************")
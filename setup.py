@@ -6,6 +6,7 @@ from setuptools import setup
 setup (
 	name='vaspirin',
 	packages=['vaspirin'],
+	package_data={'vaspirin': ['kpath.json']},
 	version='2.0',
 	
 	description='Painless VASP post-processing tool',
@@ -17,15 +18,18 @@ setup (
 	
 	scripts = [
 	'scripts/band_offsets.py',
+	'scripts/batch.py',
 	'scripts/colored_bands.py',
 	'scripts/dos.py',
+	'scripts/export_bands.py',
 	'scripts/gen_kpoints.py',
 	'scripts/move_atoms.py',
 	'scripts/plot_bands.py',
 	'scripts/plot_compared_bands.py',
 	'scripts/rotate_molecule.py',
 	'scripts/split_procar.py',
-	'scripts/strain_cell.py',	
+	'scripts/strain_cell.py',
+	'scripts/vaspirin',
 	],
 	
 	requires = [
@@ -1,2 +1,2 @@
 __version__ = '1.2'
-__all__ = ["datIO","doscar","graceIO","outcar","poscar","procar","splitter"]
+__all__ = ["batch","binIO","calculation","cli","datIO","doscar","graceIO","kgrid","kpath","outcar","poscar","procar","profiling","projection","pyplotIO","splitter","watch"]
@@ -0,0 +1,276 @@
+import os, io, csv, glob, time, contextlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from . import calculation, cli, doscar, outcar
+
+class FolderResult (object):
+	'''
+	Result of the analysis of a single calculation folder
+	'''
+
+	def __init__ (self, folder):
+
+		self.folder = folder
+		"""
+		Folder analysed
+		"""
+
+		self.status = 'ok'
+		"""
+		Either 'ok' or 'failed'
+		"""
+
+		self.message = ''
+		"""
+		Error message, if the analysis failed
+		"""
+
+		self.time = 0.0
+		"""
+		Wall time (in seconds) spent on this folder
+		"""
+
+		self.nElec = None
+		self.eFermi = None
+		self.vbm = None
+		self.cbm = None
+		self.gap = None
+		self.dGap = None
+		"""
+		Summary of the band structure, if it was read during the analysis
+		"""
+
+		self.moments = None
+		"""
+		Labels and table of integrated states and moments of the DOS (see doscar.DOS.momentsTable), if computed
+		"""
+
+	def readBandStructure (self, bs):
+		"""
+		Fills the summary of the band structure
+		"""
+
+		self.nElec = bs.nElec
+		self.eFermi = bs.eFermi
+		self.vbm = bs.readEValence ()
+		self.gap = bs.gap ()
+		self.cbm = self.vbm + self.gap
+		self.dGap = bs.dGap ()
+
+	def readGapSummary (self, summary):
+		"""
+		Fills the summary of the band structure from an outcar.GapSummary
+		"""
+
+		self.nElec = summary.nElec
+		self.eFermi = summary.eFermi
+		self.vbm = summary.vbm
+		self.cbm = summary.cbm
+		self.gap = summary.gap
+		self.dGap = summary.dGap
+
+
+def expandFolders (patterns):
+	"""
+	Expands a list of folders and glob patterns (e.g. 'runs/*') into a sorted list of folders
+	"""
+
+	folders = []
+	for eachPattern in patterns:
+		matches = glob.glob (eachPattern) or [eachPattern]
+
+		for eachMatch in sorted(matches):
+			if os.path.isdir (eachMatch) and eachMatch not in folders:
+				folders.append (eachMatch)
+
+	return folders
+
+
+def runFolder (folder, stepArgs, summary=True, soc=False, nKPTignore=None, moments=None, ref=None):
+	"""
+	Runs the steps (as in vaspirin.cli) within a single folder. If moments is an energy window (see
+	doscar.DOS.momentsTable), the moments of the DOS are computed with respect to ref. Any error is caught and
+	recorded in the returned FolderResult, so that one bad folder does not stop the batch.
+	The output which would be printed on the screen is discarded.
+	"""
+
+	result = FolderResult (folder)
+	start = time.time ()
+	log = io.StringIO ()
+	cwd = os.getcwd ()
+
+	try:
+		os.chdir (folder)
+
+		with contextlib.redirect_stdout (log):
+			calc = calculation.Calculation ('.')
+			cli.runSteps (calc, stepArgs, quiet=True)
+
+			## Summarizes the band structure, reusing the one parsed by the steps (if any).
+			## Otherwise, only the quantities needed for the summary are read
+			if summary:
+				nKPTignore = outcar.ignoredKpoints (nKPTignore, calc.path('OUTCAR'))
+				if nKPTignore in calc.bandStructures:
+					bs = calc.getBandStructure (nKPTignore)
+					bs.setSOC (soc)
+					result.readBandStructure (bs)
+				else:
+					result.readGapSummary (outcar.GapSummary (calc.path('OUTCAR'), nKPTignore = nKPTignore, soc = soc))
+
+			## Moments of the DOS, also per material if the folder has a PROJECTION file
+			if moments is not None:
+				prj = calc.getProjection () if os.path.isfile (calc.path('PROJECTION')) else None
+
+				dos = calc.getDOS (prj)
+				dos.setReferenceString (ref or 'e-fermi')
+
+				if prj is not None and not dos.materialDOS:
+					dos.setProjection (prj)
+					dos.sumContributions ()
+
+				result.moments = dos.momentsTable (moments)
+
+	## The library exits the interpreter when files are missing
+	except (Exception, SystemExit) as error:
+		result.status = 'failed'
+
+		lines = [x for x in log.getvalue().split('\n') if x.strip()]
+		result.message = lines[-1].strip() if lines else (str(error) or type(error).__name__)
+
+	finally:
+		os.chdir (cwd)
+
+	result.time = time.time () - start
+	return result
+
+
+def runBatch (folders, stepArgs, nProcs=None, summary=True, soc=False, nKPTignore=None, moments=None, ref=None, quiet=False):
+	"""
+	Runs the steps over all folders using a pool of processes. Returns a list of
+	FolderResult in the same order as the folders.
+	"""
+
+	## Workers change their current directory, hence folders must be absolute paths
+	absFolders = [os.path.abspath (x) for x in folders]
+	results = [None]*len(folders)
+
+	with ProcessPoolExecutor (max_workers=nProcs) as executor:
+		futures = {executor.submit (runFolder, absFolders[i], stepArgs, summary, soc, nKPTignore, moments, ref) : i for i in range(len(folders))}
+
+		for nDone, future in enumerate(as_completed (futures), 1):
+			i = futures[future]
+			results[i] = future.result ()
+			results[i].folder = folders[i]
+
+			if not quiet:
+				print ("[%*d/%d] %-7s %6.2f s  %s %s" % (len(str(len(folders))), nDone, len(folders),
+					results[i].status, results[i].time, folders[i], results[i].message))
+
+	return results
+
+
+summaryColumns = ['nelect', 'e-fermi', 'vbm', 'cbm', 'gap', 'direct-gap']
+'''
+Columns of the band structure summary, as named in the summary tables
+'''
+
+def summaryValues (result):
+	"""
+	Values of the band structure summary of a FolderResult, in the order of summaryColumns
+	"""
+	return [result.nElec, result.eFermi, result.vbm, result.cbm, result.gap, result.dGap]
+
+def writeSummary (results, fName='batch_summary.dat'):
+	"""
+	Writes the consolidated table of results, one folder per line.
+	The format is chosen by the extension of fName: .csv, .npz or plain text
+	"""
+
+	if fName.endswith ('.csv'):
+		writeCSV (results, fName)
+		return
+	elif fName.endswith ('.npz'):
+		writeNPZ (results, fName)
+		return
+
+	def fmt (value, form):
+		return "NaN" if value is None else form % value
+
+	with open (fName, 'w') as outputFile:
+		outputFile.write ("# folder status time(s) nelect e-fermi vbm cbm gap direct-gap message\n")
+
+		for r in results:
+			line = "%s %s %.2f %s %s %s %s %s %s" % (r.folder, r.status, r.time,
+				fmt(r.nElec, "%d"), fmt(r.eFermi, "%.4f"), fmt(r.vbm, "%.4f"), fmt(r.cbm, "%.4f"),
+				fmt(r.gap, "%.4f"), fmt(r.dGap, "%.4f"))
+
+			if r.message:
+				line += " \"%s\"" % r.message
+
+			outputFile.write (line + "\n")
+
+def writeCSV (results, fName='batch_summary.csv'):
+	"""
+	Writes the consolidated table of results as comma-separated values
+	"""
+
+	with open (fName, 'w', newline='') as outputFile:
+		writer = csv.writer (outputFile)
+		writer.writerow (['folder', 'status', 'time'] + summaryColumns + ['message'])
+
+		for r in results:
+			values = ['' if x is None else ("%.4f" % x) for x in summaryValues(r)]
+			if r.nElec is not None:
+				values[0] = "%d" % r.nElec
+
+			writer.writerow ([r.folder, r.status, "%.2f" % r.time] + values + [r.message])
+
+def writeNPZ (results, fName='batch_summary.npz'):
+	"""
+	Writes the consolidated table of results as numpy arrays, one array per column.
+	Missing values are written as NaN.
+	"""
+
+	table = np.array ([[np.nan if x is None else x for x in summaryValues(r)] for r in results], dtype=float).reshape(-1, len(summaryColumns))
+
+	columns = {name.replace('-', '_') : table[:,i] for i, name in enumerate(summaryColumns)}
+
+	np.savez (fName, folder=np.array([r.folder for r in results]), status=np.array([r.status for r in results]),
+			  time=np.array([r.time for r in results]), **columns)
+
+def writeMoments (results, fName='batch_moments.dat'):
+	"""
+	Writes the integrated states and moments of the DOS of all folders as a single long table,
+	one line per folder and trace (kind, name and group of orbitals, see doscar.DOS.momentsTable).
+	The format is chosen by the extension of fName: .csv, .npz or plain text
+	"""
+
+	rows = [(r.folder,) + label + tuple(values) for r in results if r.moments is not None for label, values in zip (*r.moments)]
+	header = ['folder', 'kind', 'name', 'orbital'] + doscar.MomentConstants.columns
+
+	if fName.endswith ('.csv'):
+		with open (fName, 'w', newline='') as outputFile:
+			writer = csv.writer (outputFile)
+			writer.writerow (header)
+			writer.writerows ([row[:4] + tuple("%.4f" % x for x in row[4:]) for row in rows])
+
+	elif fName.endswith ('.npz'):
+		columns = list(zip (*rows)) if rows else [()]*len(header)
+		np.savez (fName, **{name : np.array (columns[i], dtype = str if i < 4 else float) for i, name in enumerate(header)})
+
+	else:
+		with open (fName, 'w') as outputFile:
+			outputFile.write ("# " + ' '.join (header) + "\n")
+			outputFile.write ("".join (["%s %s %s %s %.4f %.4f %.4f %.4f %.4f\n" % row for row in rows]))
+
+def writeAlignments (results, fName='ALIGNMENTS', color='black'):
+	"""
+	Writes the band edges of the successful folders as an ALIGNMENTS file for band_offsets.py.
+	Each folder becomes a line: LABEL VBM CBM COLOR
+	"""
+
+	with open (fName, 'w') as outputFile:
+		for r in results:
+			if r.status == 'ok' and r.vbm is not None:
+				label = os.path.basename (os.path.normpath (r.folder))
+				outputFile.write ("%s %.3f %.3f %s\n" % (label, r.vbm, r.cbm, color))
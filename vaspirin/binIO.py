@@ -0,0 +1,162 @@
+import os, sys, shutil, struct
+import numpy as np
+
+class BinConstants (object):
+	'''
+	Constants describing the layout of the binary band container
+	'''
+
+	magic = b'VSPBANDS'
+	version = 1
+
+	## magic, version, number of k-points, number of bands stored, number of columns, reference, kind
+	headerFormat = '<8s4Id16s'
+	headerSize = 64
+
+class BandsFile (object):
+	'''
+	Single-file binary container for band structures projected onto materials or orbitals.
+	Replaces the folders bands_projected/ and bands_character/, which hold one .dat file per band.
+
+	File layout (little endian):
+	header (64 bytes): magic, version, nKpoints, nBands, nColumns, reference and kind
+	bands[nBands] (int64): index of each band stored, starting from 0
+	xAxis[nKpoints] (float64): normalized k-point axis
+	eigenvals[nKpoints][nBands] (float64): eigenvalues, without the reference subtracted
+	contributions[nKpoints][nBands][nColumns] (float64): relative contributions, from 0 to 1
+
+	The arrays are memory-mapped, so that reading a few bands does not load the whole file.
+	'''
+
+	def __init__ (self, fName, mode='r'):
+		self.fName = fName
+		"""
+		Name of the binary file
+		"""
+
+		try:
+			with open (fName, 'rb') as f:
+				header = struct.unpack (BinConstants.headerFormat, f.read (struct.calcsize(BinConstants.headerFormat)))
+		except FileNotFoundError:
+			print ("Binary bands file %s not found! Exiting...\n" % fName)
+			sys.exit (1)
+
+		if header[0] != BinConstants.magic:
+			print ("%s is not a vaspirin binary bands file! Exiting...\n" % fName)
+			sys.exit (1)
+
+		self.nKpoints, self.nBands, self.nColumns = header[2:5]
+		"""
+		Number of k-points, of bands stored and of contributions per band
+		"""
+
+		self.reference = header[5]
+		"""
+		Reference for the 0 eV
+		"""
+
+		self.kind = header[6].rstrip(b'\0').decode()
+		"""
+		Either 'projected' (onto materials) or 'character' (onto orbitals)
+		"""
+
+		offset = BinConstants.headerSize
+		self.bands = np.memmap (fName, dtype='<i8', mode=mode, offset=offset, shape=(self.nBands,))
+		offset += self.bands.nbytes
+
+		self.xAxis = np.memmap (fName, dtype='<f8', mode=mode, offset=offset, shape=(self.nKpoints,))
+		offset += self.xAxis.nbytes
+
+		self.eigenvals = np.memmap (fName, dtype='<f8', mode=mode, offset=offset, shape=(self.nKpoints, self.nBands))
+		offset += self.eigenvals.nbytes
+
+		self.contributions = np.memmap (fName, dtype='<f8', mode=mode, offset=offset, shape=(self.nKpoints, self.nBands, self.nColumns))
+
+	def flush (self):
+		"""
+		Writes to disk the changes made on the arrays of a file opened with mode='r+'
+		"""
+
+		for array in (self.bands, self.xAxis, self.eigenvals, self.contributions):
+			array.flush ()
+
+	def array (self, markerSize=1.0, bands=None):
+		"""
+		Returns the stored bands with the same columns as the legacy .dat files,
+		indexed as [band][k-point][column]. bands selects some of the stored bands
+		by their index (starting from 0), as given in self.bands.
+		"""
+
+		if bands is None:
+			positions = np.arange (self.nBands)
+		else:
+			positions = np.searchsorted (self.bands, bands)
+
+		E = np.asarray (self.eigenvals[:,positions], dtype=float).T - self.reference
+		c = np.asarray (self.contributions[:,positions], dtype=float).transpose(1,0,2) * markerSize
+		x = np.broadcast_to (np.asarray(self.xAxis, dtype=float), E.shape)
+
+		return np.concatenate ((x[:,:,None], E[:,:,None], c), axis=2)
+
+	def exportDat (self, folder=None, markerSize=0.5):
+		"""
+		Writes the legacy bandNN.dat files, as written by datIO.DatFiles, into folder
+		(default: bands_projected or bands_character, depending on the kind of projection)
+		"""
+
+		if folder is None:
+			folder = 'bands_' + self.kind
+
+		## Creates the folder, if it does not exists
+		try:
+			os.mkdir (folder)
+		except FileExistsError:
+			shutil.rmtree (folder)
+			os.mkdir (folder)
+
+		rowFormat = "%.6f % 3.6f" + " %1.4f"*self.nColumns + "\n"
+
+		for band, data in zip (self.bands, self.array (markerSize)):
+			with open (os.path.join (folder, "band%02d.dat" % int(band+1)), 'w') as outputFile:
+				outputFile.write ("".join ([rowFormat % tuple(row) for row in data]))
+
+				## Finishes printing the band
+				outputFile.write ("\n")
+
+		return folder
+
+def createBandsFile (fName, xAxis, bands, nColumns, reference, kind='projected'):
+	"""
+	Creates a binary bands file filled with zeros and returns it opened for writing.
+	bands is the list of the indexes of the bands to be stored, starting from 0.
+	"""
+
+	header = struct.pack (BinConstants.headerFormat, BinConstants.magic, BinConstants.version,
+						  len(xAxis), len(bands), nColumns, reference, kind.encode())
+
+	with open (fName, 'wb') as f:
+		f.write (header.ljust (BinConstants.headerSize, b'\0'))
+		f.truncate (BinConstants.headerSize + 8*(len(bands) + len(xAxis) + len(xAxis)*len(bands)*(1 + nColumns)))
+
+	bandsFile = BandsFile (fName, mode='r+')
+	bandsFile.bands[:] = bands
+	bandsFile.xAxis[:] = xAxis
+
+	return bandsFile
+
+def writeBandsFile (fName, bandStructure, contributions, kind='projected'):
+	"""
+	Writes the bands selected in bandStructure (see outcar.BandStructure.selectedBands) and
+	their contributions, given as contributions[k-point][band][column], to a binary bands file
+	"""
+
+	bands = bandStructure.selectedBands ()
+	nKpoints = len(bandStructure.xAxis)
+	contributions = np.asarray (contributions, dtype=float)
+
+	bandsFile = createBandsFile (fName, bandStructure.xAxis, bands, contributions.shape[2], bandStructure.reference, kind)
+	bandsFile.eigenvals[:] = np.asarray (bandStructure.eigenvals, dtype=float)[:nKpoints, bands]
+	bandsFile.contributions[:] = contributions[:nKpoints, bands]
+	bandsFile.flush ()
+
+	return bandsFile
@@ -0,0 +1,95 @@
+import os
+from . import outcar, procar, projection, doscar
+
+class Calculation (object):
+	'''
+	Describes the folder of a single VASP calculation. The files within the folder are
+	parsed only when they are first needed, and the resulting objects (BandStructure,
+	PROCAR, DOS, PROJECTION) are kept in memory, so that several analyses performed
+	over the same calculation do not read the same files again.
+	'''
+
+	def __init__ (self, folder = '.'):
+
+		self.folder = folder
+		"""
+		Folder in which the VASP files can be found
+		"""
+
+		self.bandStructures = {}
+		"""
+		Band structures already parsed, indexed by the number of k-points ignored
+		"""
+
+		self.procars = {}
+		"""
+		PROCAR files already parsed, indexed by the number of k-points ignored and the bands selected
+		"""
+
+		self.dos = None
+		"""
+		DOSCAR already parsed
+		"""
+
+		self.prj = None
+		"""
+		PROJECTION file already parsed
+		"""
+
+	def path (self, fName):
+		"""
+		Returns the path of the file fName within the calculation folder
+		"""
+		return os.path.join (self.folder, fName)
+
+	def getBandStructure (self, nKPTignore = None):
+		"""
+		Returns the band structure read from the OUTCAR file
+		If nKPTignore is not given, the number of weighted k-points recorded in the KPOINTS file is ignored
+		"""
+
+		nKPTignore = outcar.ignoredKpoints (nKPTignore, self.path('OUTCAR'))
+
+		if nKPTignore not in self.bandStructures:
+			self.bandStructures[nKPTignore] = outcar.BandStructure (fOutcar = self.path('OUTCAR'), nKPTignore = nKPTignore)
+
+		return self.bandStructures[nKPTignore]
+
+	def getProjection (self):
+		"""
+		Returns the information of the PROJECTION file
+		"""
+
+		if self.prj is None:
+			self.prj = projection.PROJECTION (fProjection = self.path('PROJECTION'))
+
+		return self.prj
+
+	def getPROCAR (self, nKPTignore = None, bands = None):
+		"""
+		Returns the band character read from the PROCAR file
+		If bands is given, only these bands are parsed, unless the whole file has already been parsed
+		"""
+
+		nKPTignore = outcar.ignoredKpoints (nKPTignore, self.path('OUTCAR'))
+		key = (nKPTignore, None if bands is None else tuple(bands))
+
+		if (nKPTignore, None) in self.procars:
+			return self.procars[(nKPTignore, None)]
+
+		if key not in self.procars:
+			self.procars[key] = procar.PROCAR (self.path('PROCAR'), self.getProjection(), nKPTignore = nKPTignore, bands = bands)
+
+		return self.procars[key]
+
+	def getDOS (self, prj = None):
+		"""
+		Returns the density of states read from the DOSCAR file.
+		The atoms are only parsed when needed and, if the file is read here, the DOS is
+		projected onto the materials of prj while read (see doscar.DOS)
+		"""
+
+		if self.dos is None:
+			self.dos = doscar.DOS (fDoscar = self.path('DOSCAR'), lazy = True, projection = prj)
+
+		return self.dos
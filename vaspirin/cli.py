@@ -0,0 +1,640 @@
+import sys, copy, argparse
+from . import calculation, doscar, outcar, procar, splitter, graceIO, datIO, pyplotIO, binIO, profiling
+
+################################
+## PARSING AND HELLO MESSAGES ##
+################################
+
+def positive_int (value):
+	'''
+	Type for allowing only positive int values for argparser
+	taken from http://stackoverflow.com/questions/14117415/using-argparse-allow-only-positive-integers
+	'''
+
+	ivalue = int(value)
+	if ivalue < 0:
+		raise argparse.ArgumentTypeError("%s is an invalid positive int value" % value)
+	return ivalue
+
+def parseGlobalArgs (argv):
+	"""
+	Parse the arguments given before the first step
+	"""
+
+	helloDescription = ("Painless VASP postprocessing tool\n" +
+						"Runs several vaspirin steps over the same calculation, parsing each file only once.\n" +
+						"Steps are chained in a single command line, e.g. `vaspirin bands --projected dos --orbital`.\n" +
+						"Available steps: " + ', '.join(sorted(steps.keys())) + ". Use `vaspirin STEP -h` for help on each one.")
+
+	parser = argparse.ArgumentParser(description=helloDescription,
+									epilog= "Last revision: Oct. 2026.",
+									prog="vaspirin")
+
+	parser.add_argument('-q', '--quiet', action='store_true',
+						help="do not display text on the output window (default: False)")
+
+	parser.add_argument('-v', '--version', action='version', version='%(prog)s 2.0')
+
+	profiling.addProfileArguments (parser)
+
+	return parser.parse_args(argv)
+
+def addBandsArguments (parser):
+	"""
+	Arguments of the `bands` step, as in plot_bands.py
+	"""
+
+	parser.add_argument('-o', '--orbital', action='store_true',
+						help="generate band structures projected onto atomic orbitals with XMGrace" +
+						" (default: False).")
+
+	parser.add_argument('-p', '--projected', action='store_true',
+						help="generate band structures projected onto atomic sites with XMGrace" +
+						" (default: False).")
+
+	parser.add_argument('--groups', type=procar.parseOrbitalGroups, default=None, metavar='GROUPS',
+						help="groups of orbitals onto which the bands are projected with -o, separated by commas;" +
+						" orbitals in a group are joined by +, e.g. s,p,dz2,dxz+dyz (default: s,px+py,pz,d, plus f when present)")
+
+	parser.add_argument('-j', '--joint', type=procar.parseJointSpecs, default=None, metavar='SPECS',
+						help="generate band structures projected onto orbitals of groups of ions, given as IONS:ORBITALS" +
+						" separated by commas, where IONS are materials of the PROJECTION file or ions joined by +," +
+						" e.g. Mo:dz2,S:pz,1..3:d (default: None)")
+
+	parser.add_argument('-i', '--ignore', type=positive_int, default=None,
+						help="ignore the first N k-points when plotting bands" +
+						" (default: the number of weighted k-points recorded in the KPOINTS header by gen_kpoints.py, or 0)")
+
+	parser.add_argument('-t', '--interpolate', type=positive_int, default=0,
+						help="interpolate N k-points between each pair of k-points when plotting bands (default: 0)")
+
+	parser.add_argument('-m', '--marker', type=float, default=0.5,
+						help="size of the marker for projected bands (default: 0.5)")
+
+	parser.add_argument('-f', '--fill', action='store_true',
+						help="whether or not fill the symbols in the plot (default: False)")
+
+	parser.add_argument('--compact', action='store_true',
+						help="write the settings shared by the sets of projected bands only once in the .bfile," +
+						" as XMGrace defaults, making it smaller and faster to load (default: False)")
+
+	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
+						help="set the y-axis range for the band structure" +
+						" (default: -3 to 3).",
+						metavar=('Y_MIN', 'Y_MAX'))
+
+	parser.add_argument('-r', '--ref', default='vbm',
+						help="reference for the 0 eV in band structures (default: vbm)")
+
+	parser.add_argument('-b', '--binary', action='store_true',
+						help="write the projections to a single binary file instead of one .dat file per band;" +
+						" the .dat files can be exported later with `vaspirin export` (default: False)")
+
+	parser.add_argument('-w', '--window', action='store_true',
+						help="process only the bands crossing the y-axis range, skipping the other ones" +
+						" when reading the PROCAR file and writing .dat files (default: False)")
+
+	parser.add_argument('-s', '--soc', action='store_true',
+						help="plot bands from non-collinear calculations (default: False)")
+
+	parser.add_argument('-g', '--render', choices=['png', 'pdf', 'eps', 'svg'], default=None,
+						help="render the plot directly to an image of this format with matplotlib," +
+						" instead of writing .dat and .bfile files for XMGrace (default: None)")
+
+def addDOSArguments (parser):
+	"""
+	Arguments of the `dos` step, as in dos.py
+	"""
+
+	parser.add_argument('-o', '--orbital', action='store_true',
+						help="generate density of states projected onto atomic orbitals with XMGrace" +
+						" (default: False).")
+
+	parser.add_argument('-p', '--projected', action='store_true',
+						help="generate density of states projected onto atomic sites with XMGrace" +
+						" (default: False).")
+
+	parser.add_argument('-f', '--fill', action='store_true',
+						help="whether or not fill the lines in the plot (default: False)")
+
+	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
+						help="set the energy axis range for the density of states" +
+						" (default: -3 to 3).",
+						metavar=('Y_MIN', 'Y_MAX'))
+
+	parser.add_argument('-d', '--dos_axis', type=float, default=40.0,
+						help="set the maximum range for the density of states axis" +
+						" (default: 40.0).")
+
+	parser.add_argument('-r', '--ref', default='e-fermi',
+						help="reference for the 0 eV in density of states (default: e-fermi)")
+
+	parser.add_argument('-g', '--render', choices=['png', 'pdf', 'eps', 'svg'], default=None,
+						help="render the plot directly to an image of this format with matplotlib," +
+						" instead of writing .dat and .bfile files for XMGrace (default: None)")
+
+	parser.add_argument('-e', '--eigenvalues', action='store_true',
+						help="build the density of states from the eigenvalues of the OUTCAR file (and the composition" +
+						" of the bands in the PROCAR file, if projected) instead of reading the DOSCAR file (default: False)")
+
+	parser.add_argument('-i', '--ignore', type=positive_int, default=0,
+						help="ignore the first N k-points when building the DOS from eigenvalues (default: 0)")
+
+	parser.add_argument('-s', '--soc', action='store_true',
+						help="build the DOS from the eigenvalues of non-collinear calculations (default: False)")
+
+	parser.add_argument('--nedos', type=positive_int, default=doscar.BroadeningConstants.defaultNEDOS,
+						help="number of energies of the DOS built from eigenvalues (default: %d)" % doscar.BroadeningConstants.defaultNEDOS)
+
+	parser.add_argument('--broaden', type=float, default=0.0, metavar='WIDTH',
+						help="broaden the density of states by convolution with a function of this width (in eV)," +
+						" on top of the smearing used by VASP. With -e, the width of the smearing of the eigenvalues" +
+						" (default: 0.0, no broadening, or %.2f eV with -e)" % doscar.BroadeningConstants.defaultWidth)
+
+	parser.add_argument('--shape', choices=doscar.BroadeningConstants.shapes, default='gaussian',
+						help="shape of the broadening function. The width is the standard deviation of the gaussian" +
+						" or the half width at half maximum of the lorentzian (default: gaussian)")
+
+	parser.add_argument('-m', '--moments', action='store_true',
+						help="also write the integrated states, center, width and skewness of the DOS of the system," +
+						" of each atom and, if projected, of each material, for each group of orbitals, to dosMoments.dat," +
+						" and the number of states below each energy to dosIntegrated.dat (default: False)")
+
+	parser.add_argument('--moments_window', type=float, nargs=2, default=[None, None],
+						help="energy window (relative to the reference) of the integrals of the moments" +
+						" (default: the whole range of the DOS)",
+						metavar=('E_MIN', 'E_MAX'))
+
+	parser.add_argument('--atoms', default=None,
+						help="atoms whose moments are written with -m, e.g. 1..3,7 (as in the PROJECTION file)." +
+						" Only these atoms are parsed from the DOSCAR file (default: all atoms)")
+
+def addSplitArguments (parser):
+	"""
+	Arguments of the `split` step, as in split_procar.py
+	"""
+
+	parser.add_argument('-i', '--ignore', type=positive_int, default=None,
+						help="ignore the first N k-points when plotting bands" +
+						" (default: the number of weighted k-points recorded in the KPOINTS header by gen_kpoints.py, or 0)")
+
+	parser.add_argument('-m', '--marker', type=float, default=0.5,
+						help="size of the marker for projected bands (default: 0.5)")
+
+	parser.add_argument('-y', '--yaxis', type=float, nargs=2, default=[-3, 3],
+						help="set the y-axis range for the band structure" +
+						" (default: -3 to 3).",
+						metavar=('Y_MIN', 'Y_MAX'))
+
+	parser.add_argument('-r', '--ref', default='vbm',
+						help="reference for the 0 eV in band structures (default: vbm)")
+
+	parser.add_argument('-b', '--binary', action='store_true',
+						help="write the projections to a single binary file instead of one .dat file per band;" +
+						" the .dat files can be exported later with `vaspirin export` (default: False)")
+
+	parser.add_argument('-w', '--window', action='store_true',
+						help="process only the bands crossing the y-axis range, skipping the other ones" +
+						" when reading the PROCAR file and writing .dat files (default: False)")
+
+	parser.add_argument('-o', '--orbitals', action='store_true',
+						help="split the big PROCAR file onto atomic orbitals instead of atomic sites (default: False)")
+
+	parser.add_argument('--groups', type=procar.parseOrbitalGroups, default=None, metavar='GROUPS',
+						help="groups of orbitals onto which the bands are projected with -o, separated by commas;" +
+						" orbitals in a group are joined by +, e.g. s,p,dz2,dxz+dyz (default: s,px+py,pz,d, plus f when present)")
+
+	parser.add_argument('-f', '--fill', action='store_true',
+						help="whether or not fill the symbols in the plot (default: False)")
+
+	parser.add_argument('--compact', action='store_true',
+						help="write the settings shared by the sets of projected bands only once in the .bfile," +
+						" as XMGrace defaults, making it smaller and faster to load (default: False)")
+
+def addExportArguments (parser):
+	"""
+	Arguments of the `export` step, as in export_bands.py
+	"""
+
+	parser.add_argument('input_file', nargs='?', default='bandsProjected.bin',
+						help="binary bands file to be exported (default: bandsProjected.bin)")
+
+	parser.add_argument('-m', '--marker', type=float, default=0.5,
+						help="size of the marker for projected bands (default: 0.5)")
+
+	parser.add_argument('-o', '--output', default=None,
+						help="folder receiving the .dat files (default: bands_projected or bands_character)")
+
+def parseSteps (argv):
+	"""
+	Splits the command line into the global arguments and the arguments of each step.
+	A new step starts whenever the name of a step is found in the command line.
+	Returns the global arguments and a list of (step name, step arguments).
+	"""
+
+	chunks = [[]]
+	for token in argv:
+		if token in steps:
+			chunks.append ([token])
+		else:
+			chunks[-1].append (token)
+
+	globalArgs = parseGlobalArgs (chunks[0])
+
+	stepArgs = []
+	for chunk in chunks[1:]:
+		parser = argparse.ArgumentParser(prog="vaspirin " + chunk[0])
+		steps[chunk[0]][0] (parser)
+		stepArgs.append ((chunk[0], parser.parse_args(chunk[1:])))
+
+	if not stepArgs:
+		print ("No step specified! Use `vaspirin -h` to see the available steps.")
+		sys.exit (1)
+
+	return globalArgs, stepArgs
+
+def printHello ():
+	'''
+	Print hello message.
+	'''
+
+	print ("*****************")
+	print (" vaspirin v2.0 ")
+	print ("*****************")
+
+########################
+## PLOTTING FUNCTIONS ##
+########################
+
+@profiling.timed ('bfile')
+def printBandStructure (xmgrace, bands):
+	"""
+	Prints a .bfile for a common band structure
+	This method contains all needed settings
+	"""
+
+	with open ('bands.bfile', 'w') as outputFile:
+
+		outputFile.write ("READ NXY \"eigenv.dat\" \n")
+
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printAxis (outputFile, bands)
+		xmgrace.printTraces (outputFile, bands, traceColor='black', firstBand=0)
+		xmgrace.printLabel (outputFile)
+
+		if xmgrace.exportPS:
+			xmgrace.printExportPS (outputFile, xmgrace.psFilename)
+
+@profiling.timed ('bfile')
+def printBandCharacter (xmgrace, bands, nOrbitals=4):
+	"""
+	Prints a .bfile for a band structure projected onto nOrbitals groups of orbitals
+	"""
+
+	with open ('bandsCharacter.bfile', 'w') as outputFile:
+
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printTracesCharacter (outputFile, bands, nOrbitals)
+		xmgrace.printAxis (outputFile, bands)
+		xmgrace.printLabel (outputFile)
+
+@profiling.timed ('bfile')
+def printBandJoint (xmgrace, bands, nSpecs):
+	"""
+	Prints a .bfile for a band structure projected onto nSpecs joint projections onto ions and orbitals
+	"""
+
+	with open ('bandsJoint.bfile', 'w') as outputFile:
+
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printTracesCharacter (outputFile, bands, nSpecs, folder='bands_joint')
+		xmgrace.printAxis (outputFile, bands)
+		xmgrace.printLabel (outputFile)
+
+@profiling.timed ('bfile')
+def printBandProjected (xmgrace, bands, projectedBands):
+	"""
+	Prints a .bfile for a band structure projected onto the specified materials (file PROJECTION)
+	This method contains all needed settings
+	"""
+
+	with open ('bandsProjected.bfile', 'w') as outputFile:
+
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printTracesProjected (outputFile, bands, projectedBands)
+		xmgrace.printAxis (outputFile, bands)
+		xmgrace.printLabel (outputFile)
+
+@profiling.timed ('bfile')
+def printDOS (xmgrace, dos, bfileName, datName, traces):
+	"""
+	Prints a .bfile for a density of states. The function traces
+	configures the sets of data of the plot.
+	"""
+
+	with open (bfileName, 'w') as outputFile:
+
+		outputFile.write ("READ NXY \"%s\" \n" % datName)
+
+		xmgrace.printFontSection (outputFile)
+		xmgrace.printView (outputFile)
+		xmgrace.printDOSAxis (outputFile)
+		traces (outputFile, dos)
+		xmgrace.printDOSLabel (outputFile)
+
+###########
+## STEPS ##
+###########
+
+def runBands (calc, args, quiet=False):
+	"""
+	Generates band structures, as in plot_bands.py
+	"""
+
+	dat = datIO.DatFiles (marker = args.marker)
+	dat.setInterpolateOptions (args.interpolate)
+	xmgrace = graceIO.Grace ()
+	xmgrace.setCompact (args.compact)
+
+	## Rendering directly to images uses the same settings as XMGrace
+	if args.render:
+		xmgrace = pyplotIO.Pyplot ()
+		xmgrace.setMarkerSize (args.marker)
+
+	try:
+		xmgrace.readXticks (calc.path('KPOINTS'))
+	except:
+		print ("Wrong header formatting in KPOINTS file. Plotting without k-points on the x axis...")
+
+	xmgrace.setSymbolFill (args.fill)
+	xmgrace.setYaxis (args.yaxis[0], args.yaxis[1])
+
+	bsData = calc.getBandStructure (nKPTignore = args.ignore)
+	bsData.setSOC (args.soc)
+	bsData.setReferenceString (args.ref)
+
+	## The band structure is shared between steps, so the window is always reset
+	bsData.setEnergyWindow (*(args.yaxis if args.window else (None, None)))
+
+	## Images are rendered directly from the parsed objects
+	if args.render:
+		if args.joint:
+			fName = 'bandsJoint.' + args.render
+			procarData = calc.getPROCAR (nKPTignore = args.ignore, bands = bsData.selectedBands())
+			procarData.setJointSpecs (args.joint)
+			xmgrace.plotBandsJoint (bsData, procarData, fName = fName)
+		elif args.orbital:
+			fName = 'bandsCharacter.' + args.render
+			procarData = calc.getPROCAR (nKPTignore = args.ignore, bands = bsData.selectedBands())
+			procarData.setOrbitalGroups (args.groups or procar.defaultOrbitalGroups (procarData.orbitalNames))
+			xmgrace.plotBandsCharacter (bsData, procarData, fName = fName)
+		elif args.projected:
+			fName = 'bandsProjected.' + args.render
+			xmgrace.setProjectedColors (calc.getProjection().projectedColors)
+			xmgrace.plotBandsProjected (bsData, calc.getPROCAR (nKPTignore = args.ignore, bands = bsData.selectedBands()), fName = fName)
+		else:
+			fName = 'bands.' + args.render
+			xmgrace.plotBands (bsData, fName = fName)
+
+		if not quiet:
+			print ("Band structure rendered to " + fName)
+
+	## Band structure projected onto orbitals of groups of ions
+	elif args.joint:
+		procarData = calc.getPROCAR (nKPTignore = args.ignore, bands = bsData.selectedBands())
+		procarData.setJointSpecs (args.joint)
+
+		if args.binary:
+			dat.binJoint (bsData, procarData)
+		else:
+			dat.datJoint (bsData, procarData)
+		printBandJoint (xmgrace, bsData, len(args.joint))
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch bandsJoint.bfile")
+
+	## Atomic orbital-projected band structure
+	elif args.orbital:
+		procarData = calc.getPROCAR (nKPTignore = args.ignore, bands = bsData.selectedBands())
+
+		## The PROCAR file is shared between steps, so the groups of orbitals are always set
+		procarData.setOrbitalGroups (args.groups or procar.defaultOrbitalGroups (procarData.orbitalNames))
+
+		if args.binary:
+			dat.binCharacter (bsData, procarData)
+		else:
+			dat.datCharacter (bsData, procarData)
+		printBandCharacter (xmgrace, bsData, len(procarData.orbitalGroups))
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch bandsCharacter.bfile")
+
+	## Atomic site-projected band structure
+	elif args.projected:
+		procarData = calc.getPROCAR (nKPTignore = args.ignore, bands = bsData.selectedBands())
+
+		if args.binary:
+			dat.binProjected (bsData, procarData)
+		else:
+			dat.datProjected (bsData, procarData)
+
+		xmgrace.setProjectedColors (calc.getProjection().projectedColors)
+		printBandProjected (xmgrace, bsData, procarData)
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch bandsProjected.bfile")
+
+	## Standard band structure
+	else:
+		dat.datEigenvals (bsData)
+		printBandStructure (xmgrace, bsData)
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch bands.bfile")
+
+def runDOS (calc, args, quiet=False):
+	"""
+	Generates density of states, as in dos.py
+	"""
+
+	dat = datIO.DatFiles ()
+	xmgrace = pyplotIO.Pyplot () if args.render else graceIO.Grace ()
+
+	xmgrace.setSymbolFill (args.fill)
+	xmgrace.setXaxis (args.yaxis[0], args.yaxis[1])
+	xmgrace.setYaxis (0, args.dos_axis)
+
+	## Builds the DOS from the eigenvalues, smeared with the chosen width
+	if args.eigenvalues:
+		bsData = calc.getBandStructure (nKPTignore = args.ignore)
+		bsData.setSOC (args.soc)
+
+		procarData = calc.getPROCAR (nKPTignore = args.ignore) if args.orbital or args.projected else None
+
+		dos = doscar.BandsDOS (bsData, procarData, outcar.readWeights (calc.path('OUTCAR'), args.ignore), nEDOS = args.nedos,
+							   width = args.broaden if args.broaden > 0 else doscar.BroadeningConstants.defaultWidth, shape = args.shape)
+	else:
+		## If read here, the DOSCAR file is summed onto orbitals and materials in a single pass
+		dos = calc.getDOS (calc.getProjection () if args.projected else None)
+
+		## The DOS is shared between steps, so only a copy of it is broadened
+		if args.broaden > 0:
+			dos = copy.deepcopy (dos)
+			dos.broaden (args.broaden, args.shape)
+
+	dos.setReferenceString (args.ref)
+
+	## Projects the DOS onto atomic sites, unless it has been projected while read
+	if args.projected and not dos.materialDOS:
+		dos.setProjection (calc.getProjection ())
+		dos.sumContributions ()
+
+	## Integrated states and moments of the DOS, also per material if projected
+	if args.moments:
+		dat.datMoments (*dos.momentsTable (args.moments_window, atoms = doscar.parseAtoms (args.atoms) if args.atoms else None))
+		dat.datIntegrated (dos)
+
+		if not quiet:
+			print ("Integrated states and moments of the DOS written to dosMoments.dat and dosIntegrated.dat")
+
+	## Images are rendered directly from the parsed objects
+	if args.render:
+		if args.orbital:
+			fName = 'dosOrbital.' + args.render
+			xmgrace.plotDOSCharacter (dos, fName = fName)
+		elif args.projected:
+			fName = 'dosProjected.' + args.render
+			xmgrace.setProjectedColors (calc.getProjection ().projectedColors)
+			xmgrace.plotDOSProjected (dos, fName = fName)
+		else:
+			fName = 'dos.' + args.render
+			xmgrace.plotDOS (dos, fName = fName)
+
+		if not quiet:
+			print ("Density of states rendered to " + fName)
+
+		return
+
+	xmgrace.setView (graceIO.GraceConstants.dosView)
+
+	## Atomic orbital-projected DOS
+	if args.orbital:
+		dat.datDOSorbital (dos)
+		printDOS (xmgrace, dos, 'dosOrbital.bfile', 'dosOrbital.dat', xmgrace.printDOSCharacter)
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch dosOrbital.bfile")
+
+	## Atomic site-projected DOS
+	elif args.projected:
+		dat.datDOSproj (dos)
+
+		xmgrace.setProjectedColors (calc.getProjection ().projectedColors)
+		printDOS (xmgrace, dos, 'dosProjected.bfile', 'dosProj.dat', xmgrace.printDOSProjected)
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch dosProjected.bfile")
+
+	## Standard DOS
+	else:
+		dat.datDOS (dos)
+		printDOS (xmgrace, dos, 'dos.bfile', 'dos.dat', xmgrace.printDOS)
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch dos.bfile")
+
+def runSplit (calc, args, quiet=False):
+	"""
+	Splits a big PROCAR file into .dat files, as in split_procar.py
+	"""
+
+	bands = calc.getBandStructure (nKPTignore = args.ignore)
+	bands.setReferenceString (args.ref)
+	bands.setEnergyWindow (*(args.yaxis if args.window else (None, None)))
+
+	prj = calc.getProjection ()
+	p = splitter.PROCAR_splitter (calc.path('PROCAR'), prj, bands, marker = args.marker, nKPTignore = args.ignore, groups = args.groups)
+
+	xmgrace = graceIO.Grace ()
+	xmgrace.setSymbolFill (args.fill)
+	xmgrace.setCompact (args.compact)
+
+	try:
+		xmgrace.readXticks (calc.path('KPOINTS'))
+	except:
+		print ("Wrong header formatting in KPOINTS file. Plotting without k-points on the x axis...")
+
+	xmgrace.setYaxis (args.yaxis[0], args.yaxis[1])
+
+	if args.orbitals:
+		p.splitOrbitals (fBinary = 'bandsCharacter.bin' if args.binary else None)
+		printBandCharacter (xmgrace, bands, len(p.orbitalGroups))
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch bandsCharacter.bfile")
+	else:
+		p.splitPROCAR (fBinary = 'bandsProjected.bin' if args.binary else None)
+		xmgrace.setProjectedColors (prj.projectedColors)
+		printBandProjected (xmgrace, bands, p)
+
+		if not quiet:
+			print ("Print the results using XMgrace:\n xmgrace -batch bandsProjected.bfile")
+
+def runExport (calc, args, quiet=False):
+	"""
+	Exports a binary bands file to the legacy .dat files, as in export_bands.py
+	"""
+
+	bandsFile = binIO.BandsFile (calc.path(args.input_file))
+	folder = bandsFile.exportDat (calc.path(args.output) if args.output else calc.path('bands_' + bandsFile.kind), markerSize = args.marker)
+
+	if not quiet:
+		print ("%d bands exported to %s" % (bandsFile.nBands, folder))
+
+steps = {
+	'bands' : (addBandsArguments, runBands),
+	'dos' : (addDOSArguments, runDOS),
+	'export' : (addExportArguments, runExport),
+	'split' : (addSplitArguments, runSplit),
+}
+'''
+Steps available in the command line: name : (function adding the arguments, function running the step)
+'''
+
+def runSteps (calc, stepArgs, quiet=False):
+	"""
+	Runs a list of (step name, step arguments) over the same calculation
+	"""
+
+	for name, args in stepArgs:
+		if not quiet:
+			print ("## step: %s" % name)
+
+		with profiling.stage ('step: ' + name):
+			steps[name][1] (calc, args, quiet)
+
+################################
+## MAIN FUNCTION FOR VASPIRIN ##
+################################
+
+def main (argv=None):
+	'''
+	vaspirin main function
+
+	All steps are run over the calculation in the current directory, sharing the
+	parsed OUTCAR, PROCAR, DOSCAR and PROJECTION files.
+	'''
+
+	if argv is None:
+		argv = sys.argv[1:]
+
+	globalArgs, stepArgs = parseSteps (argv)
+	profiling.setup (globalArgs)
+
+	if not globalArgs.quiet:
+		printHello ()
+
+	runSteps (calculation.Calculation ('.'), stepArgs, globalArgs.quiet)
+
+if __name__ == "__main__":
+	main ()
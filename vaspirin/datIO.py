@@ -1,7 +1,8 @@
 #!/usr/bin/env python
-import os, shutil
+import os, sys, shutil
 import numpy as np
 from scipy.interpolate import interp1d
+from . import binIO, doscar, profiling
 
 class DatFiles (object):
 	"""
@@ -19,7 +20,7 @@ class DatFiles (object):
 		The size of the symbols
 		"""
 		
-		self.flagINTERPOLATE = False
+		self.flagInterpolate = False
 		"""
 		Whether to interpolate or not the values within .dat files
 		"""
@@ -44,6 +45,7 @@ class DatFiles (object):
 			self.interpolationType = 'linear'
 	
 	
+	@profiling.timed ('datIO.datEigenvals')
 	def datEigenvals (self, bandStructure, datName='eigenv.dat'):
 		"""
 		Creates the eigenv.dat file
@@ -55,14 +57,12 @@ class DatFiles (object):
 		Different bands are separated by a \n\n
 		"""
 		
+		## Uses the information we already have to interpolate, all bands at once
+		if self.flagInterpolate:
+			E = self.resampleEigenvals (bandStructure, self.commonAxis (bandStructure.xAxis))
+		
 		with open (datName,'w') as outputFile:
-			for band in range(bandStructure.nBands):
-				
-				## The eigenvalues are organized as in bandStructure.eigenvals[k-point][band]
-				eigenvals = [kpt[band] for kpt in bandStructure.eigenvals]
-				
-				## Uses the information we already have to interpolate
-				spl = interp1d (bandStructure.xAxis, eigenvals, kind=self.interpolationType)
+			for band in bandStructure.selectedBands():
 				
 				## Starts writing the .dat file
 				## The range starts in 1 to allow linear interpolations within the k-points axis
@@ -76,8 +76,8 @@ class DatFiles (object):
 							t = (interpol_kpt)/(self.pointsInterpolate+1)
 							k = ((1-t)*bandStructure.xAxis[kpoint-1] + t*bandStructure.xAxis[kpoint])
 							
-							## Interpolates the eigenvalues
-							E_k = spl(k) - bandStructure.reference
+							## Interpolated eigenvalue, as sampled on the axis of commonAxis
+							E_k = E[(kpoint-1)*(self.pointsInterpolate+1) + interpol_kpt, band]
 							
 							## Writes to the .dat file the interpolated eigenvalues
 							outputFile.write ("%.6f % 3.6f\n" % (k, E_k))
@@ -91,6 +91,96 @@ class DatFiles (object):
 				## Ends the band with an additional \n
 				outputFile.write ("\n")
 	
+	def commonAxis (self, xAxis):
+		"""
+		Returns the x-axis xAxis including the interpolated points, if interpolation is set
+		"""
+
+		xAxis = np.asarray (xAxis, dtype=float)
+
+		if not self.flagInterpolate:
+			return xAxis
+
+		## Interpolates linearly pointsInterpolate points between each pair of k-points
+		t = np.arange (self.pointsInterpolate+1)/(self.pointsInterpolate+1)
+		k = (1-t[None,:])*xAxis[:-1,None] + t[None,:]*xAxis[1:,None]
+
+		return np.append (k.flatten(), xAxis[-1])
+
+	@profiling.timed ('datIO.resampleEigenvals')
+	def resampleEigenvals (self, bandStructure, xAxis):
+		"""
+		Resamples all bands of bandStructure onto the x-axis xAxis at once.
+		Returns the array E[k-point][band], already shifted by the reference.
+		"""
+
+		eigenvals = np.asarray (bandStructure.eigenvals, dtype=float)
+		x = np.asarray (bandStructure.xAxis, dtype=float)
+		xAxis = np.asarray (xAxis, dtype=float)
+		E = np.empty ((len(xAxis),) + eigenvals.shape[1:])
+
+		## Each piece of the path between jumps (see outcar.readJumps) is interpolated on its own, all bands in a single call.
+		## Both ends of a jump share the same x: the first sample there belongs to the piece before the jump, the next ones to the piece after it
+		starts = [0] + [j for j in bandStructure.jumps if 0 < j < len(x)] + [len(x)]
+		first = 0
+		for start, end in zip (starts[:-1], starts[1:]):
+			last = len(xAxis) if end == len(x) else np.searchsorted (xAxis, x[end], side='left') + 1
+
+			if end - start == 1:
+				E[first:last] = eigenvals[start]
+			else:
+				## Pieces too short for the chosen interpolation are interpolated linearly
+				kind = self.interpolationType if end - start > 3 else 'linear'
+				spl = interp1d (x[start:end], eigenvals[start:end], kind=kind, axis=0)
+				E[first:last] = spl (np.clip (xAxis[first:last], x[start], x[end-1]))
+
+			first = last
+
+		return E - bandStructure.reference
+
+	def resampleContributions (self, contributions):
+		"""
+		Returns the contributions, indexed as [k-point][...], including the points interpolated
+		linearly between each pair of k-points, as in commonAxis
+		"""
+
+		c = np.asarray (contributions, dtype=float)
+
+		if not self.flagInterpolate:
+			return c
+
+		## The interpolation runs within each pair of k-points, so that repeated k-points are kept
+		t = (np.arange (self.pointsInterpolate+1)/(self.pointsInterpolate+1)).reshape ((1, -1) + (1,)*(c.ndim-1))
+		ct = (1-t)*c[:-1,None] + t*c[1:,None]
+
+		return np.concatenate ((ct.reshape ((-1,) + c.shape[1:]), c[-1:]))
+
+	@profiling.timed ('datIO.datComparedEigenvals')
+	def datComparedEigenvals (self, bandStructures, datName='eigenvComparison.dat'):
+		"""
+		Creates a single .dat file containing the bands of several band structures.
+		All band structures are resampled onto the x-axis of the first one.
+		Format:
+		1st column) normalized k-point (from 0 to 1, derived from the path length)
+		2nd column) eigenvalue
+
+		Bands are written in sequence, first all bands of the first band structure,
+		then all bands of the second one, and so on. Different bands are separated by a \n\n
+		"""
+
+		xAxis = self.commonAxis (bandStructures[0].xAxis)
+
+		with open (datName,'w') as outputFile:
+			for bandStructure in bandStructures:
+				E = self.resampleEigenvals (bandStructure, xAxis)
+
+				for band in range(bandStructure.nBands):
+					outputFile.write ("".join (["%.6f % 3.6f\n" % (k, e) for k, e in zip(xAxis, E[:,band])]))
+
+					## Ends the band with an additional \n
+					outputFile.write ("\n")
+
+	@profiling.timed ('datIO.datCharacter')
 	def datCharacter (self, bandStructure, bandCharacter):
 		"""
 		Creates the bands_character folder
@@ -99,85 +189,17 @@ class DatFiles (object):
 		1st column) normalized k-point (from 0 to 1, derived from the path length)
 		2nd column) eigenvalue
 		
-		The following columns contain the relative contribution of each orbital, canonically:
+		The following columns contain the relative contribution of each group of orbitals
+		(see procar.PROCAR.setOrbitalGroups), by default:
 		3rd column) contribution of the s orbitals
 		4th column) contribution of the px + py orbitals
 		5th column) contribution of the pz orbitals
 		6th column) contribution of the d orbitals
-		
-		Depending on the functions, the contributions of other orbitals, e.g. dz2, may be explicited in other columns
-		However, this requires modifications on the code not yet implemented
 		"""
 
-		## Creates the bands_character folder, if it does not exists
-		try:
-			os.mkdir ('bands_character')
-		except FileExistsError:
-			shutil.rmtree ('bands_character')
-			os.mkdir ('bands_character')
-		
-		## Starts writing the band files
-		## Each band receives a .dat file for itself
-		for band in range(bandStructure.nBands):
-			with open ("bands_character/band%02d.dat" % int(band+1),'w') as outputFile:
-				
-				## The range starts in 1 to allow linear interpolations within the k-points axis:
-				for kpoint in range(1, len(bandStructure.xAxis)):
-					
-					## Checks whether interpolation shall be used
-					if self.flagInterpolate:
-
-						## The eigenvalues are organized as in bandStructure.eigenvals[k-point][band]
-						eigenvals = [kpt[band] for kpt in bandStructure.eigenvals]
-						
-						## Uses the information we already have to interpolate
-						spl = interp1d (bandStructure.xAxis, eigenvals, kind=self.interpolationType)
-						
-						for interpol_kpt in range (self.pointsInterpolate+1):
-							## Interpolates linearly the k-point axis
-							t = (interpol_kpt)/(self.pointsInterpolate+1)
-							k = (1-t)*bandStructure.xAxis[kpoint-1] + t*bandStructure.xAxis[kpoint]
-							
-							## Interpolates the eigenvalues
-							E_k = spl(k) - bandStructure.reference 
-							
-							## Writes to the .dat file the interpolated eigenvalues
-							outputFile.write ("%.6f % 3.6f" % (k, E_k))
-							
-							## Writes to the .dat file the interpolated contributions
-							for i in range(len(bandCharacter.orbitalContributions[kpoint][band])):
-								## Interpolates linearly the orbital contributions to be plotted
-								contrib = (1-t)*float(bandCharacter.orbitalContributions[kpoint-1][band][i]) + t*float(bandCharacter.orbitalContributions[kpoint][band][i])
-								
-								contrib *= self.markerSize
-								
-								## Writes to the .dat file the interpolated contributions
-								outputFile.write(" %1.4f" % contrib)
-							
-							## Finishes writing the current k-point to file
-							outputFile.write ("\n")
-
-					else:			
-						## Simply writes the eigenvalues to the .dat file
-						outputFile.write ("%.6f % 3.6f" % (bandStructure.xAxis[kpoint-1], bandStructure.eigenvals[kpoint-1][band] - bandStructure.reference))
-						
-						## As well as the contributions
-						for contrib in bandCharacter.orbitalContributions[kpoint-1][band]:
-							outputFile.write(" %1.4f" % (float(contrib)*self.markerSize))	
-						
-						## Finishes writing the current k-point to file
-						outputFile.write ("\n")
-				
-				## Print the last k-point
-				outputFile.write ("%.6f % 3.6f" % (bandStructure.xAxis[len(bandStructure.xAxis)-1], bandStructure.eigenvals[len(bandStructure.xAxis)-1][band] - bandStructure.reference))
-				for contrib in bandCharacter.orbitalContributions[len(bandStructure.xAxis)-1][band]:
-					outputFile.write(" %1.4f" % (float(contrib)*self.markerSize))
-				outputFile.write ("\n")
-				
-				## Finishes printing the band					
-				outputFile.write ("\n")
-		
+		self.writeBandFiles ('bands_character', bandStructure, bandCharacter.orbitalContributions)
 	
+	@profiling.timed ('datIO.datProjected')
 	def datProjected (self, bandStructure, bandCharacter):
 		"""
 		Creates the bands_projected folder
@@ -193,76 +215,128 @@ class DatFiles (object):
 		... and so on
 		"""
 		
-		## Creates the bands_projected folder, if it does not exists
+		self.writeBandFiles ('bands_projected', bandStructure, bandCharacter.materialContributions)
+
+	@profiling.timed ('datIO.datJoint')
+	def datJoint (self, bandStructure, bandCharacter):
+		"""
+		Creates the bands_joint folder
+		Each file in the folder contains the eigenvalues and contributions projected for each band
+		
+		File formatting:
+		1st column) normalized k-point (from 0 to 1, derived from the path length)
+		2nd column) eigenvalue
+		
+		The following columns contain the relative contribution of each joint projection
+		onto ions and orbitals (see procar.PROCAR.setJointSpecs), in the order they were given
+		"""
+		
+		self.writeBandFiles ('bands_joint', bandStructure, bandCharacter.jointContributions)
+	
+	def writeBandFiles (self, folder, bandStructure, contributions):
+		"""
+		Creates the folder with one file per selected band, as read by XMGrace
+		Each row holds the k-point, the eigenvalue and the contributions[k-point][band][column]
+		multiplied by the size of the symbols. When interpolation is set, the eigenvalues follow
+		the chosen interpolation while the contributions are interpolated linearly.
+		"""
+		
+		## Creates the folder, if it does not exists
 		try:
-			os.mkdir ('bands_projected')
+			os.mkdir (folder)
 		except FileExistsError:
-			shutil.rmtree ('bands_projected')
-			os.mkdir ('bands_projected')
+			shutil.rmtree (folder)
+			os.mkdir (folder)
 		
-		## Starts writing the band files
-		## Each band receives a .dat file for itself
-		for band in range(bandStructure.nBands):
+		x = np.asarray (bandStructure.xAxis, dtype=float)
+		c = np.asarray (contributions, dtype=float)[:len(x)]
+		
+		xAxis = self.commonAxis (x)
+		if self.flagInterpolate:
+			E = self.resampleEigenvals (bandStructure, xAxis)
+		else:
+			E = np.asarray (bandStructure.eigenvals, dtype=float)[:len(x)] - bandStructure.reference
+		
+		rowFormat = "%.6f % 3.6f" + " %1.4f"*c.shape[2] + "\n"
+		
+		for band in bandStructure.selectedBands():
+			rows = np.column_stack ((xAxis, E[:,band], self.resampleContributions (c[:,band])*self.markerSize))
 			
-			with open ("bands_projected/band%02d.dat" % int(band+1),'w') as outputFile:
-				
-				## The range starts in 1 to allow linear interpolations within the k-points axis:
-				for kpoint in range(1, len(bandStructure.xAxis)):
-					
-					## Checks whether interpolation shall be used
-					if self.flagInterpolate:
-						
-						## The eigenvalues are organized as in bandStructure.eigenvals[k-point][band]
-						eigenvals = [kpt[band] for kpt in bandStructure.eigenvals]
-						
-						## Uses the information we already have to interpolate
-						spl = interp1d (bandStructure.xAxis, eigenvals, kind=self.interpolationType)
-						
-						
-						for interpol_kpt in range (self.pointsInterpolate+1):
-							## Interpolates linearly the k-point axis
-							t = (interpol_kpt)/(self.pointsInterpolate+1)
-							k = (1-t)*bandStructure.xAxis[kpoint-1] + t*bandStructure.xAxis[kpoint]
-							
-							## Interpolates the eigenvalues
-							E_k = spl(k) - bandStructure.reference 
-							
-							## Writes to the .dat file the interpolated eigenvalues
-							outputFile.write ("%.6f % 3.6f" % (k, E_k))
-					
-							## Writes to the .dat file the interpolated contributions
-							for i in range(len(bandCharacter.materialContributions[kpoint-1][band])):
-								## Interpolates linearly the orbital contributions to be plotted
-								contrib = (1-t)*float(bandCharacter.materialContributions[kpoint-1][band][i]) + t*float(bandCharacter.materialContributions[kpoint][band][i])
-							
-								contrib *= self.markerSize
-								
-								## Writes to the .dat file the interpolated contributions
-								outputFile.write(" %1.4f" % contrib)
-								
-							## Finishes writing the current k-point to file
-							outputFile.write ("\n")
-								
-					else:
-						## Simply writes the eigenvalues to the .dat file
-						outputFile.write ("%.6f % 3.6f" % (bandStructure.xAxis[kpoint-1], bandStructure.eigenvals[kpoint-1][band] - bandStructure.reference))
-						
-						## As well as the contributions
-						for contrib in bandCharacter.materialContributions[kpoint][band]:
-							outputFile.write(" %1.4f" % (float(contrib)*self.markerSize))
-						
-						## Finishes writing the current k-point to file
-						outputFile.write ("\n")
+			with open ("%s/band%02d.dat" % (folder, int(band+1)),'w') as outputFile:
+				outputFile.write ("".join ([rowFormat % tuple(row) for row in rows]))
 				
-				# Print last k-point
-				outputFile.write ("%.6f % 3.6f" % (bandStructure.xAxis[len(bandStructure.xAxis)-1], bandStructure.eigenvals[len(bandStructure.xAxis)-1][band] - bandStructure.reference))
-				for contrib in bandCharacter.materialContributions[len(bandStructure.xAxis)-1][band]:
-					outputFile.write(" %1.4f" % (float(contrib)*self.markerSize))
-				outputFile.write ("\n")
-				
-				## Finishes printing the band		
+				## Finishes printing the band
 				outputFile.write ("\n")
 	
+	@profiling.timed ('datIO.binCharacter')
+	def binCharacter (self, bandStructure, bandCharacter, fName='bandsCharacter.bin'):
+		"""
+		Writes the contents of the bands_character folder to a single binary file (see binIO.BandsFile)
+		Only the calculated k-points are stored, interpolation is not applied
+		"""
+
+		return binIO.writeBandsFile (fName, bandStructure, bandCharacter.orbitalContributions, kind='character')
+
+	@profiling.timed ('datIO.binProjected')
+	def binProjected (self, bandStructure, bandCharacter, fName='bandsProjected.bin'):
+		"""
+		Writes the contents of the bands_projected folder to a single binary file (see binIO.BandsFile)
+		Only the calculated k-points are stored, interpolation is not applied
+		"""
+
+		return binIO.writeBandsFile (fName, bandStructure, bandCharacter.materialContributions, kind='projected')
+
+	@profiling.timed ('datIO.binJoint')
+	def binJoint (self, bandStructure, bandCharacter, fName='bandsJoint.bin'):
+		"""
+		Writes the contents of the bands_joint folder to a single binary file (see binIO.BandsFile)
+		Only the calculated k-points are stored, interpolation is not applied
+		"""
+
+		return binIO.writeBandsFile (fName, bandStructure, bandCharacter.jointContributions, kind='joint')
+
+	def arrayProjected (self, bandStructure, bandCharacter):
+		"""
+		Returns the contents of the bands_projected folder as a single array,
+		without writing any file. The array is indexed as [band][k-point][column],
+		with the same columns as the files written by datProjected.
+		"""
+
+		x = np.asarray (bandStructure.xAxis, dtype=float)
+		E = np.asarray (bandStructure.eigenvals, dtype=float)[:len(x)].T - bandStructure.reference
+		c = np.asarray (bandCharacter.materialContributions, dtype=float)[:len(x)].transpose(1,0,2) * self.markerSize
+
+		return np.concatenate ((np.broadcast_to (x, E.shape)[:,:,None], E[:,:,None], c), axis=2)
+
+	def readBandFiles (self, folder, firstBand, lastBand):
+		"""
+		Reads the files bandNN.dat from firstBand to lastBand (inclusive) inside folder,
+		e.g. those written by datProjected or by the PROCAR splitter.
+		All files are parsed at once and returned as an array indexed as [band][k-point][column].
+		"""
+
+		texts = []
+		try:
+			for band in range (firstBand, lastBand+1):
+				with open (os.path.join (folder, "band%02d.dat" % band), 'r') as f:
+					texts.append (f.read())
+		except FileNotFoundError:
+			print ("Band out of range! Check if you have correctly inserted the bands you want to draw.")
+			sys.exit(1)
+
+		nColumns = len(texts[0].split('\n',1)[0].split())
+		values = np.array (' '.join(texts).split(), dtype=float)
+
+		return values.reshape (len(texts), -1, nColumns)
+
+	def writeDOSTrace (self, outputFile, energies, values):
+		"""
+		Writes a trace of the density of states, one energy per line, shifted by the reference
+		"""
+
+		outputFile.write ("".join (["% .3f %3.5f\n" % row for row in zip (energies, values)]))
+
+	@profiling.timed ('datIO.datDOS')
 	def datDOS (self, DOS, datName='dos.dat'):
 		"""
 		Creates the dos.dat file
@@ -273,9 +347,9 @@ class DatFiles (object):
 		"""
 		with open (datName,'w') as outputFile:
 			## Print Total DOS
-			for i in range(len(DOS.energies)):
-				outputFile.write ("% .3f %3.5f\n" % (DOS.energies[i] - DOS.reference, DOS.states[i]))
+			self.writeDOSTrace (outputFile, np.asarray (DOS.energies) - DOS.reference, DOS.states)
 	
+	@profiling.timed ('datIO.datDOSproj')
 	def datDOSproj (self, DOS, datName='dosProj.dat'):
 		"""
 		Creates the dosProj.dat file
@@ -289,16 +363,15 @@ class DatFiles (object):
 		"""
 		with open (datName,'w') as outputFile:
 			## Print Total DOS
-			for i in range(len(DOS.energies)):
-				outputFile.write ("% .3f %3.5f\n" % (DOS.energies[i] - DOS.reference, DOS.states[i]))
+			self.writeDOSTrace (outputFile, np.asarray (DOS.energies) - DOS.reference, DOS.states)
 			outputFile.write ("\n")
 			
 			## Print projected DOS onto materials
 			for material in DOS.materialDOS:
-				for i in range(material.nEDOS):
-					outputFile.write ("% .3f %3.5f\n" % (material.totalDOS[i][0] - DOS.reference, material.totalDOS[i][1]))
+				self.writeDOSTrace (outputFile, material.totalDOS[:,0] - DOS.reference, material.totalDOS[:,1])
 				outputFile.write ("\n")
 	
+	@profiling.timed ('datIO.datDOSorbital')
 	def datDOSorbital (self, DOS, datName='dosOrbital.dat'):
 		"""
 		Creates the dosProj.dat file
@@ -312,39 +385,58 @@ class DatFiles (object):
 		"""
 		with open (datName,'w') as outputFile:
 			## Print Total DOS
-			for i in range(len(DOS.energies)):
-				outputFile.write ("% .3f %3.5f\n" % (DOS.energies[i] - DOS.reference, DOS.states[i]))
+			self.writeDOSTrace (outputFile, np.asarray (DOS.energies) - DOS.reference, DOS.states)
 			outputFile.write ("\n")
 			
-			orbitalDOS = DOS.orbitalDOS
+			dos = DOS.orbitalDOS.dos
+			energies = dos[:,0] - DOS.reference
 			
-			## Print projected DOS onto orbitals
-			for i in range(orbitalDOS.nEDOS):
-				## Energy
-				outputFile.write ("% .3f" % (orbitalDOS.dos[i][0] - DOS.reference))
-				## s orbitals
-				outputFile.write (" %3.5f\n" % (orbitalDOS.dos[i][1]))
-			outputFile.write ("\n")
-
-			for i in range(orbitalDOS.nEDOS):
-				## Energy
-				outputFile.write ("% .3f" % (orbitalDOS.dos[i][0] - DOS.reference))
-				## px + py orbitals
-				outputFile.write (" %3.5f\n" % (orbitalDOS.dos[i][2] + orbitalDOS.dos[i][4]))
-			outputFile.write ("\n")
-
-			for i in range(orbitalDOS.nEDOS):
-				## Energy
-				outputFile.write ("% .3f" % (orbitalDOS.dos[i][0] - DOS.reference))
-				## pz orbitals
-				outputFile.write (" %3.5f\n" % (orbitalDOS.dos[i][3]))
-			outputFile.write ("\n")
-
-			for i in range(orbitalDOS.nEDOS):
-				## Energy
-				outputFile.write ("% .3f" % (orbitalDOS.dos[i][0] - DOS.reference))
-				## d orbitals
-				outputFile.write (" %3.5f\n" % (sum(orbitalDOS.dos[i][5:10])))
-				
-			outputFile.write ("\n")
-				
+			## d orbitals, summed in the order of the columns
+			d = dos[:,5]
+			for column in range (6, 10):
+				d = d + dos[:,column]
+			
+			## Print projected DOS onto s, px + py, pz and d orbitals
+			for values in [dos[:,1], dos[:,2] + dos[:,4], dos[:,3], d]:
+				self.writeDOSTrace (outputFile, energies, values)
+				outputFile.write ("\n")
+	
+	@profiling.timed ('datIO.datMoments')
+	def datMoments (self, labels, table, datName='dosMoments.dat'):
+		"""
+		Creates the dosMoments.dat file from the labels and the table of doscar.DOS.momentsTable
+		
+		File formatting:
+		1st to 3rd columns) kind (total, system, atom or material), name and group of orbitals
+		other columns) integrated states and moments, as in doscar.MomentConstants.columns
+		"""
+		with open (datName,'w') as outputFile:
+			outputFile.write ("# kind name orbital " + ' '.join (doscar.MomentConstants.columns) + "\n")
+			outputFile.write ("".join (["%-8s %-6s %-4s" % label + " %10.4f %10.4f % 9.4f %9.4f % 9.4f\n" % tuple(row)
+										for label, row in zip (labels, table)]))
+	
+	@profiling.timed ('datIO.datIntegrated')
+	def datIntegrated (self, DOS, datName='dosIntegrated.dat'):
+		"""
+		Creates the dosIntegrated.dat file, with the number of states below each energy (see doscar.integrate)
+		
+		File formatting:
+		1st column) eigenvalue (with respect to a reference)
+		2nd column) integrated total DOS
+		following columns) integrated DOS of each material, if projected
+		"""
+		
+		names = ['total']
+		columns = [DOS.states]
+		
+		if DOS.materialDOS:
+			for material in sorted (DOS.prj.dictMaterials, key = DOS.prj.dictMaterials.get):
+				names.append (material)
+				columns.append (DOS.materialDOS[DOS.prj.dictMaterials[material]].totalDOS[:, 1])
+		
+		integrated = doscar.integrate (DOS.energies, np.column_stack (columns))
+		
+		with open (datName,'w') as outputFile:
+			outputFile.write ("# energy " + ' '.join (names) + "\n")
+			outputFile.write ("".join ([("% .3f" + " %10.4f"*len(names) + "\n") % ((e,) + tuple(row))
+										for e, row in zip (np.asarray (DOS.energies) - DOS.reference, integrated)]))
@@ -1,13 +1,45 @@
-import copy
+import os, sys
+import numpy as np
+from scipy.signal import fftconvolve
+from scipy.integrate import cumulative_trapezoid
+from . import procar, profiling
+
+class BroadeningConstants (object):
+	'''
+	Shapes of the functions used to broaden the density of states (see broaden)
+	'''
+
+	shapes = ['gaussian', 'lorentzian']
+
+	## Width (in eV) of the smearing of the DOS built from eigenvalues (see BandsDOS)
+	defaultWidth = 0.05
+
+	## Number of energy points of the DOS built from eigenvalues
+	defaultNEDOS = 2001
+
+class MomentConstants (object):
+	'''
+	Columns and orbitals of the table of integrated states and moments of the DOS (see DOS.momentsTable)
+	'''
+
+	## Integrated states within the window, states below the Fermi level, and center, width and skewness of the DOS
+	columns = ['states', 'occupied', 'center', 'width', 'skewness']
+
+	## Groups of orbitals whose moments are computed, besides the sum of all orbitals ('tot').
+	## f is only kept when the DOSCAR file has f orbitals
+	defaultGroups = ['s', 'p', 'd', 'f']
+
+	## Orbitals in the columns of the DOSCAR file, as named in the PROCAR file (see procar.orbitalGroupMatrix)
+	orbitalNames = ['s', 'py', 'pz', 'px', 'dxy', 'dyz', 'dz2', 'dxz', 'dx2',
+					'fy3x2', 'fxyz', 'fyz2', 'fz3', 'fxz2', 'fzx2', 'fx3']
 
 class AtomicDOS (object):
 	"""
 	Density of states projected onto an atom.
-	Contains a list of lists (matrix-like) of the following format:
+	Contains an array (matrix-like) with one row per energy:
 		[energy1, energy2, ...]
 	
-	Each `energy` list is a list itself, which contains the energy of the line and the
-	density of states projected onto each orbital:
+	Each row contains the energy of the line and the density of states projected onto each orbital:
 		[energy, s, py, pz, px, dxy, dyz, dz2, dxz, dx2]
 	"""
 	
@@ -21,27 +53,29 @@ class AtomicDOS (object):
 		The number of points (energies sampled) for this DOS calculation
 		"""
 		
-		self.dos = []
+		self.dos = np.zeros ((0, 10))
 		"""
-		List of lists of the kind:
+		Array with rows of the kind:
 			[energy, s, py, pz, px, dxy, dyz, dz2, dxz, dx2]
 		"""
 		
-		self.totalDOS = []
+		self.totalDOS = np.zeros ((0, 2))
 		"""
-		List of lists of the kind:
+		Array with rows of the kind:
 			[energy, s + py + pz + px + dxy + dyz + dz2 + dxz + dx2]
 		"""
 	
 	def sumTotalDOS (self):
 		"""
-		Sums the total DOS from self.dos list
+		Sums the total DOS from self.dos array, over all orbitals (9 columns, or 16 with f orbitals)
 		"""
 		
-		self.totalDOS = []
+		## The orbitals are summed one at a time, in the order of the columns
+		total = np.zeros (len(self.dos))
+		for column in range (1, self.dos.shape[1]):
+			total = total + self.dos[:, column]
 		
-		for energy in self.dos:
-			self.totalDOS.append([energy[0], sum(energy[-9:])])
+		self.totalDOS = np.column_stack ((self.dos[:, 0], total))
 		
 		return
 	
@@ -54,11 +88,10 @@ class AtomicDOS (object):
 			print ("Summing different atomic DOS! Exiting...")
 			return 1
 			
-		if not self.dos:
-			self.dos = AtomicDOS_atom.dos
+		if not len(self.dos):
+			self.dos = AtomicDOS_atom.dos.copy ()
 		else:
-			for i in range (len(self.dos)):
-				self.dos[i] = [self.dos[i][0]] + [self.dos[i][j] + AtomicDOS_atom.dos[i][j] for j in range(1,len(self.dos[i]))]
+			self.dos[:, 1:] = self.dos[:, 1:] + AtomicDOS_atom.dos[:, 1:]
 		
 		return
 
@@ -68,9 +101,13 @@ class DOS (object):
 	Describes a DOSCAR file.
 	"""
 
-	def __init__(self,fDoscar="DOSCAR"):
+	@profiling.timed ('doscar.DOS')
+	def __init__(self,fDoscar="DOSCAR",lazy=False,projection=None):
 		"""
-		Initializes the reading of the DOSCAR file
+		Initializes the reading of the DOSCAR file.
+		If lazy, the atomic blocks are only indexed: the atoms are parsed when needed (see selectAtoms), and the DOS
+		projected onto orbitals and, if a projection is given, onto materials are summed in a single pass over
+		the blocks, one block at a time (see streamContributions).
 		"""
 		
 		self.fDoscar = fDoscar
@@ -98,7 +135,22 @@ class DOS (object):
 		The total density of states in the system
 		"""
 		
-		self.atomsDOS = self.readAtomsDOS()
+		self.offsets = indexAtomBlocks (fDoscar, self.nEDOS)
+		"""
+		Byte offsets of the first line of each atomic block within the DOSCAR file
+		"""
+		
+		self.lazy = lazy
+		"""
+		Whether only the atoms needed are parsed
+		"""
+		
+		self.atoms = [] if lazy else list(range(len(self.offsets)))
+		"""
+		Indexes (from 0) of the atoms parsed, in the order of self.atomsDOS
+		"""
+		
+		self.atomsDOS = self.readAtomsDOS(self.atoms)
 		"""
 		List of atoms containing the density of states projected onto atomic orbitals
 		"""
@@ -113,6 +165,19 @@ class DOS (object):
 		For projecting the DOS onto groups of atomic sites (materials)
 		"""
 		
+		self.prj = projection
+		"""
+		PROJECTION information, if given (see setProjection)
+		"""
+		
+		self.broadenings = []
+		"""
+		Broadenings (width, shape) applied so far, applied again to the sums streamed afterwards if lazy
+		"""
+		
+		if lazy:
+			self.streamContributions()
+		
 		self.reference = self.eFermi
 		"""
 		Reference for the DOS calculation
@@ -154,97 +219,145 @@ class DOS (object):
 		self.prj = projection
 
 
+	def readHeader(self):
+		"""
+		Read the 6th line of the DOSCAR file: Emax, Emin, NEDOS, E-fermi and a weight
+		"""
+		try:
+			with open(self.fDoscar,'r') as fileIn:
+				for i in range(5):
+					fileIn.readline()
+				
+				header = fileIn.readline()
+		
+		except FileNotFoundError:
+			print ("DOSCAR file not found! Exiting...\n")
+			sys.exit (1)
+		
+		return header.split()
+
 	def readNEDOS(self):
 		"""
 		Read the number of energy points used in this calculation
 		"""
-		with open(self.fDoscar,'r') as fileIn:
-			nedos = int (fileIn.read().split('\n')[5].split()[2])
-		
-		return nedos
+		return int (self.readHeader()[2])
 		
 
 	def readEFermi(self):
 		"""
 		Read the Fermi energy from the DOSCAR
 		"""
+		return float (self.readHeader()[3])
 		
-		with open(self.fDoscar,'r') as fileIn:
-			ef = float (fileIn.read().split('\n')[5].split()[3])
 
-		return ef
+	def readTotalDOS(self):
+		"""
+		Read the block of the total DOS of the system, as an array with rows of the kind:
+			[energy, density of states]
+		The atomic blocks are not read.
+		"""
+		with open(self.fDoscar,'r') as fileIn:
+			lines = [fileIn.readline() for k in range(6+self.nEDOS)][6:]
 		
+		return np.array ([eachLine.split()[:2] for eachLine in lines], dtype=float)
 
 	def readEnergies(self):
 		"""
 		Read the energies in which the density of states is calculated within the system
 		"""
-		with open(self.fDoscar,'r') as fileIn:
-			doscar=fileIn.read()
-			
-		energies=[]
-		
-		lines=doscar.split('\n')
 		
 		## Extracts the energies calculated within the system
-		for k in range(6,6+self.nEDOS):
-			energies.append( float(lines[k].split()[0]) )
-		fileIn.close()
-
-		return energies
+		return self.readTotalDOS()[:,0]
 
 	def readStates(self):
 		"""
 		Read the total density of states of the system.
 		"""
 		
-		with open(self.fDoscar,'r') as fileIn:
-			doscar=fileIn.read()
-			
-		states=[]
-		
-		lines=doscar.split('\n')
-		
 		## Extracts the total density of states from the system
-		for k in range(6,6+self.nEDOS):
-			states.append( float(lines[k].split()[1]) )
-			
-		return states
+		return self.readTotalDOS()[:,1]
 
-	def readAtomsDOS(self):
+	def readAtomsDOS(self, atoms):
 		"""
-		Provides information of DOS projected by atomic orbitals. Reads the projected DOS from the DOSCAR file and returns a list of AtomicDOS.
-		The list has the format [atom1, atom2, ...].
+		Provides information of DOS projected by atomic orbitals. Reads the projected DOS of the atoms
+		(indexes from 0) from the DOSCAR file, one block at a time, and returns a list of AtomicDOS.
+		The list has the format [atom1, atom2, ...], in the order of atoms.
 		"""
 
 		atomsDOS = []
 		
-		with open (self.fDoscar, 'r') as f:
-			## Throw away the first 5 lines
-			for i in range(6):
-				f.readline()
-			
-			## Divider between each DOSCAR file
-			atomicBlocks = f.read().split(" 1.00000000\n")
-			## Throw away the total DOS
-			del atomicBlocks[0]
-			
-			for block in atomicBlocks:
+		with open (self.fDoscar, 'rb') as f:
+			for eachAtom in atoms:
 				atom = AtomicDOS (self.nEDOS)
-				lines = block.split('\n')
-				lines = [x for x in lines if x]
-				
-				if len(lines) == self.nEDOS + 1:
-					del lines[-1]
 				
-				## Creates a vector of (vectors of floats)
-				atom.dos = [ list(map (float, eachLine.split())) for eachLine in lines]
+				## Creates an array with one row per energy
+				atom.dos = readAtomBlock (f, self.offsets[eachAtom], self.nEDOS)
 				atom.sumTotalDOS ()
 				
 				atomsDOS.append(atom)
 					
 		return atomsDOS
 
+	def selectAtoms(self, atoms):
+		"""
+		Parses the atoms (indexes from 0) which have not been read from the DOSCAR file yet.
+		Useful with lazy DOS, e.g. to analyse only a few atoms of a large cell.
+		"""
+		
+		atoms = [x for x in dict.fromkeys (atoms) if x not in self.atoms]
+		
+		if not atoms:
+			return
+		
+		if any (x < 0 or x >= len(self.offsets) for x in atoms):
+			print ("Atoms out of range! The DOSCAR file has %d atoms. Exiting...\n" % len(self.offsets))
+			sys.exit (1)
+		
+		atomsDOS = self.readAtomsDOS (atoms)
+		self.applyBroadenings (atomsDOS)
+		
+		self.atomsDOS += atomsDOS
+		self.atoms += atoms
+
+	@profiling.timed ('doscar.streamContributions')
+	def streamContributions (self):
+		"""
+		Sum orbital contributions from all atoms and, if a projection is set, contributions from atoms
+		belonging to the same material, in a single pass over the DOSCAR file. The atomic blocks are
+		read and added one at a time, hence the memory used does not depend on the number of atoms.
+		"""
+		
+		materials = None
+		if self.prj is not None:
+			materials = [self.prj.dictMaterials.get(self.prj.ionsVsMaterials[i]) if i < len(self.prj.ionsVsMaterials) else None
+						 for i in range(len(self.offsets))]
+		
+		total, totals = sumAtomBlocks (self.fDoscar, self.offsets, self.nEDOS, materials, len(self.prj.dictMaterials) if materials else 0)[:2]
+		
+		self.orbitalDOS = AtomicDOS(self.nEDOS)
+		self.orbitalDOS.dos = total
+		
+		if materials:
+			self.materialDOS = [AtomicDOS(self.nEDOS) for i in range(len(totals))]
+			for material, eachTotal in zip (self.materialDOS, totals):
+				material.dos = eachTotal
+		
+		self.applyBroadenings ([self.orbitalDOS] + self.materialDOS)
+	
+	def applyBroadenings (self, traces):
+		"""
+		Broadens the traces (AtomicDOS) read from the DOSCAR file after the DOS has been broadened
+		(see broaden), as the rest of the DOS, and sums their total DOS
+		"""
+		
+		for width, shape in self.broadenings:
+			for trace in traces:
+				if len(trace.dos):
+					trace.dos = np.column_stack ((trace.dos[:, 0], broaden (self.energies, trace.dos[:, 1:], width, shape)))
+		
+		for trace in traces:
+			trace.sumTotalDOS ()
+
 	def sumOrbitalContributions (self):
 		"""
 		Sum orbital contribuions from atoms
@@ -253,8 +366,8 @@ class DOS (object):
 		orbitalDOS = AtomicDOS(self.nEDOS)
 		
 		## Sums the atomic dos from each atom and compiles it into a single material
-		for eachAtom in self.atomsDOS:									
-			orbitalDOS.sumAtomicDOS (copy.deepcopy(eachAtom))
+		for eachAtom in self.atomsDOS:
+			orbitalDOS.sumAtomicDOS (eachAtom)
 		
 		orbitalDOS.sumTotalDOS ()
 		
@@ -262,18 +375,462 @@ class DOS (object):
 	
 	def sumContributions (self):
 		"""
-		Sum contribuions from atoms belonging to the same material
+		Sum contribuions from atoms belonging to the same material.
+		If lazy, the atoms are streamed from the DOSCAR file instead (see streamContributions).
 		"""
 		
+		if self.lazy:
+			self.streamContributions ()
+			return
+		
 		self.materialDOS = [AtomicDOS(self.nEDOS) for i in range(len(self.prj.dictMaterials))]
 		
 		## Sums the atomic dos from each atom and compiles it into a single material
-		for ionIndex in range(len(self.atomsDOS)):									
+		for ionIndex in range(len(self.atomsDOS)):
 			
-			self.materialDOS[self.prj.dictMaterials.get(self.prj.ionsVsMaterials[ionIndex])].sumAtomicDOS (copy.deepcopy(self.atomsDOS[ionIndex]))
+			self.materialDOS[self.prj.dictMaterials.get(self.prj.ionsVsMaterials[ionIndex])].sumAtomicDOS (self.atomsDOS[ionIndex])
 
 		## Finishes compiling the total DOS from each material
 		for material in self.materialDOS:
 			material.sumTotalDOS ()
 		
 		return
+	
+	@profiling.timed ('doscar.broaden')
+	def broaden (self, width, shape='gaussian'):
+		"""
+		Broadens the total DOS and the DOS projected onto each orbital of each atom by convolution
+		with a gaussian or lorentzian function of the given width (in eV, see broaden), on top of
+		the smearing used by VASP. All columns are convolved in a single call. The DOS projected
+		onto orbitals and onto materials are summed again from the broadened atoms, unless lazy:
+		they are then broadened themselves, since not all atoms are parsed.
+		"""
+		
+		traces = self.atomsDOS + ([x for x in [self.orbitalDOS] + self.materialDOS if len(x.dos)] if self.lazy else [])
+		
+		nColumns = [trace.dos.shape[1] - 1 for trace in traces]
+		columns = np.column_stack ([self.states] + [trace.dos[:, 1:] for trace in traces])
+		
+		columns = broaden (self.energies, columns, width, shape)
+		
+		self.states = columns[:, 0]
+		self.broadenings.append ((width, shape))
+		
+		first = 1
+		for trace, n in zip (traces, nColumns):
+			trace.dos = np.column_stack ((trace.dos[:, 0], columns[:, first:first+n]))
+			trace.sumTotalDOS ()
+			first += n
+		
+		## Otherwise, the sums onto orbitals and materials are compiled again from the broadened atoms
+		if not self.lazy:
+			self.orbitalDOS = self.sumOrbitalContributions ()
+			
+			if self.materialDOS:
+				self.sumContributions ()
+	
+	@profiling.timed ('doscar.momentsTable')
+	def momentsTable (self, window = (None, None), groups = None, atoms = None):
+		"""
+		Returns the labels and the table of integrated states and moments (see moments and MomentConstants)
+		of the DOS within the energy window (relative to the reference, the whole range if None), for the
+		total DOS and, for the whole system, for each atom (indexes from 0, all atoms if None) and for each
+		material (if projected, see sumContributions), for each group of orbitals and for the sum of all orbitals ('tot').
+		Each label is a tuple (kind, name, orbital), e.g. ('atom', '3', 'd') or ('material', 'Mo', 'tot').
+		The traces of the system and of the materials are stacked and reduced at once, as an array indexed as [trace][column].
+		If lazy, the atoms not parsed yet are streamed from the DOSCAR file instead: each atomic block is reduced to its rows
+		of the table and discarded, in a single pass (see sumAtomBlocks), so that the memory used does not grow with the number of atoms.
+		"""
+		
+		energies = np.asarray (self.energies) - self.reference
+		reduce = lambda traces: moments (energies, np.column_stack (traces), window, self.eFermi - self.reference)
+		
+		labels = [('total', 'all', 'tot')]
+		traces = [np.asarray (self.states)[:,None]]
+		atomLabels, atomTables, materialLabels, materialTraces = [], [], [], []
+		
+		if len(self.orbitalDOS.dos):
+			groups = list(MomentConstants.defaultGroups if groups is None else groups)
+			
+			## Traces of the system, the atoms and the materials: [energy][orbital], summed into the groups and all orbitals at once
+			names = MomentConstants.orbitalNames[:self.orbitalDOS.dos.shape[1] - 1]
+			groups = [x for x in groups if x != 'f' or len(names) > 9]
+			groupMatrix = np.column_stack ((procar.orbitalGroupMatrix (groups, names), np.ones (len(names))))
+			
+			orbitals = groups + ['tot']
+			
+			labels += [('system', 'all', orbital) for orbital in orbitals]
+			traces.append (np.dot (self.orbitalDOS.dos[:, 1:], groupMatrix))
+			
+			atoms = (range(len(self.offsets)) if self.lazy else self.atoms) if atoms is None else atoms
+			if self.lazy and any (x < 0 or x >= len(self.offsets) for x in atoms):
+				print ("Atoms out of range! The DOSCAR file has %d atoms. Exiting...\n" % len(self.offsets))
+				sys.exit (1)
+			
+			atomsDOS = dict (zip (self.atoms, self.atomsDOS))
+			atoms = sorted (set(atoms) if self.lazy else set(atoms) & set(atomsDOS))
+			
+			## Atoms not parsed yet, broadened as the rest of the DOS and reduced one block at a time
+			def reduceBlock (block):
+				atom = AtomicDOS (self.nEDOS)
+				atom.dos = block
+				self.applyBroadenings ([atom])
+				return reduce ([np.dot (atom.dos[:, 1:], groupMatrix)])
+			
+			streamed = [x for x in atoms if x not in atomsDOS]
+			streamedTables = dict (zip (streamed, sumAtomBlocks (self.fDoscar, [self.offsets[x] for x in streamed], self.nEDOS, reduce = reduceBlock)[2])) if streamed else {}
+			
+			for atom in atoms:
+				atomLabels += [('atom', str(atom+1), orbital) for orbital in orbitals]
+				atomTables.append (streamedTables[atom] if atom in streamedTables else reduce ([np.dot (atomsDOS[atom].dos[:, 1:], groupMatrix)]))
+			
+			if self.materialDOS:
+				for material in sorted (self.prj.dictMaterials, key = self.prj.dictMaterials.get):
+					materialLabels += [('material', material, orbital) for orbital in orbitals]
+					materialTraces.append (np.dot (self.materialDOS[self.prj.dictMaterials[material]].dos[:, 1:], groupMatrix))
+		
+		table = np.vstack ([reduce (traces)] + atomTables + ([reduce (materialTraces)] if materialTraces else []))
+		
+		return labels + atomLabels + materialLabels, table
+
+class BandsDOS (DOS):
+	"""
+	Density of states built from the eigenvalues of a band structure (see outcar.BandStructure)
+	and, optionally, projected onto atomic orbitals using the composition of the bands (see procar.PROCAR),
+	without a DOSCAR file. Provides the same attributes as DOS, so that it can be written and plotted alike.
+	"""
+
+	@profiling.timed ('doscar.BandsDOS')
+	def __init__ (self, bandStructure, bandCharacter = None, weights = None, width = BroadeningConstants.defaultWidth,
+				  shape = 'gaussian', nEDOS = BroadeningConstants.defaultNEDOS, eMin = None, eMax = None):
+		"""
+		Each eigenvalue is weighted by the weight of its k-point (see outcar.readWeights, uniform if None)
+		and by the occupation of the band (2, or 1 with spin-orbit coupling). The eigenvalues are
+		binned onto nEDOS energies from eMin to eMax (by default, the range of the eigenvalues
+		extended by 5*width) and smeared with a function of the given width (see broaden).
+		"""
+		
+		self.fDoscar = None
+		"""
+		No DOSCAR file is read
+		"""
+		
+		eigenvals = np.asarray (bandStructure.eigenvals, dtype=float)
+		nKpoints = len(eigenvals)
+		
+		weights = np.full (nKpoints, 1/nKpoints) if weights is None else np.asarray (weights, dtype=float)[:nKpoints]
+		weights = weights * (1 if bandStructure.soc else 2)
+		
+		self.nEDOS = nEDOS
+		"""
+		The number of energy points used to calculate the DOS
+		"""
+		
+		self.eFermi = bandStructure.eFermi
+		"""
+		The Fermi energy calculated within the system
+		"""
+		
+		eMin = eigenvals.min() - 5*width if eMin is None else eMin
+		eMax = eigenvals.max() + 5*width if eMax is None else eMax
+		
+		self.energies = np.linspace (eMin, eMax, nEDOS)
+		"""
+		The energies used as points for calculation of the DOS
+		"""
+		
+		## Each (k-point, band) pair contributes its weight to the total DOS and, if the composition
+		## of the bands is given, its weight times the contribution of each orbital of each ion
+		values = np.broadcast_to (weights[:,None], eigenvals.shape)[:,:,None]
+		
+		if bandCharacter is not None:
+			ionOrbitals = bandCharacter.getIonOrbitalContributions ()[:nKpoints]
+			nIons, nOrbitals = ionOrbitals.shape[2:]
+			values = np.concatenate ((values, values * ionOrbitals.reshape (nKpoints, -1, nIons*nOrbitals)), axis=2)
+		
+		columns = histogram (self.energies, eigenvals, values, width, shape)
+		
+		self.states = columns[:, 0]
+		"""
+		The total density of states in the system
+		"""
+		
+		self.lazy = False
+		"""
+		All atoms are kept in memory
+		"""
+		
+		self.atomsDOS = []
+		"""
+		List of atoms containing the density of states projected onto atomic orbitals
+		"""
+		
+		if bandCharacter is not None:
+			for ion in range (nIons):
+				atom = AtomicDOS (nEDOS)
+				atom.dos = np.column_stack ((self.energies, columns[:, 1 + ion*nOrbitals : 1 + (ion+1)*nOrbitals]))
+				atom.sumTotalDOS ()
+				self.atomsDOS.append (atom)
+		
+		self.atoms = list(range(len(self.atomsDOS)))
+		"""
+		Indexes (from 0) of the atoms, in the order of self.atomsDOS
+		"""
+		
+		self.orbitalDOS = self.sumOrbitalContributions () if self.atomsDOS else AtomicDOS (nEDOS)
+		"""
+		Returns an AtomicDOS class containing the density of states projected onto atomic orbitals
+		"""
+		
+		self.materialDOS = []
+		"""
+		For projecting the DOS onto groups of atomic sites (materials)
+		"""
+		
+		self.reference = self.eFermi
+		"""
+		Reference for the DOS calculation
+		"""
+
+def indexAtomBlocks (fDoscar, nEDOS):
+	"""
+	Returns the byte offsets of the first line of each atomic block of the DOSCAR file, without parsing them.
+	Each block is preceded by a copy of the 6th line of the file. Since the lines of a block usually have
+	the same length, the next block is looked for one block length ahead, and the lines of the block are
+	only read one by one when it is not found there.
+	"""
+	
+	try:
+		with open (fDoscar, 'rb') as f:
+			for i in range(5):
+				f.readline()
+			
+			header = f.readline()
+			
+			## Throw away the total DOS
+			for i in range(nEDOS):
+				f.readline()
+			
+			size = os.fstat (f.fileno()).st_size
+			offsets = []
+			blockLength = None
+			jumped = False
+			
+			while True:
+				line = f.readline()
+				
+				## The previous block was jumped over, but has lines of another length: read it line by line
+				if jumped and (line != header if line else f.tell() != size):
+					f.seek (offsets[-1])
+					for i in range(nEDOS):
+						f.readline()
+					jumped = False
+					continue
+				
+				if not line.strip():
+					break
+				
+				if line != header:
+					print ("Unexpected line in the DOSCAR file: %s\nExiting...\n" % line.decode().strip())
+					sys.exit (1)
+				
+				offsets.append (f.tell())
+				
+				if blockLength is None:
+					for i in range(nEDOS):
+						f.readline()
+					blockLength = f.tell() - offsets[-1]
+				else:
+					f.seek (blockLength, 1)
+					jumped = True
+	
+	except FileNotFoundError:
+		print ("DOSCAR file not found! Exiting...\n")
+		sys.exit (1)
+	
+	return offsets
+
+def readAtomBlock (f, offset, nEDOS):
+	"""
+	Returns the atomic block starting at offset (see indexAtomBlocks) in the DOSCAR file f, opened in binary mode,
+	as an array with rows of the kind:
+		[energy, s, py, pz, px, dxy, dyz, dz2, dxz, dx2]
+	"""
+	
+	f.seek (offset)
+	lines = [f.readline() for i in range(nEDOS)]
+	
+	return np.array (b''.join(lines).split(), dtype=float).reshape (nEDOS, -1)
+
+def sumAtomBlocks (fDoscar, offsets, nEDOS, groups = None, nGroups = 0, reduce = None):
+	"""
+	Returns the sum of the atomic blocks at the given offsets of the DOSCAR file (the energies are kept),
+	given the index of the group of each block (e.g. its material, None for no group), the list of
+	the sums of the blocks of each of the nGroups groups and, given a function reduce of a block,
+	the list of its results for each block (e.g. rows of moments, see DOS.momentsTable).
+	The blocks are read, added and reduced one at a time, so that the memory used does not grow with the number of atoms.
+	"""
+	
+	groups = [None]*len(offsets) if groups is None else groups
+	total = np.zeros ((0, 10))
+	totals = [np.zeros ((0, 10)) for i in range(nGroups)]
+	reduced = []
+	
+	with open (fDoscar, 'rb') as f:
+		for offset, group in zip (offsets, groups):
+			block = readAtomBlock (f, offset, nEDOS)
+			
+			total = addBlock (total, block)
+			
+			if group is not None:
+				totals[group] = addBlock (totals[group], block)
+			
+			if reduce is not None:
+				reduced.append (reduce (block))
+	
+	return total, totals, reduced
+
+def addBlock (total, block):
+	"""
+	Adds the atomic block to the sum total (empty before the first block), as AtomicDOS.sumAtomicDOS
+	"""
+	
+	if not len(total):
+		return block.copy ()
+	
+	total[:, 1:] = total[:, 1:] + block[:, 1:]
+	
+	return total
+
+def parseAtoms (atomsString):
+	"""
+	Splits a string such as '1..3,7' (as in the PROJECTION file) into a list of indexes of atoms, from 0
+	"""
+	
+	atoms = []
+	
+	for eachAtom in atomsString.split(','):
+		if '..' in eachAtom:
+			first, last = eachAtom.split('..')
+			atoms += list(range (int(first) - 1, int(last)))
+		elif eachAtom.strip():
+			atoms.append (int(eachAtom) - 1)
+	
+	return atoms
+
+def histogram (energies, eigenvals, values, width = 0.0, shape = 'gaussian'):
+	"""
+	Returns the density of states (per eV) on the uniform energy grid energies, as an array indexed as
+	[energy][column], given the eigenvalues and the values[...][column] they contribute to each column
+	(e.g. weights of the k-points times contributions of orbitals), indexed as the eigenvalues.
+	All eigenvalues and columns are binned with a single bincount and then smeared (see broaden).
+	Eigenvalues outside of the energy grid are discarded.
+	"""
+	
+	eigenvals = np.asarray (eigenvals, dtype=float).ravel()
+	values = np.asarray (values, dtype=float).reshape (len(eigenvals), -1)
+	nColumns = values.shape[1]
+	
+	step = (energies[-1] - energies[0])/(len(energies) - 1)
+	index = np.rint ((eigenvals - energies[0])/step).astype (int)
+	inside = (index >= 0) & (index < len(energies))
+	
+	## Bins of the columns are interleaved, as in the flattened [energy][column] array
+	bins = (index[inside,None]*nColumns + np.arange (nColumns)).ravel()
+	dos = np.bincount (bins, weights = values[inside].ravel(), minlength = len(energies)*nColumns)
+	
+	return broaden (energies, dos.reshape (len(energies), nColumns)/step, width, shape)
+
+def broadeningKernel (energies, width, shape='gaussian'):
+	"""
+	Returns the broadening function sampled on the energy grid, centered in the middle of an array of
+	2*len(energies) - 1 points and normalized to a sum of 1, so that the number of states is kept.
+	width is the standard deviation of the gaussian or the half width at half maximum of the lorentzian.
+	"""
+	
+	step = (energies[-1] - energies[0])/(len(energies) - 1)
+	x = np.arange (1 - len(energies), len(energies)) * step
+	
+	if shape == 'gaussian':
+		kernel = np.exp (-0.5*(x/width)**2)
+	elif shape == 'lorentzian':
+		kernel = 1/(1 + (x/width)**2)
+	else:
+		print ("Unknown broadening %s! Available shapes: %s\nExiting...\n" % (shape, ', '.join(BroadeningConstants.shapes)))
+		sys.exit (1)
+	
+	return kernel/kernel.sum()
+
+def broaden (energies, values, width, shape='gaussian'):
+	"""
+	Convolves the values, given on the uniform energy grid energies as an array indexed as [energy]
+	or [energy][column], with the broadening function of the given width (see broadeningKernel).
+	All columns are convolved at once with FFTs, in O(N log N) operations.
+	"""
+	
+	values = np.asarray (values, dtype=float)
+	
+	if width <= 0 or len(energies) < 2:
+		return values.copy ()
+	
+	kernel = broadeningKernel (energies, width, shape)
+	kernel = kernel.reshape ((-1,) + (1,)*(values.ndim - 1))
+	
+	return fftconvolve (values, kernel, mode='same', axes=0)
+
+def integrate (energies, values):
+	"""
+	Returns the number of states below each energy (cumulative trapezoidal integral of the DOS), as an array
+	indexed as the values, given on the energy grid energies as an array indexed as [energy] or [energy][column]
+	"""
+	
+	return cumulative_trapezoid (np.asarray (values, dtype=float), energies, axis=0, initial=0)
+
+def windowWeights (energies, eMin = None, eMax = None):
+	"""
+	Returns the weights of the trapezoidal rule integrating over the energies from eMin to eMax
+	(the whole range if None). Energies outside of the window have zero weight.
+	"""
+	
+	energies = np.asarray (energies, dtype=float)
+	inside = np.flatnonzero ((energies >= (-np.inf if eMin is None else eMin)) & (energies <= (np.inf if eMax is None else eMax)))
+	
+	weights = np.zeros (len(energies))
+	if len(inside) > 1:
+		step = np.diff (energies[inside])/2
+		np.add.at (weights, inside[:-1], step)
+		np.add.at (weights, inside[1:], step)
+	
+	return weights
+
+def moments (energies, values, window = (None, None), eFermi = 0.0):
+	"""
+	Returns the table of integrated states and moments of each column of the values, given on the energy
+	grid energies as an array indexed as [energy][column], indexed as [column][quantity], with the
+	quantities as in MomentConstants.columns:
+		states:   integral of the DOS within the window
+		occupied: integral of the DOS within the window, up to the Fermi level eFermi
+		center:   mean energy of the DOS within the window (e.g. the d-band center)
+		width:    standard deviation of the energy around the center
+		skewness: third standardized moment of the energy
+	The energies are taken as given, hence the center is relative to the same reference.
+	All integrals of all columns are computed as a single matrix product. Columns without states
+	within the window have NaN moments.
+	"""
+	
+	energies = np.asarray (energies, dtype=float)
+	values = np.asarray (values, dtype=float).reshape (len(energies), -1)
+	
+	weights = windowWeights (energies, *window)
+	occupied = weights * (energies <= eFermi)
+	
+	## Rows: occupied states, and the raw moments 0 to 3 of the energy
+	integrals = np.dot (np.vstack ((occupied, weights * energies[None,:]**np.arange(4)[:,None])), values)
+	
+	with np.errstate (divide='ignore', invalid='ignore'):
+		norm = np.where (integrals[1] != 0, integrals[1], np.nan)
+		center = integrals[2]/norm
+		variance = np.maximum (integrals[3]/norm - center**2, 0)
+		skewness = (integrals[4]/norm - 3*center*variance - center**3)/variance**1.5
+	
+	return np.column_stack ((integrals[1], integrals[0], center, np.sqrt (variance), skewness))
@@ -155,6 +155,12 @@ class Grace (object):
 		Boolean variable to set whether the symbols are or not filled
 		"""
 		
+		self.compact = False
+		"""
+		Boolean variable to write the settings shared by the sets of projected bands only once,
+		as XMGrace defaults, instead of once per set
+		"""
+		
 		self.view = GraceConstants.bandsView
 		"""
 		Standard view for the XMGrace plot
@@ -229,6 +235,12 @@ class Grace (object):
 		"""
 		self.boolSymbolFill = boolSymbolFill
 	
+	def setCompact (self, compact):
+		"""
+		Set whether or not the shared settings of the sets are written only once
+		"""
+		self.compact = compact
+	
 	def setView (self, view):
 		"""
 		Set whether or not the symbol fill is set
@@ -320,75 +332,92 @@ class Grace (object):
 		The firstBand variable defines the first band to be plotted, which is
 		useful in case of concatenating band structures or to simply reduce the
 		use of memory when rendering figures.
+		Only the bands selected by the energy window of the band structure are configured.
 		"""
-		for eachBand in range(firstBand, bands.nBands + firstBand):
-			outputFile.write ("s%d line linestyle %d\n" % (eachBand, GraceConstants.line_style.get("solid")))
-			outputFile.write ("s%d line linewidth 1.5\n" % eachBand)
-			outputFile.write ("s%d line color %d\n" % (eachBand, GraceConstants.colors.get(traceColor)))
-			outputFile.write ("s%d comment \"Band %d\"\n" % (eachBand,eachBand))
+		template = ("s%%(set)d line linestyle %d\n" % GraceConstants.line_style.get("solid") +
+					"s%(set)d line linewidth 1.5\n" +
+					"s%%(set)d line color %d\n" % GraceConstants.colors.get(traceColor) +
+					"s%(set)d comment \"Band %(set)d\"\n")
+		
+		outputFile.write ("".join ([template % {'set' : eachBand} for eachBand in range(firstBand, len(bands.selectedBands()) + firstBand)]))
 	
+	def symbolTraceTemplate (self, color, joinBand):
+		"""
+		Template of the configuration of one set of projected bands, to be filled with the
+		number of the set (set) and of the band (band). The symbols are circles of the given color,
+		and joinBand tells whether the set also draws the gray line of the band.
+		In the compact mode, the settings shared by all sets are left to the defaults (see printSymbolDefaults)
+		"""
+		
+		circle = GraceConstants.symbols.get("circle")
+		gray = GraceConstants.colors.get('gray')
+		
+		if self.compact:
+			template = "s%%(set)d symbol %d\n" % circle
+			if self.boolSymbolFill:
+				template += "s%(set)d symbol fill pattern 1\n"
+			template += "s%%(set)d symbol color %d\ns%%(set)d symbol fill color %d\n" % (color, color)
+			template += ("s%%(set)d line color %d\n" % gray) if joinBand else "s%(set)d line type 0\n"
+			return template
+		
+		return ("s%%(set)d symbol %d\n" % circle +
+				"s%(set)d symbol size 1\n" +
+				"s%%(set)d symbol fill pattern %d\n" % (1 if self.boolSymbolFill else 0) +
+				"s%%(set)d symbol color %d\n" % color +
+				"s%%(set)d symbol fill color %d\n" % color +
+				"s%(set)d symbol linewidth 1\n" +
+				"s%(set)d symbol skip 0\n" +
+				"s%%(set)d line type %d\n" % (1 if joinBand else 0) +
+				"s%%(set)d line linestyle %d\n" % GraceConstants.line_style.get("solid") +
+				"s%(set)d line linewidth 1\n" +
+				"s%%(set)d line color %d\n" % gray +
+				"s%(set)d comment \"Band %(band)d\"\n" +
+				"s%(set)d legend  \"\"\n")
 	
-	def printTracesCharacter (self, outputFile, bands):
+	def printSymbolDefaults (self, outputFile):
 		"""
-		Configure the bands with character
+		In the compact mode, writes once the settings shared by all sets of projected bands.
+		XMGrace applies them to the sets created afterwards, whose symbol skip, line type and legend
+		already default to 0, straight line and none.
 		"""
 		
-		## We have nBands .dat files containing the information needed
-		for i in range (1, bands.nBands + 1):
-			outputFile.write ("read block \"bands_character/band%02i.dat\"\n" % (i))
-			
-			## In this case, 4 is the number of projected orbitals:
-			## s, px+py, +z, d
-			## In the future, this might be changed to include personalized orbital projection
-			nOrbitals = 4
-			 
-			for j in range (nOrbitals):
-				
-				## Number of the trace in the XMGrace description
-				traceNumber = nOrbitals*(i-1) + j
-				
-				## Select the column regarding the orbital contribution
-				outputFile.write ("block xysize \"1:2:%d\"\n" % (j+3))
-				
-				## Select the symbol circle to the band
-				outputFile.write ("s%d symbol %d\n" % (traceNumber,GraceConstants.symbols.get("circle")))
-				
-				## Select symbol size for the trace
-				outputFile.write ("s%d symbol size 1\n" % (traceNumber))
-				
-				## Fill of the marker: solid or none
-				if self.boolSymbolFill:
-					outputFile.write ("s%d symbol fill pattern 1\n" % (traceNumber))
-				else:
-					outputFile.write ("s%d symbol fill pattern 0\n" % (traceNumber))
-					
-				## The color is defined according to the orbital represented
-				## The dictionary self.orbitalColors can be personalized
-				outputFile.write ("s%d symbol color %d\n" % (traceNumber, self.orbitalColors.get(j)))
-				outputFile.write ("s%d symbol fill color %d\n" % (traceNumber, self.orbitalColors.get(j)))
-					
-				## The linewidth is defined, as well as the skip symbol attribute
-				outputFile.write ("s%d symbol linewidth 1\n" % traceNumber)
-				outputFile.write ("s%d symbol skip 0\n" % traceNumber)
-				
-				## Writes only one trace putting the bands together for each band
-				## If this is not set, the line is written four times, which is unnecessary
-				## and memory-consuming.
-				if (j == 0):
-					outputFile.write ("s%d line type 1\n" % traceNumber)
-				else:
-					outputFile.write ("s%d line type 0\n" % traceNumber)	
-					
-				## Configurations for the trace line
-				outputFile.write ("s%d line linestyle %d\n" % (traceNumber,GraceConstants.line_style.get("solid")))
-				outputFile.write ("s%d line linewidth 1\n" % traceNumber)
-				
-				## The trace line in the case of the projected bands is light gray
-				outputFile.write ("s%d line color %d\n" % (traceNumber,GraceConstants.colors.get('gray')))
-				
-				outputFile.write ("s%d comment \"Band %d\"\n" % (traceNumber,i))
-				outputFile.write ("s%d legend  \"\"\n" % traceNumber)
+		if self.compact:
+			outputFile.write ("default linewidth 1.0\n")
+			outputFile.write ("default linestyle %d\n" % GraceConstants.line_style.get("solid"))
+			outputFile.write ("default symbol size 1.0\n")
+	
+	def printSymbolTraces (self, outputFile, bands, folder, colors):
+		"""
+		Configure the bands read from the .dat files of the folder, one set of symbols for each column
+		of projections, with the given colors. The whole configuration is built from one template
+		per column (see symbolTraceTemplate) and written at once.
+		"""
 		
+		## Only the first set of each band draws the line joining the k-points,
+		## otherwise the line would be written once per column, which is unnecessary and memory-consuming
+		templates = ["block xysize \"1:2:%d\"\n" % (j+3) + self.symbolTraceTemplate (color, j == 0) for j, color in enumerate (colors)]
+		
+		self.printSymbolDefaults (outputFile)
+		
+		## We have one .dat file for each band crossing the energy window
+		buffer = []
+		for n, band in enumerate (bands.selectedBands()):
+			buffer.append ("read block \"%s/band%02i.dat\"\n" % (folder, band + 1))
+			buffer.extend ([template % {'set' : len(colors)*n + j, 'band' : band + 1} for j, template in enumerate (templates)])
+		
+		outputFile.write ("".join (buffer))
+	
+	def printTracesCharacter (self, outputFile, bands, nOrbitals=4, folder='bands_character'):
+		"""
+		Configure the bands with character
+		nOrbitals is the number of groups of orbitals onto which the bands are projected
+		(or of joint projections, read from the folder bands_joint)
+		"""
+		
+		## The color is defined according to the orbital represented
+		## The dictionary self.orbitalColors can be personalized
+		## Groups beyond those in the dictionary use the sequential colors
+		self.printSymbolTraces (outputFile, bands, folder, [self.orbitalColors.get(j, j+2) for j in range (nOrbitals)])
 	
 	def printTracesProjected (self, outputFile, bands, projectedBands):
 		"""
@@ -397,66 +426,16 @@ class Grace (object):
 		
 		## Discover how many materials we have to project onto
 		nMaterials = len(projectedBands.prj.dictMaterials)
-			
-		for i in range (1, bands.nBands + 1):
-			## We have nBands .dat files containing the information needed
-			outputFile.write ("read block \"bands_projected/band%02i.dat\"\n" % (i))
-			
-			## In this case, nMaterials is the number of projected sites:
-			for j in range (nMaterials):
-				## Number of the trace in the XMGrace description
-				
-				traceNumber = nMaterials*(i-1) + j
-				
-				## Read the columns which represent the projection 
-				outputFile.write ("block xysize \"1:2:%d\"\n" % (j+3))
-				
-				## All projected symbols are set as a circle (symbol 1)
-				## This might be personalized later
-				outputFile.write ("s%d symbol %d\n" % (traceNumber,GraceConstants.symbols.get("circle")))
-				
-				## Size of the marker
-				outputFile.write ("s%d symbol size 1\n" % (traceNumber))
-				
-				## Fill of the marker: solid or none
-				if self.boolSymbolFill:
-					outputFile.write ("s%d symbol fill pattern 1\n" % (traceNumber))
-				else:
-					outputFile.write ("s%d symbol fill pattern 0\n" % (traceNumber))
-				
-				
-				## Color for the symbol
-				## The projectedColors dictionary may be customized according to the
-				## projection file input. If it is not customized, simply use the sequential colors
-				## to represent the data
-				if len(self.projectedColors) == nMaterials:
-					matColor = self.projectedColors.get(j)
-					outputFile.write ("s%d symbol color %d\n" % (traceNumber, GraceConstants.colors.get(matColor.lower())))
-					outputFile.write ("s%d symbol fill color %d\n" % (traceNumber, GraceConstants.colors.get(matColor.lower())))
-				else:
-					## Customize so that the first color is red
-					outputFile.write ("s%d symbol color %d\n" % (traceNumber, j+2))
-					outputFile.write ("s%d symbol fill color %d\n" % (traceNumber, j+2))
-				
-				## Linewidth and skip configurations
-				outputFile.write ("s%d symbol linewidth 1\n" % (traceNumber))
-				outputFile.write ("s%d symbol skip 0\n" % (traceNumber))
-				
-				## Writes the trace only once per band
-				## If this option does not exist, `nMaterials` lines are traced
-				if (j == 0):
-					outputFile.write ("s%d line type 1\n" % (traceNumber))
-				else:
-					outputFile.write ("s%d line type 0\n" % (traceNumber))
-				
-				
-					
-				## A few more configurations about the line plotted	
-				outputFile.write ("s%d line linestyle %d\n" % (traceNumber,GraceConstants.line_style.get("solid")))
-				outputFile.write ("s%d line linewidth 1\n" % (traceNumber))
-				outputFile.write ("s%d line color %d\n" % (traceNumber, GraceConstants.colors.get('gray')))
-				outputFile.write ("s%d comment \"Band %d\"\n" % (traceNumber,i))
-				outputFile.write ("s%d legend  \"\"\n" % (traceNumber))
+		
+		## The projectedColors dictionary may be customized according to the
+		## projection file input. If it is not customized, simply use the sequential colors
+		## to represent the data, so that the first color is red
+		if len(self.projectedColors) == nMaterials:
+			colors = [GraceConstants.colors.get(self.projectedColors.get(j).lower()) for j in range (nMaterials)]
+		else:
+			colors = [j+2 for j in range (nMaterials)]
+		
+		self.printSymbolTraces (outputFile, bands, 'bands_projected', colors)
 
 	def printDOS (self, outputFile, dos, traceColor='black'):
 		"""
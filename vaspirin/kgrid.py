@@ -0,0 +1,85 @@
+import itertools
+import numpy as np
+from . import kpath, profiling
+
+def uniformGrid (nGrid, gamma=False):
+	"""
+	Returns the k-points of a uniform N1xN2xN3 grid in reciprocal coordinates, as an array indexed as [k-point][coordinate].
+	The grid is Monkhorst-Pack, or Gamma-centred if gamma is set, as generated by VASP in the automatic mode.
+	"""
+
+	axes = []
+	for n in nGrid:
+		## Monkhorst-Pack coordinates (2r - n - 1)/2n, r = 1..n, are shifted from Gamma for even n
+		axes.append (np.arange (n)/n if gamma else (2*np.arange (1, n+1) - n - 1)/(2*n))
+
+	return np.stack ([x.ravel() for x in np.meshgrid (*axes, indexing='ij')], axis=1)
+
+def pointGroup (lattice, eps=1e-3):
+	"""
+	Returns the point-group operations of the lattice (its holohedry), as integer matrices R acting on
+	the reciprocal coordinates of the k-points as k.R, with shape [operation][3][3].
+	The operations are those keeping the metric of the reduced cell (see kpath.reduceLattice), all of them
+	tested at once among the matrices with entries -1, 0 and 1.
+	"""
+
+	lattice = np.asarray (lattice, dtype=float)
+	reduced = kpath.reduceLattice (lattice)
+	metric = np.dot (reduced, reduced.T)
+
+	## Operations R of the reduced cell, which keep the metric: R.G.R^T = G
+	candidates = np.array (list (itertools.product ([-1, 0, 1], repeat=9)), dtype=float).reshape (-1, 3, 3)
+	images = np.einsum ('nij,jk,nlk->nil', candidates, metric, candidates)
+	operations = candidates[np.all (np.abs (images - metric) < eps*np.abs (metric).max(), axis=(1, 2))]
+
+	## The same operations acting on the coordinates of the given cell, with reduced = M.lattice
+	M = np.round (np.dot (reduced, np.linalg.inv (lattice)))
+	direct = np.einsum ('ij,njk,kl->nil', np.linalg.inv (M), operations, M)
+
+	## Direct coordinates transform as x.R (row vectors), reciprocal ones with the inverse transpose.
+	## As the group holds the inverse of each operation, the transposes alone make the same group
+	return np.round (np.transpose (direct, (0, 2, 1))).astype (int)
+
+@profiling.timed ('kgrid.reduceGrid')
+def reduceGrid (kpoints, operations=None, decimals=6):
+	"""
+	Reduces the k-points by the operations (see pointGroup), always including time reversal (k = -k).
+	Each k-point is hashed by its rounded reciprocal coordinates folded into [0, 1), and its
+	class of equivalent k-points is labelled by the smallest hash among all its images.
+	Returns the first k-point of each class and its weight, the number of k-points in the class.
+	"""
+
+	kpoints = np.asarray (kpoints, dtype=float)
+	operations = np.identity (3, dtype=int)[None] if operations is None else np.asarray (operations)
+	scale = 10**decimals
+
+	label = None
+	for R in operations:
+		for sign in [1, -1]:
+			## Rounded coordinates in [0, scale), packed into a single integer
+			digits = np.mod (np.round (np.mod (sign*np.dot (kpoints, R), 1)*scale), scale).astype (np.int64)
+			hashes = (digits[:,0]*scale + digits[:,1])*scale + digits[:,2]
+			label = hashes if label is None else np.minimum (label, hashes)
+
+	classes, first, weights = np.unique (label, return_index=True, return_counts=True)
+	order = np.argsort (first)
+
+	return kpoints[first[order]], weights[order]
+
+def gridLines (kpoints, weights):
+	"""
+	Returns the lines of the k-points and their integer weights, formatted as in the IBZKPT file
+	"""
+
+	return "".join (["%20.14f%20.14f%20.14f%14d\n" % (k[0], k[1], k[2], w) for k, w in zip (kpoints.tolist(), weights.tolist())])
+
+def writeGrid (fName, kpoints, weights, comment):
+	"""
+	Writes the reduced grid (see reduceGrid) as a KPOINTS file with explicit k-points in reciprocal coordinates
+	"""
+
+	with open (fName, 'w') as outputFile:
+		outputFile.write (comment + '\n')
+		outputFile.write ('%d\n' % len(kpoints))
+		outputFile.write ('Reciprocal lattice\n')
+		outputFile.write (gridLines (kpoints, weights))
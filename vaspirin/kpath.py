@@ -0,0 +1,551 @@
+import sys, os, re, math, json, itertools
+from fractions import Fraction
+import numpy as np
+from . import outcar, poscar, profiling
+
+_database = None
+'''
+Special points and paths of the lattices, loaded from kpath.json by symmetryDatabase
+'''
+
+def symmetryDatabase ():
+	"""
+	Returns the specifications of symmetry points of all lattices, as stored in kpath.json. The coordinates
+	of the points are expressions of the lattice parameters (see latticeParameters), e.g. '1/2+zeta'.
+	The file is read only once, when first needed.
+	Information taken from: W. Setyawan, S. Curtarolo / Computational Materials Science 49 (2010) 299–312
+	The terminology is also taken from this article, with G for Gamma and S for Sigma
+	"""
+
+	global _database
+
+	if _database is None:
+		with open (os.path.join (os.path.dirname (os.path.abspath (__file__)), 'kpath.json'), 'r') as f:
+			_database = json.load (f)
+
+	return _database
+
+def latticeNames ():
+	"""
+	Returns the names of all lattices implemented, including the aliases (e.g. 'fcc' for 'FCC')
+	"""
+
+	db = symmetryDatabase ()
+	return list (db['lattices']) + list (db['aliases'])
+
+def latticeEntry (lattice):
+	"""
+	Returns the entry of the database of the lattice, with its default path and special points
+	"""
+
+	db = symmetryDatabase ()
+	return db['lattices'][db['aliases'].get (lattice, lattice)]
+
+def evaluateCoordinate (expression, parameters):
+	"""
+	Evaluates a coordinate of a special point, written as a sum of fractions and lattice parameters (e.g. '1/2-eta')
+	"""
+
+	value = 0.0
+	for sign, term in re.findall (r'([+-]?)([^+-]+)', expression):
+		value += (-1 if sign == '-' else 1) * (parameters[term] if term in parameters else float (Fraction (term)))
+
+	return value
+
+def reciprocalLattice (lattice):
+	"""
+	Returns the reciprocal lattice [b1,b2,b3] of the direct lattice [a1,a2,a3] (e.g. poscar.POSCAR.lattice),
+	without the factor 2*pi, as written in the OUTCAR file (see outcar.readRecLattice)
+	"""
+
+	return np.linalg.inv (np.asarray (lattice, dtype=float)).T
+
+def readRecLattice (fOutcar=None, fPoscar=None):
+	"""
+	Reads the reciprocal lattice from the POSCAR file fPoscar if given, or from the OUTCAR file otherwise
+	"""
+
+	if fPoscar:
+		return reciprocalLattice (poscar.POSCAR (fPoscar).lattice)
+
+	return np.array (outcar.readRecLattice (fOutcar))
+
+def latticeParameters (lattice, a, b, c, alpha):
+	"""
+	Returns the parameters of the special points of the lattice (e.g. eta and nu for RHL1), from the lengths a, b, c
+	and the angle alpha (in radians) of its conventional cell, as defined by Setyawan and Curtarolo
+	"""
+
+	cosA, sinA = math.cos (alpha), math.sin (alpha)
+
+	if lattice == 'BCT1':
+		return {'eta' : (1 + c**2/a**2)/4}
+
+	if lattice == 'BCT2':
+		return {'eta' : (1 + a**2/c**2)/4, 'zeta' : a**2/(2*c**2)}
+
+	if lattice in ['ORCF1', 'ORCF3']:
+		return {'zeta' : (1 + a**2/b**2 - a**2/c**2)/4, 'eta' : (1 + a**2/b**2 + a**2/c**2)/4}
+
+	if lattice == 'ORCF2':
+		return {'eta' : (1 + a**2/b**2 - a**2/c**2)/4, 'phi' : (1 + c**2/b**2 - c**2/a**2)/4, 'delta' : (1 + b**2/a**2 - b**2/c**2)/4}
+
+	if lattice == 'ORCI':
+		return {'zeta' : (1 + a**2/c**2)/4, 'eta' : (1 + b**2/c**2)/4, 'delta' : (b**2 - a**2)/(4*c**2), 'mu' : (a**2 + b**2)/(4*c**2)}
+
+	if lattice == 'ORCC':
+		return {'zeta' : (1 + a**2/b**2)/4}
+
+	if lattice in ['RHL1', 'RHL2']:
+		eta = (1 + 4*cosA)/(2 + 4*cosA) if lattice == 'RHL1' else 1/(2*math.tan (alpha/2)**2)
+		return {'eta' : eta, 'nu' : 3/4 - eta/2}
+
+	if lattice == 'MCL':
+		eta = (1 - b*cosA/c)/(2*sinA**2)
+		return {'eta' : eta, 'nu' : 1/2 - eta*c*cosA/b}
+
+	if lattice in ['MCLC1', 'MCLC2']:
+		zeta = (2 - b*cosA/c)/(4*sinA**2)
+		psi = 3/4 - a**2/(4*b**2*sinA**2)
+		return {'zeta' : zeta, 'eta' : 1/2 + 2*zeta*c*cosA/b, 'psi' : psi, 'phi' : psi + (3/4 - psi)*b*cosA/c}
+
+	if lattice in ['MCLC3', 'MCLC4']:
+		mu = (1 + b**2/a**2)/4
+		delta = b*c*cosA/(2*a**2)
+		zeta = mu - 1/4 + (1 - b*cosA/c)/(4*sinA**2)
+		eta = 1/2 + 2*zeta*c*cosA/b
+		return {'mu' : mu, 'delta' : delta, 'zeta' : zeta, 'eta' : eta, 'phi' : 1 + zeta - 2*mu, 'psi' : eta - 2*delta}
+
+	if lattice == 'MCLC5':
+		zeta = (b**2/a**2 + (1 - b*cosA/c)/sinA**2)/4
+		eta = 1/2 + 2*zeta*c*cosA/b
+		mu = eta/2 + b**2/(4*a**2) - b*c*cosA/(2*a**2)
+		nu = 2*mu - zeta
+		omega = (4*nu - 1 - b**2*sinA**2/a**2)*c/(2*b*cosA)
+		return {'zeta' : zeta, 'eta' : eta, 'mu' : mu, 'nu' : nu, 'omega' : omega,
+				'delta' : zeta*c*cosA/b + omega/2 - 1/4, 'rho' : 1 - zeta*a**2/b**2}
+
+	return {}
+
+def reduceLattice (lattice):
+	"""
+	Returns a reduced basis of the lattice, in which no vector can be shortened by adding
+	small multiples (up to 2) of the other two
+	"""
+
+	basis = np.array (lattice, dtype=float)
+	steps = np.array ([x for x in itertools.product (range(-2, 3), repeat=2)], dtype=float)
+
+	reduced = False
+	while not reduced:
+		reduced = True
+		for i in range (3):
+			others = basis[[j for j in range(3) if j != i]]
+			candidates = basis[i] + np.dot (steps, others)
+			lengths = np.linalg.norm (candidates, axis=1)
+			if lengths.min() < np.linalg.norm (basis[i])*(1 - 1e-10):
+				basis[i] = candidates[lengths.argmin()]
+				reduced = False
+
+	return basis[np.argsort (np.linalg.norm (basis, axis=1), kind='stable')]
+
+def isLatticeVector (vector, lattice, eps=1e-3):
+	"""
+	Checks if the cartesian vector is a translation of the lattice
+	"""
+
+	frac = np.dot (vector, np.linalg.inv (lattice))
+	return np.allclose (frac, np.round (frac), atol=eps)
+
+def centering (cell, lattice, eps=1e-3):
+	"""
+	Returns the centering of the conventional cell [A,B,C] of the lattice: 'P' (primitive), 'I' (body-centered),
+	'F' (face-centered) or 'A', 'B', 'C' (centered on the face opposite to A, B or C).
+	Returns None if the cell is not a conventional cell of the lattice, i.e. if its volume is not the one
+	of the centering (1, 2 or 4 primitive cells for P, I/A/B/C or F), as for supercells of a smaller cell
+	"""
+
+	half = np.asarray (cell)/2
+	faces = [isLatticeVector (half[j] + half[k], lattice, eps) for j, k in [(1, 2), (0, 2), (0, 1)]]
+
+	if all (faces):
+		kind = 'F'
+	elif isLatticeVector (half.sum (axis=0), lattice, eps):
+		kind = 'I'
+	elif any (faces):
+		kind = 'ABC'[faces.index (True)]
+	else:
+		kind = 'P'
+
+	ratio = abs (np.linalg.det (cell)/np.linalg.det (lattice))
+	if abs (ratio - {'P' : 1, 'F' : 4}.get (kind, 2)) > eps*4:
+		return None
+
+	return kind
+
+@profiling.timed ('kpath.classifyLattice')
+def classifyLattice (lattice, eps=1e-3):
+	"""
+	Classifies the Bravais lattice of the direct lattice [a1,a2,a3] (e.g. poscar.POSCAR.lattice) among the
+	types of Setyawan and Curtarolo. Returns the name of the lattice (e.g. 'BCT2'), its parameters (see
+	latticeParameters) and the transform taking the coordinates of special points from the standard primitive
+	cell to the given cell (see symmetryPoints). Lengths and angles are compared with the relative tolerance eps.
+	"""
+
+	lattice = np.asarray (lattice, dtype=float)
+	basis = reduceLattice (lattice)
+	volume = abs (np.linalg.det (basis))
+
+	## Short lattice vectors, one of each pair +v/-v, sorted by length
+	ints = np.array ([x for x in itertools.product (range(-2, 3), repeat=3) if x > (0, 0, 0)], dtype=float)
+	vectors = np.dot (ints, basis)
+	lengths = np.linalg.norm (vectors, axis=1)
+	order = np.argsort (lengths, kind='stable')
+	vectors, lengths = vectors[order], lengths[order]
+	cosines = np.dot (vectors, vectors.T)/np.outer (lengths, lengths)
+	perpendicular = np.abs (cosines) < eps
+
+	equal = lambda x, y: abs (x - y) < eps*max (x, y)
+	ratio = lambda cell: abs (np.linalg.det (cell))/volume
+
+	## Conventional cells with three perpendicular vectors, grouped by the number of distinct lengths
+	orthogonal = {1 : [], 2 : [], 3 : []}
+	for i in range (len(vectors)):
+		for j in np.nonzero (perpendicular[i, i+1:])[0] + i + 1:
+			for k in np.nonzero (perpendicular[i, j+1:] & perpendicular[j, j+1:])[0] + j + 1:
+				cell = vectors[[i, j, k]]
+				if min (abs (ratio (cell) - x) for x in [1, 2, 4]) < eps*4:
+					nEqual = sum (equal (lengths[x], lengths[y]) for x, y in [(i, j), (i, k), (j, k)])
+					orthogonal[{0 : 3, 1 : 2}.get (nEqual, 1)].append (cell)
+
+	for key in orthogonal:
+		orthogonal[key].sort (key=ratio)
+
+	## Cubic lattices
+	if orthogonal[1]:
+		cell = orthogonal[1][0]
+		kind = {'P' : 'CUB', 'I' : 'BCC', 'F' : 'FCC'}.get (centering (cell, lattice, eps))
+		if kind:
+			return standardCell (kind, cell, lattice)
+
+	## Hexagonal lattices: two vectors of equal length at 120 deg and a third one perpendicular to both
+	for i, j in itertools.combinations (range (len(vectors)), 2):
+		if equal (lengths[i], lengths[j]) and abs (abs (cosines[i, j]) - 1/2) < eps:
+			for k in np.nonzero (perpendicular[i] & perpendicular[j])[0]:
+				cell = np.array ([vectors[i], -np.sign (cosines[i, j])*vectors[j], vectors[k]])
+				if abs (ratio (cell) - 1) < eps:
+					return standardCell ('HEX', cell, lattice)
+
+	## Rhombohedral lattices: three vectors of equal length and equal angles between them
+	for i, j, k in itertools.combinations (range (len(vectors)), 3):
+		if equal (lengths[i], lengths[j]) and equal (lengths[i], lengths[k]):
+			c = np.array ([cosines[i, j], cosines[i, k], cosines[j, k]])
+			if np.ptp (np.abs (c)) < eps and np.abs (c).min() > eps:
+				sign = np.sign (np.prod (c))
+				cell = np.array ([vectors[i], sign*np.sign (c[0])*vectors[j], sign*np.sign (c[1])*vectors[k]])
+				if abs (ratio (cell) - 1) < eps:
+					return standardCell ('RHL', cell, lattice)
+
+	## Tetragonal lattices, with the two vectors of equal length first
+	for cell in orthogonal[2]:
+		l = np.linalg.norm (cell, axis=1)
+		unique = [i for i in range(3) if not any (equal (l[i], l[j]) for j in range(3) if j != i)][0]
+		cell = cell[[i for i in range(3) if i != unique] + [unique]]
+		kind = {'P' : 'TET', 'I' : 'BCT'}.get (centering (cell, lattice, eps))
+		if kind:
+			return standardCell (kind, cell, lattice)
+
+	## Orthorhombic lattices, with a < b < c (a < b on the centered face of ORCC)
+	for cell in orthogonal[3]:
+		cell = cell[np.argsort (np.linalg.norm (cell, axis=1))]
+		kind = centering (cell, lattice, eps)
+		if kind is None:
+			continue
+		if kind in 'ABC':
+			face = [i for i in range(3) if 'ABC'[i] != kind]
+			return standardCell ('ORCC', cell[face + ['ABC'.index (kind)]], lattice)
+		return standardCell ({'P' : 'ORC', 'I' : 'ORCI', 'F' : 'ORCF'}[kind], cell, lattice)
+
+	## Monoclinic lattices: the unique axis A is perpendicular to the plane of B and C
+	for i in range (len(vectors)):
+		inPlane = np.nonzero (perpendicular[i])[0]
+		if len(inPlane) < 2:
+			continue
+		b = vectors[inPlane[0]]
+		c = [vectors[x] for x in inPlane if abs (abs (cosines[inPlane[0], x]) - 1) > eps]
+		if not c:
+			continue
+		cell = np.array ([vectors[i], b, c[0]])
+
+		if abs (ratio (cell) - 1) < eps:
+			return standardCell ('MCL', cell, lattice)
+
+		## Base-centered: the centered face is the one of A and B
+		if abs (ratio (cell) - 2) < eps:
+			plane = [b, c[0], b + c[0], b - c[0]]
+			centered = [x for x in plane if isLatticeVector ((vectors[i] + x)/2, lattice, eps)]
+			if not centered:
+				continue
+			b = min (centered, key=np.linalg.norm)
+			c = min ([vectors[x] for x in inPlane if abs (ratio ([vectors[i], b, vectors[x]]) - 2) < eps], key=np.linalg.norm)
+			return standardCell ('MCLC', np.array ([vectors[i], b, c]), lattice)
+
+	return standardCell ('TRI', basis, lattice)
+
+def standardCell (kind, cell, lattice, eps=1e-3):
+	"""
+	Completes the classification of classifyLattice, given the kind of lattice (e.g. 'BCT') and its conventional cell
+	[A,B,C] as found in the lattice. Chooses the variant of the lattice (e.g. 'BCT2') and builds the standard
+	primitive cell of Setyawan and Curtarolo from the conventional one.
+	"""
+
+	cell = np.array (cell, dtype=float)
+	a, b, c = np.linalg.norm (cell, axis=1)
+	alpha = math.pi/2
+
+	## Primitive vectors as combinations of the vectors of the conventional cell
+	combinations = {
+		'FCC' : [[0, 1/2, 1/2], [1/2, 0, 1/2], [1/2, 1/2, 0]],
+		'ORCF' : [[0, 1/2, 1/2], [1/2, 0, 1/2], [1/2, 1/2, 0]],
+		'BCC' : [[-1/2, 1/2, 1/2], [1/2, -1/2, 1/2], [1/2, 1/2, -1/2]],
+		'BCT' : [[-1/2, 1/2, 1/2], [1/2, -1/2, 1/2], [1/2, 1/2, -1/2]],
+		'ORCI' : [[-1/2, 1/2, 1/2], [1/2, -1/2, 1/2], [1/2, 1/2, -1/2]],
+		'ORCC' : [[1/2, -1/2, 0], [1/2, 1/2, 0], [0, 0, 1]],
+		'MCLC' : [[1/2, 1/2, 0], [-1/2, 1/2, 0], [0, 0, 1]],
+	}
+
+	if kind in ['MCL', 'MCLC']:
+		## b <= c for MCL, and alpha < 90 deg between B and C
+		if kind == 'MCL' and b > c*(1 + eps):
+			cell, b, c = cell[[0, 2, 1]], c, b
+		if np.dot (cell[1], cell[2]) < 0:
+			cell[2] = -cell[2]
+		alpha = math.acos (np.dot (cell[1], cell[2])/(b*c))
+
+	if kind == 'RHL':
+		alpha = math.acos (np.dot (cell[0], cell[1])/a**2)
+
+	if kind == 'TRI':
+		cell, kind = triclinicCell (cell, eps)
+
+	primitive = np.dot (combinations.get (kind, np.identity (3)), cell)
+
+	## Variants of the lattice
+	if kind == 'BCT':
+		kind += '1' if c < a else '2'
+
+	elif kind == 'ORCF':
+		x = 1/a**2 - 1/b**2 - 1/c**2
+		kind += '3' if abs (x) < eps/a**2 else ('1' if x > 0 else '2')
+
+	elif kind == 'RHL':
+		kind += '1' if alpha < math.pi/2 else '2'
+
+	elif kind == 'MCLC':
+		kb = reciprocalLattice (primitive)
+		kGamma = np.dot (kb[0], kb[1])/np.linalg.norm (kb[0])/np.linalg.norm (kb[1])
+		if abs (kGamma) < eps:
+			kind += '2'
+		elif kGamma < 0:
+			kind += '1'
+		else:
+			x = b*math.cos (alpha)/c + b**2*math.sin (alpha)**2/a**2
+			kind += '4' if abs (x - 1) < eps else ('3' if x < 1 else '5')
+
+	## Coordinates in the standard reciprocal cell are converted to the reciprocal cell of the lattice
+	transform = np.dot (lattice, np.linalg.inv (primitive)).T
+	transform = np.where (np.abs (transform - np.round (transform)) < 1e-6, np.round (transform), transform) + 0.0
+
+	return kind, latticeParameters (kind, a, b, c, alpha), transform
+
+def triclinicCell (basis, eps=1e-3):
+	"""
+	Returns the primitive cell of a triclinic lattice whose reciprocal vectors make all angles either
+	acute (TRI1b or TRI2b) or non-acute (TRI1a or TRI2a), with kgamma the largest or the smallest angle,
+	respectively. Also returns the name of the variant.
+	"""
+
+	kb = reduceLattice (reciprocalLattice (basis))
+
+	## Cosines of kalpha, kbeta and kgamma for the four choices of signs of the last two vectors
+	choices = []
+	for signs in itertools.product ([1, -1], repeat=2):
+		k = kb*np.array ([1] + list (signs))[:,None]
+		cosines = np.array ([np.dot (k[i], k[j])/np.linalg.norm (k[i])/np.linalg.norm (k[j]) for i, j in [(1, 2), (0, 2), (0, 1)]])
+		choices.append ((k, cosines))
+
+	acute = [x for x in choices if (x[1] > eps).all()]
+	k, cosines = acute[0] if acute else [x for x in choices if (x[1] < eps).all()][0]
+
+	## kgamma, between the first two vectors, is the largest (acute) or smallest (non-acute) angle
+	last = cosines.argmin() if acute else cosines.argmax()
+	k = k[[i for i in range(3) if i != last] + [last]]
+	kind = 'TRI' + ('2' if abs (cosines[last]) < eps else '1') + ('b' if acute else 'a')
+
+	return reciprocalLattice (k), kind
+
+def symmetryPoints (path, lattice, parameters=None, transform=None):
+	"""
+	Returns the coordinates of the symmetry points of the path (e.g. ['G', 'M', 'K', 'G']) in
+	the lattice of the database (e.g. 'hex60deg'), as an array indexed as [point][coordinate].
+	The parameters of the lattice (see latticeParameters) are required by the lattices of lower symmetry, e.g. BCT1.
+	If given, the transform (see classifyLattice) converts the coordinates from the standard primitive cell
+	to the cell actually used in the calculation
+	"""
+
+	pathDict = latticeEntry (lattice)['points']
+
+	missing = [x for x in path if x not in pathDict]
+	if missing:
+		print ("Symmetry points %s not found for the %s lattice! Available points: %s\nExiting...\n" % (', '.join(missing), lattice, ', '.join(pathDict)))
+		sys.exit (1)
+
+	try:
+		points = np.array ([[evaluateCoordinate (x, parameters or {}) for x in pathDict[y].split()] for y in path])
+	except ValueError:
+		print ("The symmetry points of the %s lattice depend on the lattice parameters! Use the automatic lattice instead.\nExiting...\n" % lattice)
+		sys.exit (1)
+
+	return points if transform is None else np.dot (points, transform)
+
+def parsePath (path):
+	"""
+	Parses a path of symmetry points, given as a list of labels (e.g. ['G', 'M', 'K', 'G']) or as the
+	string of a default path (e.g. 'G-X-M-G-R-X|M-R'), where | marks a jump between two points.
+	Returns the labels of the points and whether each segment of the path is a jump.
+	"""
+
+	labels, breaks = [], []
+	for i, piece in enumerate (re.sub (r'-*\|-*', '|', '-'.join (path if isinstance (path, list) else [path])).split ('|')):
+		segment = [x for x in piece.split ('-') if x]
+		if i and labels:
+			breaks.append (True)
+		labels += segment
+		breaks += [False]*(len(segment) - 1)
+
+	return labels, breaks
+
+def segmentPoints (points, nKpt=10, recLattice=None, breaks=None):
+	"""
+	Returns the number of k-points of each segment of the path through the symmetry points, counting both ends.
+	Without a reciprocal lattice, each segment has nKpt points. Otherwise, the number of points is proportional
+	to the length of the segment, the shortest one having nKpt points.
+	Segments marked in breaks (see parsePath) are jumps, with only their ends.
+	"""
+
+	jumps = np.zeros (len(points) - 1, dtype=bool) if breaks is None else np.asarray (breaks, dtype=bool)
+
+	if recLattice is None:
+		return np.where (jumps, 2, nKpt)
+
+	## Cartesian length of each segment, as the distance used in the x-axis of the band structure
+	lengths = np.linalg.norm (np.dot (np.diff (points, axis=0), np.asarray (recLattice, dtype=float)), axis=1)
+	kStep = lengths[~jumps].min()/nKpt
+
+	return np.where (jumps, 2, np.array ([math.ceil(x) for x in lengths/kStep], dtype=int))
+
+def buildPath (points, nPoints):
+	"""
+	Returns the k-points of the path through the symmetry points, as an array indexed as [k-point][coordinate],
+	and the index of each symmetry point within the path. Each segment i has nPoints[i] points (counting both ends)
+	evenly spaced, as with np.linspace, and the end of a segment is the start of the next one.
+	All segments are built at once.
+	"""
+
+	points = np.asarray (points, dtype=float)
+	nPoints = np.asarray (nPoints, dtype=int)
+
+	## Segment and position within the segment of each k-point, except the last one
+	segment = np.repeat (np.arange (len(nPoints)), nPoints - 1)
+	symIndex = np.concatenate (([0], np.cumsum (nPoints - 1)))
+	position = np.arange (symIndex[-1]) - symIndex[segment]
+
+	step = np.diff (points, axis=0) / (nPoints - 1)[:,None]
+	kpoints = np.vstack ((position[:,None] * step[segment] + points[segment], points[-1:]))
+
+	return kpoints, symIndex.tolist()
+
+@profiling.timed ('kpath.writeKpoints')
+def writeKpoints (fName, kpoints, path, symIndex, weight=1.0, ibzkpt=None, breaks=None):
+	"""
+	Writes the path as a KPOINTS file in reciprocal coordinates. The comment line labels the
+	symmetry points with their indexes, which is useful for plotting with XMGrace.
+	The ends of a jump (see parsePath) share a single label, e.g. 'X|M'.
+	The weighted k-points of ibzkpt (number and iterable of lines, see readIBZKPT) are streamed before the path, if given.
+	Their number is recorded at the end of the comment line (e.g. '# weighted 8'), so that they are
+	ignored when plotting the bands (see outcar.readWeightedKpoints).
+	"""
+
+	nIbzkpt, ibzkptLines = ibzkpt if ibzkpt else (0, [])
+
+	labels = [[path[0], symIndex[0]]]
+	for i in range (1, len(path)):
+		if breaks and breaks[i-1]:
+			labels[-1] = ["%s|%s" % (labels[-1][0], path[i]), symIndex[i]]
+		else:
+			labels.append ([path[i], symIndex[i]])
+
+	try:
+		with open (fName, 'w') as outputFile:
+			outputFile.write (', '.join (["%s %d" % (x[0], x[1]) for x in labels]) + (' # weighted %d' % nIbzkpt if nIbzkpt else '') + '\n')
+			outputFile.write ('%d\n' % (len(kpoints) + nIbzkpt))
+			outputFile.write ('Reciprocal lattice\n')
+			outputFile.writelines (ibzkptLines)
+			outputFile.write ("".join (["%.15f    %.15f    %.15f    %.4f\n" % (k[0], k[1], k[2], weight) for k in kpoints.tolist()]))
+
+	## An invalid IBZKPT file leaves no incomplete KPOINTS file behind
+	except SystemExit:
+		os.remove (fName)
+		raise
+
+def readIBZKPT (fName='IBZKPT'):
+	"""
+	Reads the header of the IBZKPT file. Returns the number of k-points and an iterator over their lines,
+	which streams the file while validating each line (see streamIBZKPT)
+	"""
+
+	try:
+		ibzkptFile = open (fName, 'r')
+	except FileNotFoundError:
+		print ("%s file not found! Exiting...\n" % fName)
+		sys.exit (1)
+
+	ibzkptFile.readline() # Throws away the comment line
+
+	try:
+		nIbzkpt = int (ibzkptFile.readline().strip())
+	except ValueError:
+		print ("Wrong number of k-points in the %s file! Exiting...\n" % fName)
+		sys.exit (1)
+
+	## The k-points are merged with a path in reciprocal coordinates
+	if not ibzkptFile.readline().strip().lower().startswith ('r'):
+		print ("The k-points of the %s file are not in reciprocal coordinates! Exiting...\n" % fName)
+		sys.exit (1)
+
+	return nIbzkpt, streamIBZKPT (ibzkptFile, nIbzkpt, fName)
+
+def streamIBZKPT (ibzkptFile, nIbzkpt, fName='IBZKPT'):
+	"""
+	Yields the nIbzkpt lines of k-points of the open IBZKPT file, one at a time, checking that each one holds
+	three coordinates and a positive weight, and that the file is not truncated. Closes the file at the end.
+	"""
+
+	nRead = 0
+	with ibzkptFile:
+		for line in itertools.islice (ibzkptFile, nIbzkpt):
+			data = line.split()
+			try:
+				if len(data) != 4 or float (data[3]) <= 0 or any (math.isnan (float (x)) for x in data[:3]):
+					raise ValueError
+			except ValueError:
+				print ("Wrong k-point in line %d of the %s file: %s\nExiting...\n" % (nRead + 4, fName, line.strip()))
+				sys.exit (1)
+
+			## The last line may lack its newline, which would join it to the first k-point of the path
+			nRead += 1
+			yield line.rstrip ('\n') + '\n'
+
+	if nRead < nIbzkpt:
+		print ("The %s file has %d k-points, but %d are declared in its header! Exiting...\n" % (fName, nRead, nIbzkpt))
+		sys.exit (1)
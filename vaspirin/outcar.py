@@ -1,16 +1,20 @@
 import numpy as np
-import sys
+import sys, os, re
+from concurrent.futures import ProcessPoolExecutor
+from . import profiling
 
 class BandStructure (object):
 	
-	def __init__(self,fOutcar = "OUTCAR", nKPTignore = 0):
+	@profiling.timed ('outcar.BandStructure')
+	def __init__(self,fOutcar = "OUTCAR", nKPTignore = None):
 		"""
 		Import all properties related to band structures
 		"""
 		
-		self.nKPTignore = nKPTignore
+		self.nKPTignore = ignoredKpoints (nKPTignore, fOutcar)
 		"""
-		The number of k-points to ignore when reading the band structure
+		The number of k-points to ignore when reading the band structure.
+		If not given, the number of weighted k-points recorded in the KPOINTS file (see readWeightedKpoints)
 		"""
 		
 		self.soc = False
@@ -53,6 +57,11 @@ class BandStructure (object):
 		Determines the energy of the top of the valence band
 		"""
 		
+		self.jumps = readJumps (os.path.join (os.path.dirname (fOutcar), 'KPOINTS'))
+		"""
+		Indexes of the k-points of the path which follow a jump (see readJumps)
+		"""
+		
 		self.xAxis = self.createXaxis ()
 		"""
 		Normalized axis created using the k-point path
@@ -62,6 +71,11 @@ class BandStructure (object):
 		"""
 		Reference for the 0 eV
 		"""
+		
+		self.energyWindow = None
+		"""
+		Energy window (with respect to the reference) selecting the bands to be processed
+		"""
 	
 	def setSOC (self, soc):
 		'''
@@ -102,7 +116,30 @@ class BandStructure (object):
 			## If the argument stringRef is not a number, checks whether this string
 			## is compatible with the referenceDict
 			self.setReference (referenceDict.get(stringRef.lower(), self.eValence))
+	
+	def setEnergyWindow (self, eMin, eMax):
+		"""
+		Process only the bands crossing the energy window from eMin to eMax,
+		given with respect to the reference. Use setEnergyWindow (None, None) to select all bands again.
+		"""
+		
+		if eMin is None or eMax is None:
+			self.energyWindow = None
+		else:
+			self.energyWindow = (min(eMin, eMax), max(eMin, eMax))
+	
+	def selectedBands (self):
+		"""
+		Returns the indexes of the bands crossing the energy window, or of all bands if no window is set
+		"""
+		
+		if self.energyWindow is None:
+			return list(range(self.nBands))
 		
+		E = np.asarray (self.eigenvals, dtype=float) - self.reference
+		crossing = (E.max(axis=0) >= self.energyWindow[0]) & (E.min(axis=0) <= self.energyWindow[1])
+		
+		return np.flatnonzero (crossing).tolist()
 		
 	def readNElec(self,fOutcar):
 		"""
@@ -193,14 +230,17 @@ class BandStructure (object):
 		Creates the normalized x-axis by using the distance of the path in the 1BZ.
 		
 		Variable description: xAxis[k] = (distance between k and the k-point 0)/(1BZ path length)
+		The two ends of a jump of the path (see readJumps) share the same point of the axis.
 		"""
 		
 		x = [0]
 		aux = 0
+		jumps = set (self.jumps)
 		
 		for k in range(1, len(self.path)):
 			## aux determines the distance we came through until the k-point k
-			aux = aux + distance (self.recLattice, self.path[k], self.path[k-1])
+			if k not in jumps:
+				aux = aux + distance (self.recLattice, self.path[k], self.path[k-1])
 			
 			## Saves the correspondence between k and the distance aux
 			x.append(aux)
@@ -270,42 +310,14 @@ class BandStructure (object):
 		
 	def readRecLattice(self,fOutcar):
 		"""
-		Reads the reciprocal lattice of the cell used in the calculation.
+		Reads the reciprocal lattice of the cell used in the calculation (see readRecLattice).
 		
 		Variables description:
 		recLattice = [b1,b2,b3]
 		b1 = [b1_x, b1_y, b1_z]
 		"""
 		
-		
-		try:
-			with open(fOutcar,'r') as fileIn:
-				## Reads the OUTCAR file
-				outcar = fileIn.read()
-
-				## Extracts the important information
-				lines = outcar.split('reciprocal lattice vectors')[1].split('length of vectors')[0].split('\n')
-				b1 = [0,0,0]
-				b2 = [0,0,0]
-				b3 = [0,0,0]
-				
-				b1[0] = float(lines[1].split()[3])
-				b1[1] = float(lines[1].split()[4])	
-				b1[2] = float(lines[1].split()[5])	
-
-				b2[0] = float(lines[2].split()[3])
-				b2[1] = float(lines[2].split()[4])	
-				b2[2] = float(lines[2].split()[5])
-
-				b3[0] = float(lines[3].split()[3])
-				b3[1] = float(lines[3].split()[4])	
-				b3[2] = float(lines[3].split()[5])
-				
-		except FileNotFoundError:
-			print ("OUTCAR file not found! Exiting...\n")
-			sys.exit (1)
-			
-		return  [b1,b2,b3] 
+		return readRecLattice (fOutcar)
 		
 
 	def readEigenvals(self, fOutcar):
@@ -369,10 +381,216 @@ class BandStructure (object):
 		return  nbands 
 
 
+class GapSummary (object):
+	"""
+	Lightweight alternative to BandStructure for high-throughput screening.
+	Reads only the number of electrons, the Fermi energy and the two bands around the gap,
+	without building the k-point path, the x-axis or the full list of eigenvalues.
+	"""
+
+	def __init__(self, fOutcar = "OUTCAR", nKPTignore = None, soc = False):
+
+		try:
+			with open(fOutcar,'r') as fileIn:
+				outcar = fileIn.read()
+		except FileNotFoundError:
+			print ("OUTCAR file not found! Exiting...\n")
+			sys.exit (1)
+
+		self.nElec = int(float(outcar.split('NELECT =')[1].split('total number of electrons')[0]))
+		"""
+		Number of electrons in the system
+		"""
+
+		self.eFermi = float(outcar.split('E-fermi :')[1].split('XC(G=0):')[0])
+		"""
+		Fermi energy
+		"""
+
+		## Index of the last valence band, starting from 1
+		if soc:
+			nval = int(self.nElec)
+		else:
+			nval = int(self.nElec/2)
+
+		self.vBand, self.cBand = self.readEdgeBands (outcar, ignoredKpoints (nKPTignore, fOutcar), nval)
+		"""
+		Eigenvalues of the highest valence and lowest conduction band for each k-point
+		"""
+
+		self.vbm = max(self.vBand)
+		"""
+		Valence band maximum
+		"""
+
+		self.cbm = min(self.cBand)
+		"""
+		Conduction band minimum
+		"""
+
+		self.gap = self.cbm - self.vbm
+		"""
+		Fundamental gap of the system
+		"""
+
+		self.dGap = min([c - v for v, c in zip(self.vBand, self.cBand)])
+		"""
+		Direct gap of the system
+		"""
+
+	def readEdgeBands (self, outcar, nKPTignore, nval):
+		"""
+		Reads only the bands nval and nval+1 from the last set of eigenvalues in the OUTCAR
+		"""
+
+		vBand = []
+		cBand = []
+
+		txtBlock = outcar.split('E-fermi :')[-1].split('---------------------------')[0]
+		kpoints = txtBlock.split('band No.  band energies     occupation')
+
+		for k in range(nKPTignore + 1, len(kpoints)):
+			lines = kpoints[k].split('\n')
+
+			## The line i of the block usually holds the band i. Otherwise, search for it
+			try:
+				v = lines[nval].split()
+				c = lines[nval+1].split()
+				if int(v[0]) != nval or int(c[0]) != nval + 1:
+					raise ValueError
+			except (IndexError, ValueError):
+				bandLines = [x.split() for x in lines if len(x.split()) == 3]
+				v = bandLines[nval-1]
+				c = bandLines[nval]
+
+			vBand.append (float(v[1]))
+			cBand.append (float(c[1]))
+
+		return vBand, cBand
+
+
 #########################
-## AUXILIARY FUNCTIONS ##		
+## AUXILIARY FUNCTIONS ##
 #########################
 
+def readWeightedKpoints (fKpoints):
+	'''
+	Reads the number of weighted k-points written before the path of the KPOINTS file, as recorded
+	at the end of its header by kpath.writeKpoints (e.g. "G 0, M 9, K 18, G 27 # weighted 8").
+	Returns 0 if the file is not found or the number is not recorded.
+	'''
+
+	try:
+		with open (fKpoints, 'r') as fileIn:
+			header = fileIn.readline()
+	except FileNotFoundError:
+		return 0
+
+	match = re.search (r'#\s*weighted\s+(\d+)', header)
+	return int (match.group(1)) if match else 0
+
+def readJumps (fKpoints):
+	'''
+	Reads the jumps of the path of the KPOINTS file, whose two ends are labelled together in its header
+	by kpath.writeKpoints (e.g. "G 0, X 9, K|U 18, X 22"). Returns the indexes of the k-points following
+	a jump, counted from the start of the path (U above). Returns [] if the file is not found.
+	'''
+
+	try:
+		with open (fKpoints, 'r') as fileIn:
+			header = fileIn.readline()
+	except FileNotFoundError:
+		return []
+
+	jumps = []
+	for eachKpt in header.split ('#')[0].split (','):
+		l = eachKpt.split()
+		if len(l) == 2 and '|' in l[0] and l[1].isdigit():
+			jumps.append (int (l[1]))
+
+	return sorted (jumps)
+
+def ignoredKpoints (nKPTignore, fOutcar):
+	'''
+	Returns the number of k-points to ignore: nKPTignore if given, or the number of weighted
+	k-points recorded in the KPOINTS file in the same folder as fOutcar (see readWeightedKpoints)
+	'''
+
+	if nKPTignore is None:
+		return readWeightedKpoints (os.path.join (os.path.dirname (fOutcar), 'KPOINTS'))
+
+	return nKPTignore
+
+def readBandStructure (fOutcar, nKPTignore = None):
+	'''
+	Reads a single band structure. Useful as a task for pools of processes.
+	'''
+
+	return BandStructure (fOutcar = fOutcar, nKPTignore = nKPTignore)
+
+def readBandStructures (fOutcars, nKPTignore = None, nProcs = None):
+	'''
+	Reads several OUTCAR files in parallel, one per process.
+	Returns the list of BandStructure in the same order as fOutcars.
+	'''
+
+	with ProcessPoolExecutor (max_workers = nProcs) as executor:
+		return list (executor.map (readBandStructure, fOutcars, [nKPTignore]*len(fOutcars)))
+
+def readWeights (fOutcar, nKPTignore = 0):
+	'''
+	Reads the weights of the k-points used in the calculation, in the same order as BandStructure.path
+	(the first nKPTignore k-points are put aside). Returns an array normalized to a sum of 1.
+	If all k-points kept have zero weight (e.g. the path of a hybrid functional calculation),
+	all of them are equally weighted.
+	'''
+
+	weights = []
+
+	try:
+		with open(fOutcar,'r') as fileIn:
+			outcar = fileIn.read()
+	except FileNotFoundError:
+		print ("OUTCAR file not found! Exiting...\n")
+		sys.exit (1)
+
+	## Selects the text block regarding the k-points info, as BandStructure.readPath
+	text = outcar.split('k-points in reciprocal lattice and weights:')[1].split('position of ions in fractional coordinates')[0]
+	lines = text.split('\n')
+
+	for k in range(nKPTignore + 1, len(lines)):
+		data = lines[k].split()
+
+		if len(data) == 4:
+			weights.append (float(data[3]))
+
+	weights = np.array (weights)
+
+	if weights.sum() <= 0:
+		return np.full (len(weights), 1/len(weights))
+
+	return weights/weights.sum()
+
+def readRecLattice (fOutcar):
+	"""
+	Reads the reciprocal lattice [b1,b2,b3] of the cell used in the calculation, without the factor 2*pi.
+	Only the beginning of the OUTCAR file, up to the lattice vectors, is read.
+	"""
+	
+	try:
+		with open(fOutcar,'r') as fileIn:
+			for line in fileIn:
+				if 'reciprocal lattice vectors' in line:
+					## The reciprocal vectors are the last three columns of the next three lines
+					return [[float(x) for x in fileIn.readline().split()[3:6]] for i in range(3)]
+	
+	except FileNotFoundError:
+		print ("OUTCAR file not found! Exiting...\n")
+		sys.exit (1)
+	
+	print ("Reciprocal lattice vectors not found in the OUTCAR file! Exiting...\n")
+	sys.exit (1)
+
 def distance (basis, p1, p2):
 	'''
 	Auxiliary function to calculate the cartesian distance between two given points
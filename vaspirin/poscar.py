@@ -131,7 +131,7 @@ class POSCAR (object):
 				for i,line in enumerate(f):
 					## Go to the second line (index 1) to get the multiplier
 					if i == 1:
-						multiplier = float (line.strip()[0])
+						multiplier = float (line.split()[0])
 					## Get the lattice vectors
 					elif i >= 2 and i <= 4:
 						## Separates the vector coordinates using multiple spaces as divider.
@@ -1,5 +1,20 @@
-import sys, os, shutil
-from . import projection
+import sys, os, re, shutil
+import numpy as np
+from . import projection, profiling, outcar
+
+class OrbitalConstants (object):
+	'''
+	Default grouping of the atomic orbitals read from the PROCAR file
+	'''
+
+	## s, px+py, pz and d, as in the bands_character/ files written so far
+	defaultGroups = ['s', 'px+py', 'pz', 'd']
+
+	## Added to the default groups when the PROCAR file has f orbitals (16 columns)
+	fGroups = ['f']
+
+	## Names used by some VASP versions in the header of the table of contributions
+	aliases = {'x2-y2' : 'dx2'}
 
 class PROCAR (object):
 	'''
@@ -9,39 +24,85 @@ class PROCAR (object):
 	happens in this case. To solve this problem, another class named PROCAR_splitter has been created to directly create the .dat file from a large PROCAR file.
 	'''
 
-	def __init__ (self, fProcar, projection, nKPTignore = 0):
-		self.nKPTignore = nKPTignore
+	@profiling.timed ('procar.PROCAR')
+	def __init__ (self, fProcar, projection, nKPTignore = None, bands = None, groups = None):
+		self.fProcar = fProcar
 		"""
-		Number of k-points to be ignored
+		PROCAR file read
+		"""
+		
+		self.nKPTignore = outcar.ignoredKpoints (nKPTignore, fProcar)
+		"""
+		Number of k-points to be ignored.
+		If not given, the number of weighted k-points recorded in the KPOINTS file (see outcar.readWeightedKpoints)
 		"""
 		
 		self.nKpoints,self.nBands,self.nIons = self.readHeader (fProcar)
 		"""
 		Number of k-points, bands and ions in the system
 		"""
+		
+		self.selectedBands = set(range(self.nBands)) if bands is None else set(bands)
+		"""
+		Indexes of the bands to be parsed, e.g. those given by outcar.BandStructure.selectedBands ()
+		The contributions of the other bands are not read and are set to zero
+		"""
 
-		self.orbitalContributions = self.readOrbitalContribution (fProcar)
+		self.orbitalNames = readOrbitalNames (fProcar)
+		"""
+		Names of the orbitals in the columns of the PROCAR file, e.g. s, py, pz, px, dxy, ...
+		"""
+		
+		self.lmContributions, self.ionContributions = self.readContributions (fProcar)
 		"""
-		Reads the composition of the bands, for each k-point, projected onto atomic orbitals
+		Composition of the bands, for each k-point, projected onto each orbital of the PROCAR file
+		and onto each atomic site, as arrays indexed as lmContributions[k-point][band][orbital],
+		with the orbitals as in self.orbitalNames, and ionContributions[k-point][band][ion]
 		"""
 		
-		self.ionContributions = self.readIonContribution (fProcar)
+		self.orbitalGroups = []
 		"""
-		Reads the composition of the bands, for each k-point, projected onto atomic sites
+		Groups of orbitals onto which the bands are projected, e.g. ['s', 'px+py', 'pz', 'd']
 		"""
 		
+		self.orbitalContributions = None
+		"""
+		Composition of the bands, for each k-point, projected onto the groups of orbitals
+		orbitalContributions[k-point][band][group], with the groups as in self.orbitalGroups
+		"""
+		
+		self.setOrbitalGroups (defaultOrbitalGroups (self.orbitalNames) if groups is None else groups)
+		
 		self.prj = projection
 		"""
 		PROJECTION information
 		"""
 		
-		self.materialContributions = []
+		self.materialContributions = None
 		"""
-		For projecting bands onto groups of atomic sites (materials)
+		For projecting bands onto groups of atomic sites (materials), as an array
+		indexed as materialContributions[k-point][band][material in index form]
 		"""
 		
 		self.sumContributions()
 		
+		self.ionOrbitalContributions = None
+		"""
+		Composition of the bands projected onto each orbital of each ion, indexed as [k-point][band][ion][orbital]
+		Only read from the PROCAR file when joint projections are requested (see setJointSpecs)
+		"""
+		
+		self.jointSpecs = []
+		"""
+		Joint projections onto ions and orbitals, e.g. ['Mo:d', 'S:pz']
+		"""
+		
+		self.jointContributions = None
+		"""
+		Composition of the bands, for each k-point, projected onto the joint projections
+		jointContributions[k-point][band][spec], with the specs as in self.jointSpecs
+		"""
+		
 	
 	def readHeader (self,fProcar):
 		'''
@@ -68,9 +129,13 @@ class PROCAR (object):
 		return nkpt,nbands,nions
 		
 
-	def readOrbitalContribution (self,fProcar):
+	@profiling.timed ('procar.readContributions')
+	def readContributions (self, fProcar):
 		"""
-		Creates a matrix containing the contribution of each orbital.
+		Reads the relative contribution of each orbital and of each ion to the bands, for each k-point,
+		in a single pass over the PROCAR file. Returns the arrays lm[k-point][band][orbital]
+		and ions[k-point][band][ion], allocated once and filled k-point by k-point.
+		The contributions of the bands outside of the selection are not read and are set to zero.
 		"""
 		
 		try:
@@ -79,55 +144,91 @@ class PROCAR (object):
 		except FileNotFoundError:
 			print ("PROCAR file not found! Exiting...\n")
 			sys.exit (1)
-			
-			
-		## contributions[kpoint][band] returns the list [s,px+py,pz,d]
-		contributions = []
 		
-		kptBlock = procar.split('k-point')
+		## The header and the k-points to be ignored are skipped before splitting
+		kptBlock = skipKpoints (procar, self.nKPTignore).split('k-point')[1:]
 		
-		## The first two blocks are the header, thus should be ignored
-		## Loops over each k-point
-		for k in range (2 + self.nKPTignore,len(kptBlock)):
-			contributions.append([])
-			
-			## Splits the k-point block into bands
-			bands = kptBlock[k].split('band')
+		lm = np.zeros ((len(kptBlock), self.nBands, len(self.orbitalNames)))
+		ions = np.zeros ((len(kptBlock), self.nBands, self.nIons))
+		bands = sorted (self.selectedBands)
+		
+		for k in range (len(kptBlock)):
+			## Splits the k-point block into bands, ignoring the first block (the header)
+			bandBlocks = kptBlock[k].split('band')
 			
-			## Loops over each band, ignoring the first block (the header)
-			for j in range (1,self.nBands+1):
-				contributions[k - (self.nKPTignore + 2)].append([])
-				lines = bands[j].split('\n')
-				
-				## The line 3+self.nIons represents the total contribution in terms of
-				## atomic orbitals. It is about the last line in the block being manipulated
-				totCont = float(lines[3+self.nIons].split()[10])
-				
-				if totCont > 0:
-					sCont = float(lines[3+self.nIons].split()[1])/totCont
-					pyCont = float(lines[3+self.nIons].split()[2])/totCont
-					pzCont = float(lines[3+self.nIons].split()[3])/totCont
-					pxCont = float(lines[3+self.nIons].split()[4])/totCont
-					dxyCont = float(lines[3+self.nIons].split()[5])/totCont
-					dyzCont = float(lines[3+self.nIons].split()[6])/totCont
-					dz2Cont = float(lines[3+self.nIons].split()[7])/totCont
-					dxzCont = float(lines[3+self.nIons].split()[8])/totCont
-					dx2Cont = float(lines[3+self.nIons].split()[9])/totCont
-					contributions[k-self.nKPTignore-2][j-1].extend([sCont, pyCont + pxCont, pzCont, dxyCont + dyzCont + dz2Cont + dxzCont + dx2Cont])
-					## Dangerous part of the code:
-					## To tweak the contributions as wanted
-					## Implement later on this on a script...
-					#~ contributions[k-self.nKPTignore-2][j-1].extend([4*dz2Cont, 0, 4*dxzCont, 0])
-				else:
-					contributions[k-self.nKPTignore-2][j-1].extend([0,0,0,0])       
+			lm[k, bands], ions[k, bands] = self.readTotals ([bandBlocks[band+1].split('\n') for band in bands])
 		
-		return contributions
+		return lm, ions
+	
+	def readTotals (self, bandLines):
+		"""
+		Returns the relative contribution of each orbital and of each ion to several bands, given the lines
+		of the block of each band in the PROCAR file starting from the line of the band, as the arrays
+		lm[band][orbital] and ions[band][ion]. Only the row and the column of totals are read, and the
+		totals of all bands are converted to numbers at once. Bands without any contribution are set to zero.
+		"""
+		
+		if not bandLines:
+			return np.zeros ((0, len(self.orbitalNames))), np.zeros ((0, self.nIons))
+		
+		## The last column of the rows of the ions holds their totals and the row of total contributions
+		## holds the total of each orbital, ending with the total of the band
+		tokens = []
+		for lines in bandLines:
+			tokens.extend ([line.rsplit(None, 1)[1] for line in lines[3:3+self.nIons]])
+			tokens.extend (lines[3+self.nIons].split()[1:])
+		
+		totals = np.array (tokens, dtype=float).reshape (len(bandLines), -1)
+		totCont = totals[:, -1:]
+		totals = np.divide (totals, totCont, out=np.zeros_like (totals), where=totCont > 0)
+		
+		return totals[:, self.nIons:-1], totals[:, :self.nIons]
+	
+	def readTables (self, bandLines):
+		"""
+		Returns the tables of contributions of several bands, given the lines of the block of each band
+		in the PROCAR file starting from the line of the band, as an array indexed as [band][ion][orbital]
+		and normalized by the total contribution of each band. The last ion holds the total of each orbital
+		and the last orbital the total of each ion. Bands without any contribution are set to zero.
+		The tables of all bands are converted to numbers at once.
+		"""
+		
+		if not bandLines:
+			return np.zeros ((0, self.nIons + 1, len(self.orbitalNames) + 1))
+		
+		## The rows of each ion hold its index, the contribution of each orbital and its total
+		## The label of the row of total contributions is replaced by a number, as the indexes of the ions
+		rows = [' '.join (lines[3:3+self.nIons] + ['0 ' + lines[3+self.nIons].split(None, 1)[1]]) for lines in bandLines]
+		tables = np.array (' '.join (rows).split(), dtype=float).reshape (len(bandLines), self.nIons + 1, -1)[:, :, 1:]
+		
+		totCont = tables[:, -1:, -1:]
+		
+		return np.divide (tables, totCont, out=np.zeros_like (tables), where=totCont > 0)
+	
+	def groupOrbitals (self, groups):
+		"""
+		Returns the composition of the bands projected onto the groups of orbitals,
+		as an array indexed as [k-point][band][group], without changing this object.
+		Several groupings can be obtained from a single parse of the PROCAR file.
+		"""
+		
+		return np.dot (self.lmContributions, orbitalGroupMatrix (groups, self.orbitalNames))
+	
+	def setOrbitalGroups (self, groups):
+		"""
+		Sets the groups of orbitals onto which the bands are projected, e.g. ['s', 'p', 'dz2', 'dxz+dyz'],
+		and updates self.orbitalContributions
+		"""
+		
+		self.orbitalContributions = self.groupOrbitals (groups)
+		self.orbitalGroups = list(groups)
 			
 
-	def readIonContribution (self,fProcar):
+	@profiling.timed ('procar.readIonOrbitalContribution')
+	def readIonOrbitalContribution (self, fProcar):
 		"""
-		Reads the relative contribution of all ions to the formation of the band, for each k-point.
-		Allows to study the character of the band.
+		Reads the relative contribution of each orbital of each ion to the bands, for each k-point.
+		Returns an array indexed as [k-point][band][ion][orbital].
 		"""
 		
 		try:
@@ -136,67 +237,226 @@ class PROCAR (object):
 		except FileNotFoundError:
 			print ("PROCAR file not found! Exiting...\n")
 			sys.exit (1)
-					
-		## contributions[k-point][band][ion]
-		contributions = []
 		
-		kptBlock = procar.split('k-point')
+		kptBlock = skipKpoints (procar, self.nKPTignore).split('k-point')[1:]
+		contributions = np.zeros ((len(kptBlock), self.nBands, self.nIons, len(self.orbitalNames)))
+		bands = sorted (self.selectedBands)
 		
-		## Loops over each k-point, ignoring the header and the first k-points (if applicable)
-		for k in range (2 + self.nKPTignore,len(kptBlock)):
-			
-			contributions.append([])
-			bands = kptBlock[k].split('band')
-			
-			## Now loops over each band
-			for j in range (1,self.nBands+1):
-				contributions[k-self.nKPTignore-2].append([])
-				lines = bands[j].split('\n')
-				
-				## Total contribution for the specified k-point and band
-				totCont = float(lines[3+self.nIons].split()[10])
-				
-				if totCont > 0:
-					ionsContributionsThisBand = []
-					
-					## Loops over all ions to get their contribution to the band
-					for i in range(self.nIons):
-						## The first ion is seen in lines[3] and the block index 10 (11th column) is the ionic contribution to the system
-						thisIonContribution = float(lines[3+i].split()[10])/totCont
-						ionsContributionsThisBand.append(thisIonContribution)
-					
-					## Saves the information and goes on to a new band
-					contributions[k-self.nKPTignore-2][j-1].extend(ionsContributionsThisBand)
-				else:
-					contributions[k-self.nKPTignore-2][j-1].extend([0]*self.nIons)      
+		for k in range (len(kptBlock)):
+			bandBlocks = kptBlock[k].split('band')
+			contributions[k, bands] = self.readTables ([bandBlocks[band+1].split('\n') for band in bands])[:, :-1, :-1]
 		
 		return contributions
-			
+	
+	def getIonOrbitalContributions (self):
+		"""
+		Returns the composition of the bands projected onto each orbital of each ion,
+		indexed as [k-point][band][ion][orbital], reading it from the PROCAR file on the first call
+		"""
+		
+		if self.ionOrbitalContributions is None:
+			self.ionOrbitalContributions = self.readIonOrbitalContribution (self.fProcar)
+		
+		return self.ionOrbitalContributions
+	
+	def projectJoint (self, specs):
+		"""
+		Returns the composition of the bands projected onto the joint projections specs (see jointSpecTensor),
+		as an array indexed as [k-point][band][spec]. All specs are evaluated in a single contraction.
+		"""
+		
+		weights = jointSpecTensor (specs, self.prj, self.orbitalNames, self.nIons)
+		
+		return np.einsum ('kbio,ios->kbs', self.getIonOrbitalContributions (), weights, optimize=True)
+	
+	def setJointSpecs (self, specs):
+		"""
+		Sets the joint projections onto ions and orbitals, e.g. ['Mo:d', 'S:pz'],
+		and updates self.jointContributions
+		"""
 		
+		self.jointContributions = self.projectJoint (specs)
+		self.jointSpecs = list(specs)
+	
+	def materialMatrix (self):
+		"""
+		Returns the (nIons x nMaterials) matrix which sums the contributions of the ions
+		into the materials of the PROJECTION file, based on the list ionsVsMaterials
+		"""
+		
+		matrix = np.zeros ((self.nIons, len(self.prj.dictMaterials)))
+		
+		for eachIon in range(self.nIons):
+			matrix[eachIon, self.prj.dictMaterials.get(self.prj.ionsVsMaterials[eachIon])] = 1
+		
+		return matrix
+		
+	@profiling.timed ('procar.sumContributions')
 	def sumContributions (self):
 		"""
 		Sum the contributions from the ions into N materials based on the list ionsVsMaterials.
 		The list ionsVsMaterials simply labels the ions to be summed.
 		"""
 
-		## Variable to store the contributions of the N materials
 		## projectedContribution [k-point][band][material in index form]
-		projectedContributions = []
+		self.materialContributions = np.dot (self.ionContributions, self.materialMatrix ())
+	
+	def sumKpointContributions (self, kpt):
+		"""
+		Sum the contributions from the ions into N materials for the k-point kpt only.
+		Returns the array projectedContribution[band][material in index form]
+		"""
 		
-		## Loops over each k-point not ignored
-		for kpt in range(self.nKpoints - self.nKPTignore):
-			projectedContributions.append ([])
-			
-			for band in range (self.nBands):
-				projectedContributions[kpt].append ([])
-				projectedContributions[kpt][band].extend ([0]*len(self.prj.dictMaterials))
+		return np.dot (self.ionContributions[kpt], self.materialMatrix ())
+
+
+def skipKpoints (procar, nKPTignore):
+	"""
+	Returns the text of the PROCAR file from the block of the first k-point kept, after the header and
+	the nKPTignore k-points to be ignored. The ignored blocks are only searched for, neither split nor parsed.
+	"""
+
+	## The first occurrence of 'k-point' is in the header ("# of k-points:")
+	position = procar.find ('k-point')
+	for k in range (nKPTignore + 1):
+		if position < 0:
+			break
+		position = procar.find ('k-point', position + 1)
+
+	return procar[position:] if position >= 0 else ''
+
+def readBandLayout (fProcar):
+	"""
+	Returns the names of the orbitals in the columns of the PROCAR file and the number of lines
+	of each band block, both read from the first band block. The number of columns depends on
+	the orbitals (9 for s, p, d or 16 with f orbitals) and the phase factors written with
+	LORBIT = 12 add a table after each band, whose lines are simply counted here.
+	Returns None for the orbitals until the first table has been written, and None for the
+	length of the blocks until the next band or k-point has been written.
+	"""
+	
+	orbitalNames = None
+	start = None
+	
+	try:
+		with open(fProcar,'r') as f:
+			for i, line in enumerate (f):
+				first = line.split()[:1]
 				
-				for eachIon in range(self.nIons):		
-					## Variable which groups ions pertaining to the same material
-					ionLabel = self.prj.dictMaterials.get(self.prj.ionsVsMaterials[eachIon])
-					
-					## Sums contribution of ions labeled together
-					projectedContributions[kpt][band][ionLabel] += self.ionContributions[kpt][band][eachIon]
-		
-		self.materialContributions = projectedContributions
-		return
+				if start is None:
+					if first == ['band']:
+						start = i
+				elif orbitalNames is None:
+					if first == ['ion']:
+						orbitalNames = [OrbitalConstants.aliases.get(name, name) for name in line.split()[1:-1]]
+				elif first == ['band']:
+					return orbitalNames, i - start
+				elif first == ['k-point']:
+					## A blank line closes the k-point block
+					return orbitalNames, i - start - 1
+	except FileNotFoundError:
+		print ("PROCAR file not found! Exiting...\n")
+		sys.exit (1)
+	
+	return orbitalNames, None
+
+def readOrbitalNames (fProcar):
+	"""
+	Returns the names of the orbitals in the columns of the PROCAR file, read
+	from the header of the first table of contributions (e.g. s, py, pz, px, dxy, ...)
+	"""
+	
+	orbitalNames = readBandLayout (fProcar)[0]
+	
+	if orbitalNames is None:
+		print ("No table of contributions found in the PROCAR file! Exiting...\n")
+		sys.exit (1)
+	
+	return orbitalNames
+
+def defaultOrbitalGroups (orbitalNames):
+	"""
+	Returns the default groups of orbitals for the orbitals of a PROCAR file,
+	adding the f orbitals to OrbitalConstants.defaultGroups when they are present
+	"""
+	
+	if any (name.startswith('f') for name in orbitalNames):
+		return OrbitalConstants.defaultGroups + OrbitalConstants.fGroups
+	
+	return list(OrbitalConstants.defaultGroups)
+
+def parseOrbitalGroups (groupsString):
+	"""
+	Splits a string such as 's,px+py,pz,d' into a list of groups of orbitals
+	"""
+	
+	return [group.strip() for group in groupsString.split(',') if group.strip()]
+
+def orbitalGroupMatrix (groups, orbitalNames):
+	"""
+	Returns the (nOrbitals x nGroups) matrix which sums the orbitals of the PROCAR file into groups.
+	Each group joins orbitals with '+', e.g. 'dxz+dyz', and each orbital may be weighted, e.g. '4*dz2'.
+	The letters s, p, d and f alone stand for all orbitals of that kind.
+	"""
+	
+	matrix = np.zeros ((len(orbitalNames), len(groups)))
+	
+	for j, group in enumerate (groups):
+		for term in group.split('+'):
+			weight, name = term.split('*') if '*' in term else (1, term)
+			name = name.strip()
+			
+			if name in orbitalNames:
+				columns = [orbitalNames.index(name)]
+			else:
+				columns = [i for i, orbital in enumerate(orbitalNames) if len(name) == 1 and orbital.startswith(name)]
+			
+			if not columns:
+				print ("Orbital %s not found in the PROCAR file! Available orbitals: %s\nExiting...\n" % (name, ', '.join(orbitalNames)))
+				sys.exit (1)
+			
+			matrix[columns, j] += float(weight)
+	
+	return matrix
+
+def parseJointSpecs (specsString):
+	"""
+	Splits a string such as 'Mo:d,S:pz' into a list of joint projections
+	"""
+	
+	return [spec.strip() for spec in specsString.split(',') if spec.strip()]
+
+def jointSpecTensor (specs, prj, orbitalNames, nIons):
+	"""
+	Returns the (nIons x nOrbitals x nSpecs) tensor of weights of the joint projections specs.
+	Each spec is written as IONS:ORBITALS, e.g. 'Mo:dz2' or 'W+S:dxz+dyz'. IONS joins with '+' materials
+	of the PROJECTION file, ions (e.g. 3) and ranges of ions (e.g. 1..3), or is * for all ions.
+	ORBITALS is a group of orbitals as in orbitalGroupMatrix. Without ':ORBITALS', all orbitals are summed.
+	"""
+	
+	weights = np.zeros ((nIons, len(orbitalNames), len(specs)))
+	
+	for j, spec in enumerate (specs):
+		ionsString, orbitalsString = spec.split(':', 1) if ':' in spec else (spec, '+'.join(orbitalNames))
+		
+		ions = np.zeros (nIons)
+		for term in ionsString.split('+'):
+			term = term.strip()
+			
+			if term == '*':
+				ions[:] = 1
+			elif term in prj.dictMaterials:
+				ions[[i for i in range(nIons) if i < len(prj.ionsVsMaterials) and prj.ionsVsMaterials[i] == term]] = 1
+			elif re.fullmatch (r'\d+(\.\.\d+)?', term):
+				first, last = (term.split('..') + [term])[:2]
+				if not 1 <= int(first) <= int(last) <= nIons:
+					print ("Ions %s out of range in the projection %s! Exiting...\n" % (term, spec))
+					sys.exit (1)
+				ions[int(first)-1:int(last)] = 1
+			else:
+				print ("Material %s not found in the PROJECTION file! Available materials: %s\nExiting...\n" % (term, ', '.join(prj.dictMaterials)))
+				sys.exit (1)
+		
+		weights[:,:,j] = np.outer (ions, orbitalGroupMatrix ([orbitalsString], orbitalNames)[:,0])
+	
+	return weights
@@ -0,0 +1,305 @@
+import os, sys, time, json, atexit, threading, functools, contextlib, resource
+
+class Stage (object):
+	'''
+	Time, bytes read and memory spent in a stage of the post-processing (e.g. reading the OUTCAR file).
+	Stages are nested: a stage started within another one is kept as one of its children.
+	'''
+
+	def __init__ (self, name, parent=None):
+		self.name = name
+		"""
+		Name of the stage, e.g. outcar.BandStructure
+		"""
+
+		self.parent = parent
+		"""
+		Stage within which this stage has been started
+		"""
+
+		self.children = {}
+		"""
+		Stages started within this one, indexed by their names
+		"""
+
+		self.calls = 0
+		"""
+		Number of times the stage has been entered
+		"""
+
+		self.time = 0.0
+		"""
+		Total wall time spent in the stage, in seconds
+		"""
+
+		self.bytesRead = 0
+		"""
+		Total number of bytes read from files during the stage
+		"""
+
+		self.peakRSS = 0.0
+		"""
+		Peak resident memory sampled during the stage, in MB
+		"""
+
+	def child (self, name):
+		"""
+		Returns the child stage called name, creating it if needed
+		"""
+
+		if name not in self.children:
+			self.children[name] = Stage (name, self)
+
+		return self.children[name]
+
+	def toDict (self):
+		"""
+		Returns the stage and its children as a dictionary, as dumped to JSON
+		"""
+
+		return {
+			'name': self.name,
+			'calls': self.calls,
+			'time': self.time,
+			'bytesRead': self.bytesRead,
+			'peakRSS': self.peakRSS,
+			'stages': [child.toDict() for child in self.children.values()],
+		}
+
+def readRSS ():
+	"""
+	Returns the current resident memory of the process, in MB.
+	Falls back to the peak memory if /proc is not available.
+	"""
+
+	try:
+		with open ('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf ('SC_PAGE_SIZE') / 2**20
+	except (OSError, ValueError):
+		peak = resource.getrusage (resource.RUSAGE_SELF).ru_maxrss
+		return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def readBytes ():
+	"""
+	Returns the number of bytes read by the process so far, or 0 if /proc is not available
+	"""
+
+	try:
+		with open ('/proc/self/io') as f:
+			for line in f:
+				if line.startswith ('rchar:'):
+					return int(line.split()[1])
+	except OSError:
+		pass
+
+	return 0
+
+class Profiler (object):
+	'''
+	Collects the stages of a vaspirin run. While disabled (the default), entering
+	a stage costs a single attribute check. Once enabled, a background thread samples
+	the resident memory every sampleInterval seconds to find the peak of each stage.
+	'''
+
+	def __init__ (self):
+		self.enabled = False
+		"""
+		Whether stages are being recorded
+		"""
+
+		self.root = Stage ('total')
+		"""
+		Stage holding the whole run
+		"""
+
+		self.current = self.root
+		"""
+		Innermost stage running
+		"""
+
+		self.sampleInterval = 0.05
+		"""
+		Interval between two samples of the resident memory, in seconds
+		"""
+
+		self.sampler = None
+		self.startTime = 0.0
+		self.startBytes = 0
+
+	def enable (self):
+		"""
+		Starts recording stages and sampling the memory
+		"""
+
+		if self.enabled:
+			return
+
+		self.enabled = True
+		self.startTime = time.perf_counter ()
+		self.startBytes = readBytes ()
+		self.root.calls = 1
+
+		self.sampler = threading.Thread (target=self.sampleMemory, daemon=True)
+		self.sampler.start ()
+
+	def disable (self):
+		"""
+		Stops recording and closes the stage holding the whole run
+		"""
+
+		if not self.enabled:
+			return
+
+		self.enabled = False
+		self.sampler.join ()
+
+		self.root.time = time.perf_counter () - self.startTime
+		self.root.bytesRead = readBytes () - self.startBytes
+		self.updatePeak (readRSS ())
+
+	def updatePeak (self, rss):
+		"""
+		Updates the peak memory of the running stages
+		"""
+
+		stage = self.current
+		while stage is not None:
+			stage.peakRSS = max (stage.peakRSS, rss)
+			stage = stage.parent
+
+	def sampleMemory (self):
+		"""
+		Samples the resident memory while enabled (runs in a background thread)
+		"""
+
+		while self.enabled:
+			self.updatePeak (readRSS ())
+			time.sleep (self.sampleInterval)
+
+	@contextlib.contextmanager
+	def stage (self, name):
+		"""
+		Context manager recording the time, bytes read and memory spent in the stage name
+		"""
+
+		if not self.enabled:
+			yield
+			return
+
+		parent = self.current
+		self.current = parent.child (name)
+		self.current.calls += 1
+
+		startBytes = readBytes ()
+		startTime = time.perf_counter ()
+		self.updatePeak (readRSS ())
+
+		try:
+			yield
+		finally:
+			self.current.time += time.perf_counter () - startTime
+			self.current.bytesRead += readBytes () - startBytes
+			self.updatePeak (readRSS ())
+			self.current = parent
+
+	def report (self, outputFile=sys.stderr):
+		"""
+		Prints the time, bytes read and peak memory of each stage as a table
+		"""
+
+		outputFile.write ("\n%-44s %6s %10s %7s %10s %9s %10s\n" % ('stage', 'calls', 'time (s)', '%', 'read (MB)', 'MB/s', 'peak (MB)'))
+
+		def printStage (stage, depth):
+			name = '  '*depth + stage.name
+			percent = 100*stage.time/self.root.time if self.root.time > 0 else 0.0
+			throughput = stage.bytesRead/2**20/stage.time if stage.time > 0 else 0.0
+
+			outputFile.write ("%-44s %6d %10.3f %7.1f %10.1f %9.1f %10.1f\n" % (name, stage.calls, stage.time, percent,
+																				stage.bytesRead/2**20, throughput, stage.peakRSS))
+			for child in stage.children.values():
+				printStage (child, depth + 1)
+
+		printStage (self.root, 0)
+
+	def dump (self, fName):
+		"""
+		Writes the stages to the JSON file fName
+		"""
+
+		with open (fName, 'w') as f:
+			json.dump (self.root.toDict(), f, indent=2)
+
+profiler = Profiler ()
+"""
+Profiler shared by the whole package
+"""
+
+def stage (name):
+	"""
+	Context manager recording a stage in the shared profiler, e.g.:
+	with profiling.stage ('bfile'):
+		...
+	"""
+
+	return profiler.stage (name)
+
+def timed (name):
+	"""
+	Decorator recording each call of a function as a stage in the shared profiler
+	"""
+
+	def decorator (function):
+		@functools.wraps (function)
+		def wrapper (*args, **kwargs):
+			if not profiler.enabled:
+				return function (*args, **kwargs)
+
+			with profiler.stage (name):
+				return function (*args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+def addProfileArguments (parser):
+	"""
+	Adds the profiling options to the parser of a script
+	"""
+
+	parser.add_argument('--profile', nargs='?', const='-', default=None, metavar='JSON',
+						help="print the time, bytes read and peak memory of each stage when finished." +
+						" If a file name is given, the stages are written to it as JSON instead")
+
+	parser.add_argument('--cprofile', default=None, metavar='STATS',
+						help="run with cProfile and write the statistics to the file STATS" +
+						" (read them with `python -m pstats STATS`)")
+
+def setup (args):
+	"""
+	Starts profiling as requested by the arguments added by addProfileArguments.
+	The report is written when the script exits, even through sys.exit.
+	"""
+
+	if getattr (args, 'cprofile', None):
+		import cProfile
+
+		cprofiler = cProfile.Profile ()
+		cprofiler.enable ()
+
+		def finishCProfile ():
+			cprofiler.disable ()
+			cprofiler.dump_stats (args.cprofile)
+
+		atexit.register (finishCProfile)
+
+	if getattr (args, 'profile', None):
+		profiler.enable ()
+
+		def finishProfile ():
+			profiler.disable ()
+			if args.profile == '-':
+				profiler.report ()
+			else:
+				profiler.dump (args.profile)
+
+		atexit.register (finishProfile)
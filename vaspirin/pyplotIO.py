@@ -0,0 +1,437 @@
+import sys
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from .graceIO import GraceConstants
+from . import profiling
+
+class PyplotConstants (object):
+	"""
+	Translation of the XMGrace colors into matplotlib colors
+	"""
+
+	colors = {
+	"white" : "white",
+	"black" : "black",
+	"red" : "red",
+	"green" : "lime",
+	"blue" : "blue",
+	"yellow" : "yellow",
+	"brown" : "#bc8f8f",
+	"gray" : "#dcdcdc",
+	"violet" : "#9400d3",
+	"cyan" : "cyan",
+	"magenta" : "magenta",
+	"orange" : "orange",
+	"indigo" : "#720ebd",
+	"maroon" : "#671616",
+	"turquoise" : "#40e0d0",
+	"green4" : "#008b00"
+	}
+
+	sequentialColors = [name for name, index in sorted (GraceConstants.colors.items(), key=lambda x: x[1])]
+	"""
+	XMGrace colors ordered by their index, used when colors are not specified
+	"""
+
+	orbitalColors = ['red', 'green', 'blue', 'magenta']
+	"""
+	Colors of the projected orbitals, as in graceIO.Grace
+	"""
+
+class Pyplot (object):
+	"""
+	Renders band structures and density of states directly to image files (PNG, PDF, EPS, SVG)
+	using the Agg backend of matplotlib. The plots are made from the in-memory objects,
+	without writing .dat files and without running XMGrace.
+	"""
+
+	def __init__ (self):
+		"""
+		Set the initial conditions for the plots
+		"""
+		self.setDefaultParameters()
+
+	def setDefaultParameters (self):
+		"""
+		Default parameters for the plots, following graceIO.Grace
+		"""
+
+		self.yMax = 3
+		"""
+		The maximum value to be represented on the y axis
+		"""
+
+		self.yMin = -3
+		"""
+		The minimum value to be represented on the y axis
+		"""
+
+		self.xMax = 1
+		"""
+		The maximum value to be represented on the x axis
+		"""
+
+		self.xMin = 0
+		"""
+		The minimum value to be represented on the x axis
+		"""
+
+		self.xTicks = []
+		"""
+		The ticks to be represented in the x axis
+		"""
+
+		self.title = ""
+		"""
+		The plot title
+		"""
+
+		self.figSize = [4, 3]
+		"""
+		The figure size, in inches
+		"""
+
+		self.dpi = 300
+		"""
+		Resolution of raster images
+		"""
+
+		self.markerSize = 0.5
+		"""
+		The size of the symbols for a contribution equal to 1
+		"""
+
+		self.markerScale = 20.0
+		"""
+		Diameter of the symbols, in points, for a marker size equal to 1
+		"""
+
+		self.projectedColors = {}
+		"""
+		Dictionary containing the colors for bands projected onto atomic sites.
+		If it is not set, the sequential colors are used
+		"""
+
+		self.boolSymbolFill = False
+		"""
+		Boolean variable to set whether the symbols are or not filled
+		"""
+
+	def setYaxis (self, yMin, yMax):
+		"""
+		Default y axis parameters for the plots
+		"""
+		self.yMax = yMax
+		self.yMin = yMin
+
+	def setXaxis (self, xMin, xMax):
+		"""
+		Default x axis parameters for the plots
+		"""
+		self.xMax = xMax
+		self.xMin = xMin
+
+	def setXticks (self, ticksList):
+		"""
+		xTicks[index] = ["label string", index of the k-point]
+		"""
+		self.xTicks = ticksList
+
+	def readXticks (self, fKpoints):
+		"""
+		Read k-points ticks labels in the KPOINTS header
+
+		KPOINTS header format: KPT_1 index_1, KPT_2 index_2 ...
+		Example G 1, M 20, K 40, G 60
+		"""
+
+		ticks = []
+		try:
+			with open (fKpoints, 'r') as fileIn:
+				firstLine = fileIn.readline()
+				symKpt = firstLine.strip('\n').split(',')
+				for eachKpt in symKpt:
+					l = eachKpt.split(' ')
+					l = [i for i in l if i] # strips whitespace
+					ticks.append ([l[0], l[1]])
+
+		except FileNotFoundError:
+			print ("KPOINTS file not found! Exiting...\n")
+			sys.exit (1)
+
+		self.setXticks (ticks)
+
+	def setTitle (self, titleString):
+		"""
+		Set plot title
+		"""
+		self.title = titleString
+
+	def setMarkerSize (self, markerSize):
+		"""
+		Set the size of the symbols for projected bands
+		"""
+		self.markerSize = float(markerSize)
+
+	def setProjectedColors (self, projectedColors):
+		"""
+		Set colors from PROJECTION files
+		"""
+		self.projectedColors = projectedColors
+
+	def setSymbolFill (self, boolSymbolFill):
+		"""
+		Set whether or not the symbol fill is set
+		"""
+		self.boolSymbolFill = boolSymbolFill
+
+	def setFigSize (self, width, height):
+		"""
+		Set the size of the figure, in inches
+		"""
+		self.figSize = [width, height]
+
+	def color (self, name):
+		"""
+		Translates a XMGrace color name into a matplotlib color
+		"""
+		return PyplotConstants.colors.get (name.lower(), name.lower())
+
+	def projectedColor (self, index, nColors):
+		"""
+		Color of the material `index`, taken from the PROJECTION file if all colors are specified
+		"""
+
+		if len(self.projectedColors) == nColors:
+			return self.color (self.projectedColors.get(index))
+		else:
+			## As in graceIO.Grace, the first color is red
+			return self.color (PyplotConstants.sequentialColors[(index + 2) % len(PyplotConstants.sequentialColors)])
+
+	def newFigure (self):
+		"""
+		Creates a figure which is not managed by pyplot, thus being safe to use in batch
+		"""
+
+		fig = Figure (figsize=self.figSize)
+		FigureCanvasAgg (fig)
+		ax = fig.add_subplot (111)
+
+		if self.title:
+			ax.set_title (self.title)
+
+		return fig, ax
+
+	def saveFigure (self, fig, fName):
+		"""
+		Saves the figure; the format is chosen by the extension of fName
+		"""
+
+		fig.savefig (fName, dpi=self.dpi, bbox_inches='tight')
+
+	def bandsAxis (self, ax, bands):
+		"""
+		Configures the axis of band structures, including the symmetry points
+		"""
+
+		ax.set_xlim (self.xMin, self.xMax)
+		ax.set_ylim (self.yMin, self.yMax)
+		ax.set_ylabel ("Energy (eV)")
+
+		ticks = []
+		labels = []
+
+		for eachTick in self.xTicks:
+			try:
+				ticks.append (bands.xAxis[int(eachTick[1])])
+				labels.append ("$\\Gamma$" if eachTick[0] in ['G', '\\xG\\0'] else eachTick[0])
+			except IndexError:
+				print ('Symmetry point ' + eachTick[0] + ' specified as k-point ' + eachTick[1] + ' is out of range. Please specify valid k-points.')
+
+		ax.set_xticks (ticks)
+		ax.set_xticklabels (labels)
+
+		## Symmetry points have vertical dashed lines
+		for x in ticks:
+			ax.axvline (x, color='gray', linestyle='--', linewidth=0.5)
+
+	def bandLines (self, bands, color='black', linewidth=1.0):
+		"""
+		Returns a single LineCollection containing all bands selected by the energy window
+		"""
+
+		x = np.asarray (bands.xAxis, dtype=float)
+		E = np.asarray (bands.eigenvals, dtype=float)[:,bands.selectedBands()] - bands.reference
+
+		## segments[band] = [[x_0, E_0], [x_1, E_1], ...]
+		segments = np.stack ([np.broadcast_to (x, E.T.shape), E.T], axis=-1)
+
+		return LineCollection (segments, colors=color, linewidths=linewidth)
+
+	def bandMarkers (self, ax, bands, contributions, colors):
+		"""
+		Draws all symbols of projected bands with a single scatter.
+		contributions[k-point][band][i] is the contribution represented by the color colors[i]
+		"""
+
+		x = np.asarray (bands.xAxis, dtype=float)
+		E = np.asarray (bands.eigenvals, dtype=float) - bands.reference
+		c = np.asarray (contributions, dtype=float)
+
+		nKpoints, nBands, nColumns = c.shape
+
+		xs = np.broadcast_to (x[:,None,None], c.shape).ravel()
+		ys = np.broadcast_to (E[:,:,None], c.shape).ravel()
+		sizes = (c*self.markerSize*self.markerScale).ravel()**2
+		rgba = np.broadcast_to (np.array([to_rgba(self.color(x)) for x in colors])[None,None,:,:], c.shape + (4,)).reshape(-1, 4)
+
+		## Points without contribution are not drawn
+		visible = sizes > 0
+
+		if self.boolSymbolFill:
+			ax.scatter (xs[visible], ys[visible], s=sizes[visible], c=rgba[visible], linewidths=0)
+		else:
+			ax.scatter (xs[visible], ys[visible], s=sizes[visible], facecolors='none', edgecolors=rgba[visible], linewidths=0.5)
+
+	@profiling.timed ('pyplotIO.plotBands')
+	def plotBands (self, bands, fName='bands.png', traceColor='black'):
+		"""
+		Renders a common band structure
+		"""
+
+		fig, ax = self.newFigure ()
+		ax.add_collection (self.bandLines (bands, color=self.color(traceColor), linewidth=1.5))
+		self.bandsAxis (ax, bands)
+		self.saveFigure (fig, fName)
+
+	@profiling.timed ('pyplotIO.plotComparedBands')
+	def plotComparedBands (self, bandStructures, colors, fName='bandsComparison.png'):
+		"""
+		Renders several band structures in the same plot, one color for each
+		"""
+
+		fig, ax = self.newFigure ()
+
+		for bands, color in zip (bandStructures, colors):
+			ax.add_collection (self.bandLines (bands, color=self.color(color), linewidth=1.5))
+
+		self.bandsAxis (ax, bandStructures[0])
+		self.saveFigure (fig, fName)
+
+	@profiling.timed ('pyplotIO.plotBandsCharacter')
+	def plotBandsCharacter (self, bands, bandCharacter, fName='bandsCharacter.png'):
+		"""
+		Renders a band structure projected onto atomic orbitals
+		"""
+
+		fig, ax = self.newFigure ()
+		ax.add_collection (self.bandLines (bands, color=self.color('gray'), linewidth=1.0))
+
+		nColumns = len(bandCharacter.orbitalContributions[0][0])
+		colors = [PyplotConstants.orbitalColors[i] if i < len(PyplotConstants.orbitalColors) else PyplotConstants.sequentialColors[i+2] for i in range(nColumns)]
+
+		self.bandMarkers (ax, bands, bandCharacter.orbitalContributions, colors)
+		self.bandsAxis (ax, bands)
+		self.saveFigure (fig, fName)
+
+	@profiling.timed ('pyplotIO.plotBandsJoint')
+	def plotBandsJoint (self, bands, bandCharacter, fName='bandsJoint.png'):
+		"""
+		Renders a band structure projected onto joint projections onto ions and orbitals
+		"""
+
+		fig, ax = self.newFigure ()
+		ax.add_collection (self.bandLines (bands, color=self.color('gray'), linewidth=1.0))
+
+		nColumns = len(bandCharacter.jointSpecs)
+		colors = [PyplotConstants.orbitalColors[i] if i < len(PyplotConstants.orbitalColors) else PyplotConstants.sequentialColors[i+2] for i in range(nColumns)]
+
+		self.bandMarkers (ax, bands, bandCharacter.jointContributions, colors)
+		self.bandsAxis (ax, bands)
+		self.saveFigure (fig, fName)
+
+	@profiling.timed ('pyplotIO.plotBandsProjected')
+	def plotBandsProjected (self, bands, bandCharacter, fName='bandsProjected.png'):
+		"""
+		Renders a band structure projected onto the materials of the PROJECTION file
+		"""
+
+		fig, ax = self.newFigure ()
+		ax.add_collection (self.bandLines (bands, color=self.color('gray'), linewidth=1.0))
+
+		nMaterials = len(bandCharacter.prj.dictMaterials)
+		colors = [self.projectedColor (i, nMaterials) for i in range(nMaterials)]
+
+		self.bandMarkers (ax, bands, bandCharacter.materialContributions, colors)
+		self.bandsAxis (ax, bands)
+		self.saveFigure (fig, fName)
+
+	def dosAxis (self, ax):
+		"""
+		Configures the axis of the density of states
+		"""
+
+		ax.set_xlim (self.xMin, self.xMax)
+		ax.set_ylim (self.yMin, self.yMax)
+		ax.set_xlabel ("Energy (eV)")
+		ax.set_ylabel ("DOS (a.u.)")
+
+	def dosTrace (self, ax, energies, states, color):
+		"""
+		Draws a single density of states, filled if the symbol fill is set
+		"""
+
+		ax.plot (energies, states, color=color, linewidth=1.0)
+
+		if self.boolSymbolFill:
+			ax.fill_between (energies, states, color=color)
+
+	@profiling.timed ('pyplotIO.plotDOS')
+	def plotDOS (self, dos, fName='dos.png', traceColor='black'):
+		"""
+		Renders the total density of states
+		"""
+
+		fig, ax = self.newFigure ()
+		self.dosTrace (ax, np.asarray(dos.energies) - dos.reference, dos.states, self.color(traceColor))
+		self.dosAxis (ax)
+		self.saveFigure (fig, fName)
+
+	@profiling.timed ('pyplotIO.plotDOSCharacter')
+	def plotDOSCharacter (self, dos, fName='dosOrbital.png'):
+		"""
+		Renders the density of states projected onto atomic orbitals: s, px+py, pz, d
+		"""
+
+		fig, ax = self.newFigure ()
+		self.dosTrace (ax, np.asarray(dos.energies) - dos.reference, dos.states, self.color('gray'))
+
+		orbitals = np.asarray (dos.orbitalDOS.dos, dtype=float)
+		energies = orbitals[:,0] - dos.reference
+		groups = [orbitals[:,1], orbitals[:,2] + orbitals[:,4], orbitals[:,3], orbitals[:,5:10].sum(axis=1)]
+
+		for states, color in zip (groups, PyplotConstants.orbitalColors):
+			self.dosTrace (ax, energies, states, self.color(color))
+
+		self.dosAxis (ax)
+		self.saveFigure (fig, fName)
+
+	@profiling.timed ('pyplotIO.plotDOSProjected')
+	def plotDOSProjected (self, dos, fName='dosProjected.png'):
+		"""
+		Renders the density of states projected onto the materials of the PROJECTION file
+		"""
+
+		fig, ax = self.newFigure ()
+		self.dosTrace (ax, np.asarray(dos.energies) - dos.reference, dos.states, self.color('gray'))
+
+		nMaterials = len(dos.materialDOS)
+		for i, material in enumerate (dos.materialDOS):
+			totalDOS = np.asarray (material.totalDOS, dtype=float)
+			self.dosTrace (ax, totalDOS[:,0] - dos.reference, totalDOS[:,1], self.projectedColor (i, nMaterials))
+
+		self.dosAxis (ax)
+		self.saveFigure (fig, fName)
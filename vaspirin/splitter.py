@@ -1,12 +1,13 @@
 import os,sys,shutil
-from . import projection
+import numpy as np
+from . import projection,procar,binIO,profiling
 
 class PROCAR_splitter (object):
 	'''
 	Deals with big PROCAR files: splits the file directly onto .dat files, thus bypassing the .dat generator. This is useful for very large files (~ GB files), since it does not requires the standard open-and-close approach to reading the files, but reads it only once and one line per time.
 	'''
 
-	def __init__ (self, fProcar, projection, bs, marker=0.5, nKPTignore=0):
+	def __init__ (self, fProcar, projection, bs, marker=0.5, nKPTignore=None, groups=None):
 		
 		self.fProcar = fProcar
 		"""
@@ -18,9 +19,9 @@ class PROCAR_splitter (object):
 		PROJECTION information
 		"""
 		
-		self.nKPTignore = nKPTignore
+		self.nKPTignore = bs.nKPTignore if nKPTignore is None else nKPTignore
 		"""
-		Number of k-points to be ignored
+		Number of k-points to be ignored, by default the same as in the band structure
 		"""
 		
 		self.nKpoints,self.nBands,self.nIons = self.readHeader ()
@@ -43,6 +44,32 @@ class PROCAR_splitter (object):
 		The size of the symbols
 		"""
 		
+		self.selectedBands = set(bs.selectedBands())
+		"""
+		Indexes of the bands crossing the energy window of the band structure
+		Only these bands are parsed and written to .dat files
+		"""
+		
+		self.orbitalNames = procar.readOrbitalNames (fProcar)
+		"""
+		Names of the orbitals in the columns of the PROCAR file, e.g. s, py, pz, px, dxy, ...
+		"""
+		
+		self.bandLength = procar.readBandLayout (fProcar)[1] or self.nIons + 5
+		"""
+		Number of lines of each band block, including the table of phase factors written with LORBIT = 12
+		"""
+		
+		self.orbitalGroups = list(procar.defaultOrbitalGroups (self.orbitalNames) if groups is None else groups)
+		"""
+		Groups of orbitals onto which the bands are projected by splitOrbitals, e.g. ['s', 'px+py', 'pz', 'd']
+		"""
+		
+		self.groupMatrix = procar.orbitalGroupMatrix (self.orbitalGroups, self.orbitalNames)
+		"""
+		Matrix summing the orbitals of the PROCAR file into the groups of orbitals
+		"""
+		
 	
 	def readHeader (self):
 		'''
@@ -70,16 +97,31 @@ class PROCAR_splitter (object):
 			
 			
 			
-	def splitPROCAR (self):
+	def createBinary (self, fBinary, nColumns, kind):
+		'''
+		Creates the binary file filled while splitting, and the position of each band within it
+		'''
+		
+		bands = sorted (self.selectedBands)
+		bandsFile = binIO.createBandsFile (fBinary, self.axis[:self.nKpoints - self.nKPTignore], bands, nColumns, self.ref, kind)
+		
+		return bandsFile, {band : i for i, band in enumerate(bands)}
+	
+	@profiling.timed ('splitter.splitPROCAR')
+	def splitPROCAR (self, fBinary=None):
 		'''
 		Splits the PROCAR file as made by the plotter.
+		If fBinary is given, a single binary file (see binIO.BandsFile) is written instead of the .dat files.
 		'''
 		
-		try:
-			os.mkdir ('bands_projected')
-		except FileExistsError:
-			shutil.rmtree ('bands_projected')
-			os.mkdir ('bands_projected')
+		if fBinary:
+			bandsFile, position = self.createBinary (fBinary, len(self.prj.dictMaterials), 'projected')
+		else:
+			try:
+				os.mkdir ('bands_projected')
+			except FileExistsError:
+				shutil.rmtree ('bands_projected')
+				os.mkdir ('bands_projected')
 			
 		try:
 			with open(self.fProcar,'r') as f:
@@ -92,16 +134,8 @@ class PROCAR_splitter (object):
 					f.readline() # Throw away the k-point line
 					f.readline() # and a blank line
 					
-					for band in range (self.nBands):
-						f.readline() ## Throw away the band line,
-						f.readline() ## a blank line,
-						f.readline() ## and the table header
-						
-						for ion in range(self.nIons):
-							f.readline() # Throw away each atom's contribution
-						
-						f.readline() # Total contributions line
-						f.readline() # and a blank line
+					for i in range (self.nBands*self.bandLength):
+						f.readline() # Throw away the blocks of all bands
 					
 					f.readline() # Throw away a blank line
 						
@@ -113,6 +147,12 @@ class PROCAR_splitter (object):
 					
 					## Read the information
 					for band in range (self.nBands):
+						## Bands outside of the selection are skipped without being parsed
+						if band not in self.selectedBands:
+							for i in range(self.bandLength):
+								f.readline()
+							continue
+						
 						## Read the eigenvalue
 						eigenval = float(f.readline().split('energy')[1].split()[0])
 						
@@ -128,7 +168,9 @@ class PROCAR_splitter (object):
 						## Read total contributions
 						totContributions = float(f.readline().split()[-1])
 						
-						f.readline() # Throw away a blank line
+						## Throw away a blank line and the phase factors, if any
+						for i in range(self.bandLength - self.nIons - 4):
+							f.readline()
 						
 						## Normalize
 						contributions = [x/totContributions for x in contributions]
@@ -136,6 +178,12 @@ class PROCAR_splitter (object):
 						## Sum contributions
 						projectedContributions = self.sumContributions(contributions)
 						
+						## Store in the binary file
+						if fBinary:
+							bandsFile.eigenvals[kpt, position[band]] = eigenval
+							bandsFile.contributions[kpt, position[band]] = projectedContributions
+							continue
+						
 						## Print in .dat file
 						with open ("bands_projected/band%02d.dat" % int(band+1),'a') as outputFile:
 							outputFile.write ("%.6f % 3.6f" % (self.axis[kpt], eigenval - self.ref))
@@ -149,18 +197,26 @@ class PROCAR_splitter (object):
 		except FileNotFoundError:
 			print ("PROCAR file not found! Exiting...\n")
 			sys.exit (1)
+		
+		if fBinary:
+			bandsFile.flush ()
 	
 	
-	def splitOrbitals (self):
+	@profiling.timed ('splitter.splitOrbitals')
+	def splitOrbitals (self, fBinary=None):
 		'''
 		Splits the PROCAR file projected onto atomic orbitals, as made by the plotter.
+		If fBinary is given, a single binary file (see binIO.BandsFile) is written instead of the .dat files.
 		'''
 		
-		try:
-			os.mkdir ('bands_character')
-		except FileExistsError:
-			shutil.rmtree ('bands_character')
-			os.mkdir ('bands_character')
+		if fBinary:
+			bandsFile, position = self.createBinary (fBinary, len(self.orbitalGroups), 'character')
+		else:
+			try:
+				os.mkdir ('bands_character')
+			except FileExistsError:
+				shutil.rmtree ('bands_character')
+				os.mkdir ('bands_character')
 			
 		try:
 			with open(self.fProcar,'r') as f:
@@ -173,16 +229,8 @@ class PROCAR_splitter (object):
 					f.readline() # Throw away the k-point line
 					f.readline() # and a blank line
 					
-					for band in range (self.nBands):
-						f.readline() ## Throw away the band line,
-						f.readline() ## a blank line,
-						f.readline() ## and the table header
-						
-						for ion in range(self.nIons):
-							f.readline() # Throw away each atom's contribution
-						
-						f.readline() # Total contributions line
-						f.readline() # and a blank line
+					for i in range (self.nBands*self.bandLength):
+						f.readline() # Throw away the blocks of all bands
 					
 					f.readline() # Throw away a blank line
 						
@@ -194,6 +242,12 @@ class PROCAR_splitter (object):
 					
 					## Read the information
 					for band in range (self.nBands):
+						## Bands outside of the selection are skipped without being parsed
+						if band not in self.selectedBands:
+							for i in range(self.bandLength):
+								f.readline()
+							continue
+						
 						## Read the eigenvalue
 						eigenval = float(f.readline().split('energy')[1].split()[0])
 						
@@ -208,24 +262,21 @@ class PROCAR_splitter (object):
 						lineTotContributions = f.readline().split()
 						totCont = float(lineTotContributions[-1])
 						
-						contributions = []
-						
-						## And the orbital-projected contributions
+						## And the orbital-projected contributions, summed into the groups of orbitals
 						if totCont > 0:
-							sCont = float(lineTotContributions[1])/totCont
-							pyCont = float(lineTotContributions[2])/totCont
-							pzCont = float(lineTotContributions[3])/totCont
-							pxCont = float(lineTotContributions[4])/totCont
-							dxyCont = float(lineTotContributions[5])/totCont
-							dyzCont = float(lineTotContributions[6])/totCont
-							dz2Cont = float(lineTotContributions[7])/totCont
-							dxzCont = float(lineTotContributions[8])/totCont
-							dx2Cont = float(lineTotContributions[9])/totCont
-							contributions = [sCont, pyCont + pxCont, pzCont, dxyCont + dyzCont + dz2Cont + dxzCont + dx2Cont]
+							contributions = np.dot ([float(x)/totCont for x in lineTotContributions[1:-1]], self.groupMatrix).tolist()
 						else:
-							contributions = [0,0,0,0]
+							contributions = [0]*len(self.orbitalGroups)
 						
-						f.readline() # Throw away a blank line
+						## Throw away a blank line and the phase factors, if any
+						for i in range(self.bandLength - self.nIons - 4):
+							f.readline()
+						
+						## Store in the binary file
+						if fBinary:
+							bandsFile.eigenvals[kpt, position[band]] = eigenval
+							bandsFile.contributions[kpt, position[band]] = contributions
+							continue
 						
 						## Print in .dat file
 						with open ("bands_character/band%02d.dat" % int(band+1),'a') as outputFile:
@@ -240,6 +291,9 @@ class PROCAR_splitter (object):
 		except FileNotFoundError:
 			print ("PROCAR file not found! Exiting...\n")
 			sys.exit (1)
+		
+		if fBinary:
+			bandsFile.flush ()
 			
 
 	def sumContributions (self, c):
@@ -0,0 +1,379 @@
+import os, re, time, shutil
+import numpy as np
+from . import outcar, procar
+
+class FileState (object):
+	'''
+	Cheap detection of changes in a file, based only on os.stat.
+	The file is never opened to check whether it has changed.
+	'''
+
+	def __init__ (self, fName):
+		self.fName = fName
+		"""
+		Name of the file being watched
+		"""
+
+		self.stamp = None
+		"""
+		Size and modification time of the file when last checked
+		"""
+
+	def changed (self):
+		"""
+		Returns True if the file has been created, appended or modified since the last call
+		"""
+
+		try:
+			st = os.stat (self.fName)
+		except FileNotFoundError:
+			return False
+
+		stamp = (st.st_size, st.st_mtime_ns)
+		if stamp == self.stamp:
+			return False
+
+		self.stamp = stamp
+		return True
+
+def readAppended (fName, offset):
+	"""
+	Returns the text appended to the file fName after the byte offset.
+	The text is decoded byte by byte, so that offsets in the text are also offsets in the file.
+	"""
+
+	with open (fName, 'rb') as f:
+		f.seek (offset)
+		return f.read().decode ('latin-1')
+
+def outcarReady (fOutcar):
+	"""
+	Returns True once VASP has written the header of the OUTCAR file (k-points, lattice and number of bands)
+	"""
+
+	try:
+		with open (fOutcar, 'r') as f:
+			text = f.read()
+	except FileNotFoundError:
+		return False
+
+	return 'NBANDS=' in text and 'position of ions in fractional coordinates' in text.split('k-points in reciprocal lattice and weights:')[-1]
+
+class WatchedBandStructure (outcar.BandStructure):
+	'''
+	Band structure read from an OUTCAR file still being written by VASP.
+	The header of the file is read once; then, each call to update() parses
+	only the k-point blocks of eigenvalues appended since the previous call.
+	'''
+
+	def __init__ (self, fOutcar = "OUTCAR", nKPTignore = None):
+		self.fOutcar = fOutcar
+		"""
+		OUTCAR file being watched
+		"""
+
+		self.nKPTignore = outcar.ignoredKpoints (nKPTignore, fOutcar)
+		self.soc = False
+		self.path = self.readPath (fOutcar)
+		self.nBands = self.readNbands (fOutcar)
+		self.recLattice = self.readRecLattice (fOutcar)
+		self.nElec = self.readNElec (fOutcar)
+		self.jumps = outcar.readJumps (os.path.join (os.path.dirname (fOutcar), 'KPOINTS'))
+
+		## The whole path is known beforehand, so the x axis does not change as k-points arrive
+		self.xAxis = self.createXaxis ()
+
+		self.eigenvals = []
+		self.eFermi = None
+		self.eValence = 0.0
+		self.reference = 0.0
+		self.energyWindow = None
+
+		self.referenceString = 'vbm'
+		"""
+		Reference chosen for the 0 eV, evaluated again as new k-points arrive
+		"""
+
+		self.offset = 0
+		"""
+		Offset (in bytes) of the end of the last complete k-point block parsed
+		"""
+
+		self.blockPattern = re.compile (r'k-point\s+(\d+)\s*:[^\n]*\n\s*band No\.[^\n]*\n((?:[ \t]*\d+[ \t]+\S+[ \t]+\S+[ \t]*\n){%d})' % self.nBands)
+		"""
+		Regular expression matching a complete k-point block of eigenvalues
+		"""
+
+	def readEValence (self):
+		"""
+		Returns the energy of the valence band maximum among the k-points read so far
+		"""
+
+		if not self.eigenvals:
+			return 0.0
+
+		nval = int(self.nElec) if self.soc else int(self.nElec/2)
+		return max ([kpt[nval-1] for kpt in self.eigenvals])
+
+	def complete (self):
+		"""
+		Returns True once the eigenvalues of all k-points have been read
+		"""
+
+		return len(self.eigenvals) == len(self.path)
+
+	def update (self):
+		"""
+		Parses the k-point blocks appended to the OUTCAR file since the last call.
+		Returns the number of new k-points read.
+		"""
+
+		try:
+			if os.path.getsize (self.fOutcar) < self.offset:
+				## The file has been rewritten, e.g. by a new run
+				self.offset = 0
+				self.eigenvals = []
+			text = readAppended (self.fOutcar, self.offset)
+		except FileNotFoundError:
+			return 0
+
+		nOld = len(self.eigenvals)
+		end = 0
+
+		for block in self.blockPattern.finditer (text):
+			kpt = int(block.group(1))
+
+			## A new set of eigenvalues (e.g. from a new ionic step) starts from the first k-point
+			if kpt == 1:
+				self.eigenvals = []
+
+			if kpt > self.nKPTignore:
+				self.eigenvals.append ([float(line.split()[1]) for line in block.group(2).splitlines()])
+
+			end = block.end()
+
+		if 'E-fermi :' in text[:end]:
+			self.eFermi = float(text[:end].split('E-fermi :')[-1].split()[0])
+
+		self.offset += end
+
+		nNew = len(self.eigenvals) - nOld
+		if nNew != 0:
+			self.eValence = self.readEValence ()
+			self.setReferenceString (self.referenceString)
+
+		return max (nNew, 0)
+
+	def setReferenceString (self, stringRef):
+		"""
+		Set a new reference for the eigenvalues using a string as argument.
+		The Fermi level falls back to the valence band maximum until it is written to the OUTCAR file.
+		"""
+
+		self.referenceString = stringRef
+
+		if self.eFermi is None and stringRef.lower() in ['efermi', 'e-fermi', 'ef']:
+			stringRef = 'vbm'
+
+		super().setReferenceString (stringRef)
+
+class WatchedPROCAR (procar.PROCAR):
+	'''
+	Band character read from a PROCAR file still being written by VASP.
+	Each call to update() parses only the k-point blocks appended since the previous call.
+	'''
+
+	def __init__ (self, fProcar, projection, nKPTignore = None, bands = None, groups = None):
+		self.fProcar = fProcar
+		"""
+		PROCAR file being watched
+		"""
+
+		self.nKPTignore = outcar.ignoredKpoints (nKPTignore, fProcar)
+		self.nKpoints,self.nBands,self.nIons = self.readHeader (fProcar)
+		self.selectedBands = set(range(self.nBands)) if bands is None else set(bands)
+		self.prj = projection
+
+		## The first band block has been written (see procarReady), so the layout of the blocks is known
+		self.orbitalNames, self.bandLength = procar.readBandLayout (fProcar)
+		self.orbitalGroups = list(procar.defaultOrbitalGroups (self.orbitalNames) if groups is None else groups)
+		self.groupMatrix = procar.orbitalGroupMatrix (self.orbitalGroups, self.orbitalNames)
+		self.lmContributions = []
+		self.orbitalContributions = []
+		self.ionContributions = []
+		self.materialContributions = []
+
+		self.kpointsRead = 0
+		"""
+		Number of k-points read so far, including those ignored
+		"""
+
+		self.offset = 0
+		"""
+		Offset (in bytes) of the end of the last complete k-point block parsed
+		"""
+
+	def complete (self):
+		"""
+		Returns True once the contributions of all k-points have been read
+		"""
+
+		return self.kpointsRead == self.nKpoints
+
+	def update (self):
+		"""
+		Parses the k-point blocks appended to the PROCAR file since the last call.
+		Returns the number of new k-points read.
+		"""
+
+		try:
+			text = readAppended (self.fProcar, self.offset)
+		except FileNotFoundError:
+			return 0
+
+		## The header (three lines) is skipped in the first call
+		if self.offset == 0:
+			if text.count ('\n') < 3:
+				return 0
+			header = text.split('\n', 3)
+			self.offset = len('\n'.join (header[:3])) + 1
+			text = header[3]
+
+		## Each k-point block contains the k-point line, a blank line, the band blocks and a blank line
+		## Each band block contains the band line, a blank line, the table header, the ions, the total,
+		## a blank line and, with LORBIT = 12, the table of phase factors
+		blockLength = 3 + self.nBands*self.bandLength
+		lines = text.split('\n')[:-1]
+
+		## Counts the complete blocks; the last k-point block is not followed by a blank line
+		nNew = 0
+		while self.kpointsRead + nNew < self.nKpoints:
+			last = (self.kpointsRead + nNew == self.nKpoints - 1)
+			if len(lines) < (nNew + 1)*blockLength - last:
+				break
+			nNew += 1
+
+		for k in range (nNew):
+			block = lines[k*blockLength:(k+1)*blockLength]
+			self.offset += sum ([len(line) + 1 for line in block])
+			self.kpointsRead += 1
+
+			if self.kpointsRead <= self.nKPTignore:
+				continue
+
+			## Bands outside of the selection are not parsed
+			bands = sorted (self.selectedBands)
+			orbitals = np.zeros ((self.nBands, len(self.orbitalNames)))
+			ions = np.zeros ((self.nBands, self.nIons))
+			orbitals[bands], ions[bands] = self.readTotals ([block[2 + band*self.bandLength:] for band in bands])
+
+			self.lmContributions.append (orbitals)
+			self.orbitalContributions.append (np.dot (orbitals, self.groupMatrix))
+			self.ionContributions.append (ions)
+			self.materialContributions.append (self.sumKpointContributions (len(self.ionContributions)-1))
+
+		return nNew
+
+def writeEigenvals (bandStructure, datName='eigenv.dat'):
+	"""
+	Writes eigenv.dat, as datIO.DatFiles.datEigenvals, using only the k-points read so far
+	"""
+
+	nKpoints = len(bandStructure.eigenvals)
+	if nKpoints == 0:
+		return
+
+	x = np.asarray (bandStructure.xAxis[:nKpoints])
+	E = np.asarray (bandStructure.eigenvals, dtype=float) - bandStructure.reference
+
+	with open (datName, 'w') as outputFile:
+		for band in bandStructure.selectedBands():
+			outputFile.write ("".join (["%.6f % 3.6f\n" % (k, e) for k, e in zip (x, E[:,band])]))
+			outputFile.write ("\n")
+
+class BandFilesWriter (object):
+	'''
+	Writes the files bandNN.dat into a folder, as datIO.DatFiles.datProjected and datCharacter,
+	using only the k-points read so far both from the OUTCAR and the PROCAR files.
+	New k-points are appended to the existing files; the files are only rewritten
+	when the reference for the 0 eV (e.g. the valence band maximum) changes.
+	'''
+
+	def __init__ (self, folder, markerSize=0.5):
+		self.folder = folder
+		"""
+		Folder receiving the .dat files
+		"""
+
+		self.markerSize = float(markerSize)
+		"""
+		The size of the symbols
+		"""
+
+		self.nWritten = 0
+		"""
+		Number of k-points already written to the files
+		"""
+
+		self.reference = None
+		"""
+		Reference used in the rows already written
+		"""
+
+	def write (self, bandStructure, contributions):
+		"""
+		Writes the k-points read since the last call, or all of them if the reference has changed.
+		Returns the number of k-points written.
+		"""
+
+		nKpoints = min (len(bandStructure.eigenvals), len(contributions))
+
+		if bandStructure.reference != self.reference or not os.path.isdir (self.folder):
+			shutil.rmtree (self.folder, ignore_errors=True)
+			os.mkdir (self.folder)
+			self.nWritten = 0
+			self.reference = bandStructure.reference
+
+		if nKpoints <= self.nWritten:
+			return 0
+
+		new = slice (self.nWritten, nKpoints)
+		x = np.asarray (bandStructure.xAxis[new])
+		E = np.asarray (bandStructure.eigenvals[new], dtype=float) - bandStructure.reference
+		c = np.asarray (contributions[new], dtype=float) * self.markerSize
+
+		rowFormat = "%.6f % 3.6f" + " %1.4f"*c.shape[2] + "\n"
+
+		for band in bandStructure.selectedBands():
+			rows = np.column_stack ((x, E[:,band], c[:,band]))
+
+			with open (os.path.join (self.folder, "band%02d.dat" % int(band+1)), 'a') as outputFile:
+				outputFile.write ("".join ([rowFormat % tuple(row) for row in rows]))
+
+		self.nWritten = nKpoints
+		return nKpoints - new.start
+
+def procarReady (fProcar):
+	"""
+	Returns True once VASP has written the header and the first band block of the PROCAR file,
+	from which the layout of the blocks is read (see procar.readBandLayout)
+	"""
+
+	try:
+		with open (fProcar, 'r') as f:
+			if '# of ions' not in f.readline() + f.readline():
+				return False
+	except FileNotFoundError:
+		return False
+
+	return procar.readBandLayout (fProcar)[1] is not None
+
+def waitFor (fName, ready, interval):
+	"""
+	Waits until ready(fName) is True, checking the file only when it changes
+	"""
+
+	state = FileState (fName)
+
+	while not (state.changed () and ready (fName)):
+		time.sleep (interval)